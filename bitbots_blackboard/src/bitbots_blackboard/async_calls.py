@@ -0,0 +1,101 @@
+"""
+AsyncCaller
+^^^^^^^^^^^
+
+Runs blocking service calls and waits for action servers and services on thread pools, so the behavior loop
+never blocks on them. Elements submit a call and poll the returned future on later ticks.
+Connections are registered by name, established concurrently in the background and can be queried for readiness.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import rospy
+
+
+class AsyncCaller:
+    def __init__(self, max_workers=2, max_connection_workers=4):
+        """
+        :param max_workers: Number of threads for calls
+        :param max_connection_workers: Number of threads that wait for servers and services concurrently
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='behavior_async')
+        self.connection_executor = ThreadPoolExecutor(max_workers=max_connection_workers,
+                                                      thread_name_prefix='behavior_connect')
+        # name -> function that waits for the connection with a timeout and returns whether it is available
+        self._connections = {}
+        self._connection_futures = {}
+        self._ready_connections = set()
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Calls the function on the thread pool. Exceptions are logged and stored in the future.
+
+        :return: concurrent.futures.Future with the result of the call
+        """
+        future = self.executor.submit(function, *args, **kwargs)
+        future.add_done_callback(self._log_exception)
+        return future
+
+    @staticmethod
+    def _log_exception(future):
+        if not future.cancelled() and future.exception() is not None:
+            rospy.logerr(f"Asynchronous call failed: {future.exception()}")
+
+    def register_action_server(self, name, action_client, timeout=1.0):
+        """
+        Starts waiting for the server of the action client in the background
+
+        :param name: Name of the connection for ready()
+        :param action_client: actionlib.SimpleActionClient
+        :param timeout: Time in seconds that is waited for the server per try
+        """
+        self._register(name, lambda: action_client.wait_for_server(rospy.Duration(timeout)))
+
+    def register_service(self, name, service_name, timeout=1.0):
+        """
+        Starts waiting for the service in the background
+
+        :param name: Name of the connection for ready()
+        :param service_name: Name of the ROS service
+        :param timeout: Time in seconds that is waited for the service per try
+        """
+        def wait_for_service():
+            try:
+                rospy.wait_for_service(service_name, timeout)
+                return True
+            except rospy.ROSException:
+                return False
+        self._register(name, wait_for_service)
+
+    def _register(self, name, wait_function):
+        self._connections[name] = wait_function
+        self._ready_connections.discard(name)
+        self._connection_futures[name] = self.connection_executor.submit(wait_function)
+
+    def ready(self, name):
+        """
+        Returns whether the registered connection is available without blocking.
+        If a try has timed out, the next one is started in the background.
+        """
+        if name in self._ready_connections:
+            return True
+        if name not in self._connections:
+            return False
+        future = self._connection_futures[name]
+        if not future.done():
+            return False
+        if future.exception() is None and future.result():
+            self._ready_connections.add(name)
+            return True
+        self._connection_futures[name] = self.connection_executor.submit(self._connections[name])
+        return False
+
+    def readiness(self):
+        """Returns a dict with the readiness of all registered connections"""
+        return {name: self.ready(name) for name in self._connections}
+
+    def all_ready(self):
+        return all(self.readiness().values())
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+        self.connection_executor.shutdown(wait=False)
@@ -1,3 +1,5 @@
+from functools import cached_property
+
 import rospy
 from bio_ik_msgs.srv import GetIK
 from bitbots_blackboard.capsules.animation_capsule import AnimationCapsule
@@ -7,43 +9,152 @@ from bitbots_blackboard.capsules.head_capsule import HeadCapsule
 from bitbots_blackboard.capsules.kick_capsule import KickCapsule
 from bitbots_blackboard.capsules.pathfinding_capsule import PathfindingCapsule
 from bitbots_blackboard.capsules.team_data_capsule import TeamDataCapsule
-from bitbots_blackboard.capsules.world_model_capsule import WorldModelCapsule
+from bitbots_blackboard.capsules.world_model_capsule import WorldModelCapsule, WorldModelCore
+from bitbots_blackboard.async_calls import AsyncCaller
+from bitbots_blackboard.instrumented_lock import LockRegistry
+from bitbots_blackboard.parameter_store import ParameterStore
+from bitbots_blackboard.subscription_manager import SubscriptionManager
+from bitbots_blackboard.tick_scheduler import TickScheduler
 
 import actionlib
+from bitbots_msgs.msg import DynUpAction, KickAction
 from humanoid_league_msgs.msg import PlayAnimationAction
 
 
 class BodyBlackboard:
     def __init__(self):
-
-        self.config = rospy.get_param("behavior/body")
-        self.base_footprint_frame = rospy.get_param("~base_footprint_frame", "base_footprint")
-        self.map_frame = rospy.get_param("~map_frame", "map")
-        self.blackboard = BlackboardCapsule()
-        self.gamestate = GameStatusCapsule()
-        self.animation = AnimationCapsule()
-        self.kick = KickCapsule(self)
-        self.world_model = WorldModelCapsule(self)
-        self.pathfinding = PathfindingCapsule(self)
-        self.world_model = WorldModelCapsule(self)
-        self.team_data = TeamDataCapsule()
+        # the parameters are fetched once and served from this cache
+        self.parameters = ParameterStore(["behavior/body", "~"])
+        self.parameters.start_refresh(self.config['parameter_refresh_period'])
+        self.base_footprint_frame = self.parameters.get("~base_footprint_frame", "base_footprint")
+        self.map_frame = self.parameters.get("~map_frame", "map")
+        # locks between the behavior loop and the callback threads, optionally instrumented to measure contention
+        self.locks = LockRegistry(self.config['lock_instrumentation'])
+        # callbacks notify the scheduler of the behavior loop when relevant data changes.
+        # it uses the ROS clock like the behavior timers, so it also works with simulation time
+        self.scheduler = TickScheduler(self.config['tick_max_rate'], self.config['tick_min_rate'],
+                                       self.locks.create('scheduler'), rospy.get_time)
+        # messages are buffered by the subscription manager and processed at the start of a tick
+        self.subscriptions = SubscriptionManager(self.config['subscription_policies'], self.locks,
+                                                 self.scheduler.notify)
+        # blocking service calls and server connections run on this thread pool
+        self.async_calls = AsyncCaller(self.config['async_call_workers'], self.config['connection_workers'])
+        # the capsules are constructed on first access or by warm_up
         # animations
         self.animation_action_client = actionlib.SimpleActionClient('animation', PlayAnimationAction)
-        self.goalie_arms_animation = rospy.get_param("Animations/Goalie/goalieArms")
-        self.goalie_falling_right_animation = rospy.get_param("Animations/Goalie/fallRight")
-        self.goalie_falling_left_animation = rospy.get_param("Animations/Goalie/fallLeft")
-        self.goalie_falling_center_animation = rospy.get_param("Animations/Goalie/fallCenter")
-        self.cheering_animation = rospy.get_param("Animations/Misc/cheering")
-        self.init_animation = rospy.get_param("Animations/Misc/init")
-
-        self.dynup_action_client = None
+        self.async_calls.register_action_server('animation', self.animation_action_client)
+        self.goalie_arms_animation = self.parameters.get("Animations/Goalie/goalieArms")
+        self.goalie_falling_right_animation = self.parameters.get("Animations/Goalie/fallRight")
+        self.goalie_falling_left_animation = self.parameters.get("Animations/Goalie/fallLeft")
+        self.goalie_falling_center_animation = self.parameters.get("Animations/Goalie/fallCenter")
+        self.cheering_animation = self.parameters.get("Animations/Misc/cheering")
+        self.init_animation = self.parameters.get("Animations/Misc/init")
+        # the action servers are connected in the background from the start, so they are ready for the first tick
+        kick_topic = self.config["dynamic_kick"]["topic"]
+        rospy.loginfo(f"Connecting to bitbots_dynamic_kick ({kick_topic})")
+        self.kick_action_client = actionlib.SimpleActionClient(kick_topic, KickAction)
+        self.async_calls.register_action_server('dynamic_kick', self.kick_action_client,
+                                                self.config["dynamic_kick"]["wait_time"])
+        self.dynup_action_client = actionlib.SimpleActionClient('dynup', DynUpAction)
+        self.async_calls.register_action_server('dynup', self.dynup_action_client)
+
         self.dynup_cancel_pub = None  # type: rospy.Publisher
         self.hcm_deactivate_pub = None  # type: rospy.Publisher
 
+        # factor by which the time to ball updates are stretched when the behavior is too slow
+        self.time_to_ball_stretch = 1
+
+    @cached_property
+    def blackboard(self):
+        return BlackboardCapsule()
+
+    @cached_property
+    def gamestate(self):
+        return GameStatusCapsule()
+
+    @cached_property
+    def animation(self):
+        return AnimationCapsule(self)
+
+    @cached_property
+    def kick(self):
+        return KickCapsule(self)
+
+    @cached_property
+    def world_model(self):
+        return WorldModelCapsule(self)
+
+    @cached_property
+    def pathfinding(self):
+        return PathfindingCapsule(self)
+
+    @cached_property
+    def team_data(self):
+        return TeamDataCapsule(self)
+
+    def warm_up(self):
+        """
+        Constructs all capsules, so that their subscribers, publishers and timers are created at startup
+        and not in the first tick that uses a capsule. Called by the behavior before its first tick.
+        """
+        for capsule in ('blackboard', 'gamestate', 'animation', 'kick', 'world_model', 'pathfinding', 'team_data'):
+            getattr(self, capsule)
+
+    @property
+    def config(self):
+        """The behavior/body parameters, updated when the parameters are refreshed"""
+        return self.parameters.snapshot("behavior/body")
+
+    def connection_ready(self, name):
+        """
+        Returns whether a connection to a server is established, without blocking.
+        The connections 'animation', 'dynamic_kick' and 'dynup' are registered on construction.
+        """
+        return self.async_calls.ready(name)
+
+    def set_degradation_level(self, level):
+        """
+        Trades quality for computation time when the behavior ticks take too long. The levels are cumulative:
+        1 reduces the number of evaluated kick angles, 2 uses the coarse kick cost estimation,
+        3 disables debug publishing and 4 stretches the time to ball updates.
+
+        :param level: Degradation level from 0 (full quality) to 4
+        """
+        if level >= 1:
+            self.world_model.num_kick_angles = self.config['degradation_num_kick_angles']
+        else:
+            self.world_model.num_kick_angles = self.config['num_kick_angles']
+        self.world_model.coarse_kick_cost = level >= 2
+        self.world_model.debug_publishing = level < 3
+        self.time_to_ball_stretch = self.config['degradation_time_to_ball_stretch'] if level >= 4 else 1
+
+
 class HeadBlackboard:
     def __init__(self):
-        self.config = rospy.get_param("behavior/head")
-        self.head_capsule = HeadCapsule(self)
-        self.world_model = WorldModelCapsule(self)
-        rospy.wait_for_service('bio_ik/get_bio_ik')
+        self.parameters = ParameterStore(["behavior/head", "~"])
+        self.locks = LockRegistry(self.config.get('lock_instrumentation', False))
+        self.subscriptions = SubscriptionManager(self.config.get('subscription_policies'), self.locks)
+        # the bio_ik service is connected in the background, so the head behavior can start immediately
+        self.async_calls = AsyncCaller()
+        self.async_calls.register_service('bio_ik', 'bio_ik/get_bio_ik')
         self.bio_ik = rospy.ServiceProxy('bio_ik/get_bio_ik', GetIK)
+
+    @property
+    def config(self):
+        """The behavior/head parameters"""
+        return self.parameters.snapshot("behavior/head")
+
+    @cached_property
+    def head_capsule(self):
+        return HeadCapsule(self)
+
+    @cached_property
+    def world_model(self):
+        # the head only needs the ball, so it does not build the costmap
+        return WorldModelCore(self)
+
+    def connection_ready(self, name):
+        """
+        Returns whether a connection to a service is established, without blocking. The known connection is 'bio_ik'.
+        """
+        return self.async_calls.ready(name)
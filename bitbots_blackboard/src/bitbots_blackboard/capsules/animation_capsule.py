@@ -2,19 +2,22 @@
 AnimationCapsule
 ^^^^^^^^^^^^^^^^
 """
-import actionlib
 import rospy
-from humanoid_league_msgs.msg import PlayAnimationGoal, PlayAnimationAction
+from humanoid_league_msgs.msg import PlayAnimationGoal
 
 
 class AnimationCapsule:
-    def __init__(self):
+    def __init__(self, blackboard):
+        self._blackboard = blackboard
         self.active = False
-        self.animation_client = actionlib.SimpleActionClient('animation', PlayAnimationAction)
+        # the action client and its 'animation' connection are shared with the play animation action
+        self.animation_client = self._blackboard.animation_action_client
 
     def play_animation(self, animation):
         """
-        plays the animation "ani" and sets the flag "BusyAnimation"
+        plays the animation "ani" and sets the flag "BusyAnimation".
+        It does not block if the animation server is not available yet, but returns False,
+        so it has to be called again on a later tick.
 
         :param animation: name of the animation which shall be played
         """
@@ -24,19 +27,17 @@ class AnimationCapsule:
         if animation is None or animation == "":
             rospy.logwarn("Tried to play an animation with an empty name!")
             return False
-        first_try = self.animation_client.wait_for_server(
-            rospy.Duration(rospy.get_param("hcm/anim_server_wait_time", 10)))
-        if not first_try:
-            rospy.logerr(
-                "Animation Action Server not running! Motion can not work without animation action server. "
-                "Will now wait until server is accessible!")
-            self.animation_client.wait_for_server()
-            rospy.logwarn("Animation server now running, hcm will go on.")
+        if not self._blackboard.async_calls.ready('animation'):
+            rospy.logerr_throttle(
+                5.0, "Animation Action Server not running! Motion can not work without animation action server. "
+                     "Will wait until server is accessible!")
+            return False
         goal = PlayAnimationGoal()
         goal.animation = animation
         goal.hcm = False  # the animation is from the hcm
         self.animation_client.send_goal(goal, done_cb=self.cb_unset_is_busy)
         self.active = True
+        return True
 
     def cb_unset_is_busy(self, _p1, _p2):
         self.active = False
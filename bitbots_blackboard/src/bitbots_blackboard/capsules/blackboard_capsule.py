@@ -11,17 +11,19 @@ from humanoid_league_msgs.msg import RobotControlState
 
 from humanoid_league_msgs.msg import HeadMode
 
+from bitbots_blackboard.timer_wheel import TimerWheel
+
 
 class BlackboardCapsule:
     def __init__(self):
         self.my_data = {}
-        self.head_pub = None  # type: rospy.Publisher
+        self.head_pub = None  # type: ChangePublisher
         self.duty = rospy.get_param('role')  # TODO: adapt to Leo's script
         self.state = None  # type: RobotControlState
 
         self.tf_buffer = tf2.Buffer(cache_time=rospy.Duration(30.0))
         self.tf_listener = tf2.TransformListener(self.tf_buffer)
-        self.timers = dict()
+        self.timer_wheel = TimerWheel()
 
     #####################
     # ## Tracking Part ##
@@ -56,7 +58,7 @@ class BlackboardCapsule:
         :param duration_secs: Duration of the timer in seconds
         :return: None
         """
-        self.timers[timer_name] = rospy.Time.now() + rospy.Duration.from_sec(int(duration_secs))
+        self.timer_wheel.start(timer_name, int(duration_secs))
 
     def end_timer(self, timer_name):
         """
@@ -64,7 +66,7 @@ class BlackboardCapsule:
         :param timer_name: Name of the timer
         :return: None
         """
-        self.timers[timer_name] = rospy.Time.now()
+        self.timer_wheel.end(timer_name)
 
     def timer_running(self, timer_name):
         """
@@ -72,9 +74,7 @@ class BlackboardCapsule:
         :param timer_name: Name of the timer
         :return: Whether the timer is running. False if the timer doesn't exist.
         """
-        if timer_name not in self.timers:
-            return False
-        return rospy.Time.now() < self.timers[timer_name]
+        return self.timer_wheel.running(timer_name)
 
     def timer_remaining(self, timer_name):
         """
@@ -82,10 +82,7 @@ class BlackboardCapsule:
         :param timer_name: Name of the timer
         :return: The number of seconds left on the timer. -1 if the timer doesn't exist.
         """
-
-        if timer_name not in self.timers:
-            return -1
-        return (self.timers[timer_name] - rospy.Time.now()).to_sec()
+        return self.timer_wheel.remaining(timer_name)
 
     def timer_ended(self, timer_name):
         """
@@ -93,7 +90,4 @@ class BlackboardCapsule:
         :param timer_name: Name of the timer
         :return: Whether the timer has ended. Also true, if timer doesn't exist.
         """
-        if timer_name not in self.timers:
-            return True  # Don't wait for a non-existing Timer
-        return rospy.Time.now() > self.timers[timer_name]
-
+        return self.timer_wheel.expired(timer_name)
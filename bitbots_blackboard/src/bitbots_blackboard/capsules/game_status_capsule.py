@@ -5,20 +5,48 @@ GameStatusCapsule
 Provides information about the current game state.
 
 """
+import copy
+from collections import namedtuple
+
 import rosparam
 import rospy
 from humanoid_league_msgs.msg import GameState
 
+# The last game state message and what was derived from the previous ones. The callback replaces the record as a whole,
+# so the behavior never reads a partially updated game state.
+GameStatus = namedtuple('GameStatus', ['gamestate', 'last_update', 'unpenalized_time', 'last_goal_from_us_time',
+                                       'last_goal_time', 'free_kick_kickoff_team'])
+
 
 class GameStatusCapsule:
     def __init__(self):
         self.team_id = rospy.get_param("team_id", 8)
-        self.gamestate = GameState()
-        self.last_update = 0
-        self.unpenalized_time = 0
-        self.last_goal_from_us_time = -86400
-        self.last_goal_time = -86400
-        self.free_kick_kickoff_team = None
+        self.status = GameStatus(gamestate=GameState(), last_update=0, unpenalized_time=0,
+                                 last_goal_from_us_time=-86400, last_goal_time=-86400, free_kick_kickoff_team=None)
+
+    @property
+    def gamestate(self):
+        return self.status.gamestate
+
+    @property
+    def last_update(self):
+        return self.status.last_update
+
+    @property
+    def unpenalized_time(self):
+        return self.status.unpenalized_time
+
+    @property
+    def last_goal_from_us_time(self):
+        return self.status.last_goal_from_us_time
+
+    @property
+    def last_goal_time(self):
+        return self.status.last_goal_time
+
+    @property
+    def free_kick_kickoff_team(self):
+        return self.status.free_kick_kickoff_team
 
     def is_game_state_equals(self, value):
         assert value in [GameState.GAMESTATE_PLAYING, GameState.GAMESTATE_FINISHED, GameState.GAMESTATE_INITAL,
@@ -41,9 +69,10 @@ class GameStatusCapsule:
         return self.gamestate.hasKickOff
 
     def has_penalty_kick(self):
-        return (self.gamestate.secondaryState == GameState.STATE_PENALTYKICK or
-                self.gamestate.secondaryState == GameState.STATE_PENALTYSHOOT) and \
-               self.gamestate.secondaryStateTeam == self.team_id
+        gamestate = self.gamestate
+        return (gamestate.secondaryState == GameState.STATE_PENALTYKICK or
+                gamestate.secondaryState == GameState.STATE_PENALTYSHOOT) and \
+               gamestate.secondaryStateTeam == self.team_id
 
     def get_own_goals(self):
         return self.gamestate.ownScore
@@ -59,20 +88,23 @@ class GameStatusCapsule:
 
     def get_seconds_remaining(self):
         # Time from the message minus time passed since receiving it
-        return max(self.gamestate.secondsRemaining - (rospy.get_time() - self.last_update), 0)
+        status = self.status
+        return max(status.gamestate.secondsRemaining - (rospy.get_time() - status.last_update), 0)
 
     def get_secondary_seconds_remaining(self):
         """Seconds remaining for things like kickoff"""
         # Time from the message minus time passed since receiving it
-        return max(self.gamestate.secondary_seconds_remaining - (rospy.get_time() - self.last_update), 0)
+        status = self.status
+        return max(status.gamestate.secondary_seconds_remaining - (rospy.get_time() - status.last_update), 0)
 
     def get_seconds_since_last_drop_ball(self):
         """Returns the seconds since the last drop in"""
-        if self.gamestate.dropInTime == -1:
+        status = self.status
+        if status.gamestate.dropInTime == -1:
             return None
         else:
             # Time from the message plus seconds passed since receiving it
-            return self.gamestate.dropInTime + (rospy.get_time() - self.last_update)
+            return status.gamestate.dropInTime + (rospy.get_time() - status.last_update)
 
     def get_seconds_since_unpenalized(self):
         return rospy.get_time() - self.unpenalized_time
@@ -90,28 +122,38 @@ class GameStatusCapsule:
         return self.gamestate.teamMatesWithRedCard
 
     def gamestate_callback(self, gs):
-        if self.gamestate.penalized and not gs.penalized:
-            self.unpenalized_time = rospy.get_time()
+        status = self.status
+        previous = status.gamestate
+        now = rospy.get_time()
+        unpenalized_time = status.unpenalized_time
+        last_goal_from_us_time = status.last_goal_from_us_time
+        last_goal_time = status.last_goal_time
+        free_kick_kickoff_team = status.free_kick_kickoff_team
+
+        if previous.penalized and not gs.penalized:
+            unpenalized_time = now
 
-        if gs.ownScore > self.gamestate.ownScore:
-            self.last_goal_from_us_time = rospy.get_time()
-            self.last_goal_time = rospy.get_time()
+        if gs.ownScore > previous.ownScore:
+            last_goal_from_us_time = now
+            last_goal_time = now
 
-        if gs.rivalScore > self.gamestate.rivalScore:
-            self.last_goal_time = rospy.get_time()
+        if gs.rivalScore > previous.rivalScore:
+            last_goal_time = now
 
-        if gs.secondaryStateMode == 2 and self.gamestate.secondaryStateMode != 2 \
+        if gs.secondaryStateMode == 2 and previous.secondaryStateMode != 2 \
                 and gs.gameState == GameState.GAMESTATE_PLAYING:
             # secondary action is now executed but we will not see this in the new messages.
             # it will look like a normal kick off, but we need to remember that this is some sort of free kick
             # we set the kickoff value accordingly, then we will not be allowed to move if it is a kick for the others
-            self.free_kick_kickoff_team = gs.secondaryStateTeam
+            free_kick_kickoff_team = gs.secondaryStateTeam
 
         if gs.secondaryStateMode != 2 and gs.secondary_seconds_remaining == 0:
-            self.free_kick_kickoff_team = None
+            free_kick_kickoff_team = None
 
-        if self.free_kick_kickoff_team is not None:
-            gs.hasKickOff = self.free_kick_kickoff_team == self.team_id
+        if free_kick_kickoff_team is not None:
+            # the message is shared with the other callbacks of the topic, so a copy is changed
+            gs = copy.copy(gs)
+            gs.hasKickOff = free_kick_kickoff_team == self.team_id
 
-        self.last_update = rospy.get_time()
-        self.gamestate = gs
+        self.status = GameStatus(gs, now, unpenalized_time, last_goal_from_us_time, last_goal_time,
+                                 free_kick_kickoff_team)
@@ -1,7 +1,12 @@
+import copy
+
 import rospy
 import actionlib
-from bitbots_msgs.msg import KickAction, KickFeedback, KickActionResult, KickGoal
+import tf2_ros as tf2
+from bitbots_msgs.msg import KickFeedback, KickActionResult, KickGoal
 from actionlib_msgs.msg import GoalStatus
+from geometry_msgs.msg import Quaternion
+from tf.transformations import quaternion_from_euler
 
 
 class KickCapsule():
@@ -22,40 +27,161 @@ class KickCapsule():
         :param blackboard: Global blackboard instance
         """
         self.__blackboard = blackboard
-        self.connect()
-
-    def connect(self):
-        topic = self.__blackboard.config["dynamic_kick"]["topic"]
-        rospy.loginfo("Connecting {}.KickCapsule to bitbots_dynamic_kick ({})"
-                      .format(str(self.__blackboard.__class__).split(".")[-1], topic))
-        self.__action_client = actionlib.SimpleActionClient(topic, KickAction)
-        self.__connected = self.__action_client.wait_for_server(
-            rospy.Duration(self.__blackboard.config["dynamic_kick"]["wait_time"]))
+        # Kick goals that are prepared in the background, indexed by the kick type
+        self.prepared_goals = {}  # type: dict
+        self.__prepared_goals_key = {}
+        # kick type -> time until which its goal is prepared
+        self.__prepare_goals_until = {}
+        self.prepared_goal_max_age = rospy.Duration(self.__blackboard.config['kick_prepared_goal_max_age'])
+        prepare_rate = self.__blackboard.config['kick_prepare_rate']
+        if prepare_rate > 0:
+            self.__prepare_timer = rospy.Timer(rospy.Duration(1.0 / prepare_rate), self.__prepare_goals_cb)
+        # the blackboard connects to the dynamic_kick server in the background, see is_connected
+        self.__action_client = self.__blackboard.kick_action_client
 
+    def is_connected(self):
+        """
+        :return: Whether the dynamic_kick server is available
+        """
         if not self.__connected:
-            rospy.logerr("No dynamic_kick server running on {}".format(topic))
+            self.__connected = self.__blackboard.async_calls.ready('dynamic_kick')
+        return self.__connected
 
     def kick(self, goal):
         """
+        Sends the kick goal. If the dynamic_kick server is not connected, the connection is retried in the
+        background and the goal has to be sent again on a later tick.
+
         :param goal: Goal to kick to
         :type goal: KickGoal
-        :raises RuntimeError: when not connected to dynamic_kick server
+        :return: True if the goal was sent
         """
-        if not self.__connected:
-            # try to connect again
-            self.__connected = self.__action_client.wait_for_server(
-                rospy.Duration(self.__blackboard.config["dynamic_kick"]["wait_time"]))
-            if not self.__connected:
-                raise RuntimeError("Not connected to any dynamic_kick server")
+        if not self.is_connected():
+            # the connection is retried in the background
+            rospy.logerr_throttle(5, "Not connected to any dynamic_kick server")
+            return False
 
         self.__action_client.send_goal(goal, self.__done_cb, self.__active_cb, self.__feedback_cb)
         self.last_goal = goal
         self.last_goal_sent = rospy.Time.now()
+        return True
+
+    def build_goal(self, kick_type='normal', ball_position=None):
+        """
+        Builds a kick goal for the current ball position including the best kick direction
+
+        :param kick_type: 'normal' or 'penalty'
+        :type kick_type: str
+        :param ball_position: Ball position (u, v) in the base footprint frame for a normal kick,
+            the best ball of the world model by default
+        :rtype: KickGoal
+        """
+        config = self.__blackboard.config
+        world_model = self.__blackboard.world_model
+        goal = KickGoal()
+        goal.header.stamp = rospy.Time.now()
+
+        # currently we use a tested left or right kick
+        goal.header.frame_id = world_model.base_footprint_frame  # the ball position is stated in this frame
+
+        if kick_type == 'penalty':
+            goal.kick_speed = 6.7
+            goal.ball_position.x = 0.22
+            goal.ball_position.y = 0.0
+            goal.ball_position.z = 0
+            goal.unstable = True
+
+            # only check 2 directions, left and right
+            kick_direction = world_model.get_best_kick_direction(
+                -config['penalty_kick_angle'],
+                config['penalty_kick_angle'],
+                2,
+                config['kick_cost_kick_length'],
+                config['kick_cost_angular_range'])
+        else:
+            if ball_position is None:
+                ball_position = world_model.get_ball_position_uv()
+            ball_u, ball_v = ball_position
+            goal.kick_speed = 1
+            goal.ball_position.x = ball_u
+            goal.ball_position.y = ball_v
+            goal.ball_position.z = 0
+            goal.unstable = False
+
+            kick_evaluation = world_model.get_latest_kick_evaluation()
+            # kick straight ahead until the first evaluation of the kick directions is available
+            kick_direction = kick_evaluation.best_direction if kick_evaluation is not None else 0
+
+        goal.kick_direction = Quaternion(*quaternion_from_euler(0, 0, kick_direction))
+        return goal
+
+    def keep_goals_prepared(self, kick_type='normal', duration=1.0):
+        """
+        Requests that the kick goal of a kick type is kept up to date in the background for the given duration.
+        This should be called every tick while a kick is likely, e.g. during the approach to the ball.
+
+        :param kick_type: 'normal' or 'penalty'
+        :param duration: Duration in seconds after which the goal is not updated anymore
+        """
+        self.__prepare_goals_until[kick_type] = rospy.Time.now() + rospy.Duration(duration)
+
+    def get_goal(self, kick_type='normal'):
+        """
+        Returns a kick goal for the current ball position. A goal prepared in the background is used
+        if it is recent enough, otherwise the goal is built now.
+
+        :param kick_type: 'normal' or 'penalty'
+        :rtype: KickGoal
+        """
+        goal = self.prepared_goals.get(kick_type)
+        if goal is None or rospy.Time.now() - goal.header.stamp > self.prepared_goal_max_age:
+            return self.build_goal(kick_type)
+        # the stamp of the prepared goal is its build time, so the goal itself is not restamped
+        goal = copy.deepcopy(goal)
+        goal.header.stamp = rospy.Time.now()
+        return goal
+
+    def __prepare_goals_cb(self, event):
+        """
+        Updates the prepared kick goals if the ball or the costmap have changed.
+        This runs in a timer thread, so it only reads the immutable ball state of the world model
+        and does not use the best ball, which publishes and caches the fused ball.
+        """
+        now = rospy.Time.now()
+        kick_types = [kick_type for kick_type, until in list(self.__prepare_goals_until.items())
+                      if now <= until]
+        if not kick_types:
+            return
+        world_model = self.__blackboard.world_model
+        ball_state = world_model.ball_state
+        # a kick is only likely while we see the ball ourselves
+        if now - ball_state.seen_time > world_model.ball_lost_time:
+            return
+        try:
+            # the stamp of the odom ball is zero, so the newest transform is used without waiting
+            ball = world_model.tf_buffer.transform(ball_state.odom, world_model.base_footprint_frame).point
+        except (tf2.ConnectivityException, tf2.LookupException, tf2.ExtrapolationException) as e:
+            rospy.logwarn_throttle(5, f"Could not prepare a kick goal: {e}")
+            return
+        # one centimeter is precise enough for the kick
+        key = (round(ball.x, 2), round(ball.y, 2), world_model.costmap_version)
+        for kick_type in kick_types:
+            goal = self.prepared_goals.get(kick_type)
+            if self.__prepared_goals_key.get(kick_type) == key and goal is not None and \
+                    rospy.Time.now() - goal.header.stamp < self.prepared_goal_max_age / 2:
+                continue
+            try:
+                self.prepared_goals[kick_type] = self.build_goal(kick_type, (ball.x, ball.y))
+                self.__prepared_goals_key[kick_type] = key
+            except Exception as e:
+                rospy.logwarn_throttle(5, f"Could not prepare a kick goal: {e}")
 
     def __done_cb(self, state, result):
         self.last_result = KickActionResult(status=state, result=result)
         self.last_result_received = rospy.Time.now()
         self.is_currently_kicking = False
+        # the behavior should react to the end of the kick immediately
+        self.__blackboard.scheduler.notify()
 
     def __feedback_cb(self, feedback):
         self.last_feedback = feedback
@@ -1,26 +1,39 @@
 import rospy
 import math
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import tf2_ros
 import numpy as np
 from ros_numpy import numpify
-from geometry_msgs.msg import PoseStamped, Point, Twist
-from actionlib_msgs.msg import GoalID
+from geometry_msgs.msg import PoseStamped, Pose, Point, Quaternion, Twist
+from actionlib_msgs.msg import GoalID, GoalStatus
 from tf.transformations import euler_from_quaternion, quaternion_from_euler
-from nav_msgs.srv import GetPlanRequest
+from nav_msgs.srv import GetPlan, GetPlanRequest
+from bitbots_blackboard.change_publisher import ChangePublisher
+from bitbots_blackboard.grid_planner import GridPlanner
 
 
 class PathfindingCapsule:
     def __init__(self, blackboard):
-        self.map_frame = rospy.get_param('~map_frame', 'map')
+        parameters = blackboard.parameters
+        self.map_frame = parameters.get('~map_frame', 'map')
         # Thresholds to determine whether the transmitted goal is a new one
         self.tf_buffer = tf2_ros.Buffer(cache_time=rospy.Duration(2))
         self.tf_listener = tf2_ros.TransformListener(self.tf_buffer)
-        self.position_threshold = rospy.get_param('behavior/body/pathfinding_position_threshold')
-        self.orientation_threshold = rospy.get_param('behavior/body/pathfinding_orientation_threshold')
+        self.position_threshold = parameters.get('behavior/body/pathfinding_position_threshold')
+        self.orientation_threshold = parameters.get('behavior/body/pathfinding_orientation_threshold')
+        # Period after which an unchanged goal is sent again anyway, 0 disables the refresh
+        self.goal_refresh_period = parameters.get('behavior/body/pathfinding_goal_refresh_period', 0, rospy.Duration)
+        self.last_goal_sent_time = None  # type: rospy.Time
+        # Metrics of the goal de-duplication
+        self.goals_sent = 0
+        self.goals_suppressed = 0
         self.direct_cmd_vel_pub = None  # type: rospy.Publisher
+        # publishes the stop command on cmd_vel only if it changed or someone else published on cmd_vel
+        self.stop_walk_pub = None  # type: ChangePublisher
         self.pathfinding_pub = None  # type: rospy.Publisher
-        self.pathfinding_cancel_pub = None  # type: rospy.Publisher
+        self.pathfinding_cancel_pub = None  # type: ChangePublisher
         self.path_to_ball_pub = None  # type: rospy.Publisher
         self.ball_obstacle_active_pub = None
         self.keep_out_area_pub = None
@@ -31,15 +44,102 @@ class PathfindingCapsule:
         self.avoid_ball = True
         self.current_cmd_vel = Twist()
         self._blackboard = blackboard  # type: BodyBlackboard
-        self.orient_to_ball_distance = rospy.get_param("move_base/BBPlanner/orient_to_goal_distance", 1)
+        self.orient_to_ball_distance = parameters.get("move_base/BBPlanner/orient_to_goal_distance", 1)
+        # Cost-to-go field from the ball approach point, used for the time to ball estimation
+        self.time_to_ball_mode = self._blackboard.config.get('time_to_ball_mode', 'straight_line')
+        self.ball_distance_field = None  # type: np.ndarray
+        self._ball_distance_field_key = None
+        self._ball_distance_field_goal = None  # type: np.ndarray
+        self._ball_distance_field_time = 0.0
+        # costmap changes (e.g. every obstacle message) and small movements of the approach point
+        # recompute the field at most with this period (seconds)
+        self.ball_distance_field_period = self._blackboard.config.get('time_to_ball_field_period', 0.5)
+        # movements of the approach point (meters) above which the field is recomputed immediately
+        self.ball_distance_field_goal_threshold = self._blackboard.config.get('time_to_ball_field_goal_threshold', 0.3)
+        self._grid_edges = None
+        # Time to ball estimation based on plans of the global planner
+        self.plan_service = None  # type: rospy.ServiceProxy
+        self._plan_executor = None  # type: ThreadPoolExecutor
+        self._plan_future = None
+        self._plan_future_key = None
+        self._plan_cache = {}  # quantized start and goal pose -> (time of the estimation, time to ball)
+        self.plan_cache_resolution = self._blackboard.config.get('time_to_ball_plan_cache_resolution', 0.1)
+        self.plan_cache_ttl = rospy.Duration(self._blackboard.config.get('time_to_ball_remember_time', 1.0))
+        # In process planner on the costmap for close targets
+        self.local_planner = GridPlanner(self._blackboard.config.get('local_planner_max_expansions', 4000))
+        self.local_planner_max_distance = self._blackboard.config.get('local_planner_max_distance', 0.0)
+        self._local_planner_weights = None
+        self._local_planner_weights_version = None
+        self._local_path_key = None
+        self._local_path = None
+        # Metrics of the local planner queries in the behavior loop
+        self.local_plans = 0
+        self.local_plan_duration_sum = 0.0
+        self.local_plan_max_duration = 0.0
+        self.last_local_plan_duration = None  # type: float
+        # Approach of close goals along local paths instead of move_base
+        self.local_approach_enabled = self._blackboard.config.get('local_approach', False)
+        self.local_approach_active = False
+        # Pose servo for the final approach, which bypasses move_base
+        self.direct_approach_radius = self._blackboard.config.get('direct_approach_radius', 0.0)
+        self.direct_approach_active = False
+        self.direct_approach_reached = False
+        # tick of the behavior in which the direct approach last reached its goal
+        self.direct_approach_reached_tick = None  # type: int
+        self.direct_approach_start_time = None  # type: rospy.Time
+        self.last_direct_approach_duration = None  # type: float
+        # Cache of the 'optimal' approach angle
+        self._optimal_approach_key = None
+        self._optimal_approach_angle = None
 
     def publish(self, msg):
         # type: (PoseStamped) -> None
-        self.status = -1
         map_goal = self.transform_goal_to_map(msg)
         if map_goal:
+            if not self.is_new_goal(map_goal):
+                self.goals_suppressed += 1
+                return
+            self.status = -1
+            self.direct_approach_active = False
+            self.direct_approach_reached = False
+            self.local_approach_active = False
             self.goal = map_goal
+            self.last_goal_sent_time = rospy.Time.now()
+            self.goals_sent += 1
             self.pathfinding_pub.publish(self.fix_rotation(map_goal))
+            # the new goal has to be canceled again
+            self.pathfinding_cancel_pub.invalidate()
+
+    def is_new_goal(self, map_goal):
+        # type: (PoseStamped) -> bool
+        """
+        Returns whether the given goal differs enough from the last sent goal to be sent to move_base.
+        Every goal change makes move_base replan, so small changes are suppressed.
+
+        :param map_goal: The goal in the map frame
+        """
+        if self.goal is None or self.last_goal_sent_time is None:
+            return True
+        # Retry an aborted goal even if it did not change
+        if self.status == GoalStatus.ABORTED:
+            return True
+        if self.goal_refresh_period > rospy.Duration(0) and \
+                rospy.Time.now() - self.last_goal_sent_time > self.goal_refresh_period:
+            return True
+        position_diff = math.hypot(map_goal.pose.position.x - self.goal.pose.position.x,
+                                   map_goal.pose.position.y - self.goal.pose.position.y)
+        if position_diff > self.position_threshold:
+            return True
+        new_theta = euler_from_quaternion(numpify(map_goal.pose.orientation))[2]
+        old_theta = euler_from_quaternion(numpify(self.goal.pose.orientation))[2]
+        orientation_diff = abs((new_theta - old_theta + math.pi) % math.tau - math.pi)
+        return math.degrees(orientation_diff) > self.orientation_threshold
+
+    def get_goal_publish_stats(self):
+        """
+        Returns how many goals were sent to move_base and how many were suppressed because they did not change enough
+        """
+        return {'sent': self.goals_sent, 'suppressed': self.goals_suppressed}
 
     def transform_goal_to_map(self, msg):
         # type: (PoseStamped) -> PoseStamped
@@ -77,6 +177,11 @@ class PathfindingCapsule:
         self.current_pose = msg.feedback.base_position
 
     def status_callback(self, msg):
+        # move_base stamps a goal when it receives it, so a result of a goal from before the last sent one is stale
+        goal_stamp = msg.status.goal_id.stamp
+        if self.last_goal_sent_time is not None and not goal_stamp.is_zero() and \
+                goal_stamp < self.last_goal_sent_time:
+            return
         self.status = msg.status.status
 
     def get_goal(self):
@@ -88,15 +193,22 @@ class PathfindingCapsule:
 
     def cancel_goal(self):
         self.pathfinding_cancel_pub.publish(GoalID())
+        # The next goal needs to be sent even if it equals the canceled one,
+        # and the status of the canceled goal must not be taken for the status of the next one
+        self.last_goal_sent_time = None
+        self.status = -1
 
     def cmd_vel_cb(self, msg: Twist):
         self.current_cmd_vel = msg
+        # someone else commanded the walking, so the stop command has to be sent again
+        if not self.stop_walk_pub.is_last_message(msg):
+            self.stop_walk_pub.invalidate()
 
     def stop_walk(self):
         # send special command to walking to stop it
         msg = Twist()
         msg.angular.x = -1.0
-        self.direct_cmd_vel_pub.publish(msg)
+        self.stop_walk_pub.publish(msg)
 
     def calculate_time_to_ball(self):
         # only send new request if previous request is finished or first update
@@ -105,10 +217,21 @@ class PathfindingCapsule:
                 self._blackboard.world_model.localization_precision_in_threshold():
             ball_target = self.get_ball_goal('map_goal', self._blackboard.config['ball_approach_dist'])
             own_position = self._blackboard.world_model.get_current_position_pose_stamped()
-            self._blackboard.team_data.own_time_to_ball = self.time_to_ball_from_poses(own_position, ball_target)
+            if self.time_to_ball_mode == 'distance_field':
+                self.update_ball_distance_field(ball_target)
+                team_data = self._blackboard.team_data
+                team_data.own_time_to_ball = self.time_to_ball_from_distance_field(own_position, ball_target)
+                # the teammates are ranked with the same field, so all robots are compared consistently
+                team_data.set_field_times_to_ball(self.times_to_ball_for_poses(
+                    team_data.get_extrapolated_state()[0], team_data.robot_orientations, ball_target))
+            elif self.time_to_ball_mode == 'path':
+                self._blackboard.team_data.own_time_to_ball = self.time_to_ball_from_plan(own_position, ball_target)
+            else:
+                self._blackboard.team_data.own_time_to_ball = self.time_to_ball_from_poses(own_position, ball_target)
         else:
             # since we can not get a reasonable estimate, we are lost and set the time_to_ball to a very high value
             self._blackboard.team_data.own_time_to_ball = 9999.0
+            self._blackboard.team_data.set_field_times_to_ball(None)
             return None
 
     def time_to_ball_from_poses(self, own_pose: PoseStamped, goal_pose: PoseStamped):
@@ -138,6 +261,490 @@ class PathfindingCapsule:
                          start_theta_cost + goal_theta_cost
         return total_cost
 
+    def update_ball_distance_field(self, ball_target: PoseStamped):
+        """
+        Calculates the cost-to-go field from the ball approach point over the costmap grid.
+        Every cell contains the estimated time (without turning) to walk from this cell to the approach point.
+        The field is recalculated immediately if the approach point moved more than time_to_ball_field_goal_threshold.
+        Smaller movements and changes of the costmap, e.g. with every obstacle message, only recalculate it
+        after time_to_ball_field_period, as dijkstra over the whole costmap is too expensive for every tick.
+
+        :param ball_target: The ball approach pose in the map frame
+        """
+        world_model = self._blackboard.world_model
+        goal = np.array([ball_target.pose.position.x, ball_target.pose.position.y])
+        goal_idx = world_model.field_2_costmap_coord(*goal)
+        key = (goal_idx, world_model.costmap_version)
+        if self._ball_distance_field_key is not None:
+            goal_moved = np.linalg.norm(goal - self._ball_distance_field_goal) > self.ball_distance_field_goal_threshold
+            period_passed = time.monotonic() - self._ball_distance_field_time >= self.ball_distance_field_period
+            if not goal_moved and (key == self._ball_distance_field_key or not period_passed):
+                return
+        # imported here, because scipy.sparse is only needed once the time to ball is calculated
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import dijkstra
+        obstacle_map = world_model.obstacle_map
+        if self._grid_edges is None or self._grid_edges[0] != obstacle_map.shape:
+            # the costmap covers the field and the margin
+            cell_size = (world_model.field_length + 2 * world_model.map_margin) / obstacle_map.shape[0]
+            self._grid_edges = (obstacle_map.shape,) + self._build_grid_edges(obstacle_map.shape, cell_size)
+        shape, sources, targets, lengths = self._grid_edges
+        # Walking through obstacles is more expensive, the cost of an edge is the mean of both cells
+        cell_weights = 1 + self._blackboard.config['time_to_ball_obstacle_weight'] * obstacle_map.ravel()
+        weights = lengths * (cell_weights[sources] + cell_weights[targets]) / 2 * \
+            self._blackboard.config['time_to_ball_cost_per_meter']
+        graph = coo_matrix((weights, (sources, targets)), shape=(obstacle_map.size, obstacle_map.size)).tocsr()
+        field = dijkstra(graph, directed=False, indices=np.ravel_multi_index(goal_idx, shape))
+        self.ball_distance_field = field.reshape(shape)
+        self._ball_distance_field_key = key
+        self._ball_distance_field_goal = goal
+        self._ball_distance_field_time = time.monotonic()
+
+    @staticmethod
+    def _build_grid_edges(shape, cell_size):
+        """
+        Builds the edges of an 8-connected grid graph with the given shape.
+        Only one direction of each edge is created, as the graph is undirected.
+
+        :param cell_size: Edge length of a grid cell in meters
+        :return: The flat source indices, the flat target indices and the edge lengths in meters
+        """
+        indices = np.arange(shape[0] * shape[1]).reshape(shape)
+        sources, targets, lengths = [], [], []
+        for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)):
+            source = indices[max(0, -dx):shape[0] - max(0, dx), max(0, -dy):shape[1] - max(0, dy)]
+            target = indices[max(0, dx):shape[0] - max(0, -dx), max(0, dy):shape[1] - max(0, -dy)]
+            sources.append(source.ravel())
+            targets.append(target.ravel())
+            lengths.append(np.full(source.size, math.hypot(dx, dy) * cell_size))
+        return np.concatenate(sources), np.concatenate(targets), np.concatenate(lengths)
+
+    def time_to_ball_from_distance_field(self, own_pose: PoseStamped, goal_pose: PoseStamped):
+        """
+        Estimates the time to reach the ball approach pose using the cost-to-go field.
+        The field has to be updated beforehand using update_ball_distance_field.
+        This is a constant time lookup and can therefore also be used for the poses of teammates.
+
+        :param own_pose: The pose of the robot in the map frame
+        :param goal_pose: The ball approach pose in the map frame
+        """
+        if self.ball_distance_field is None:
+            return self.time_to_ball_from_poses(own_pose, goal_pose)
+        return self.times_to_ball_for_poses(
+            np.array([[own_pose.pose.position.x, own_pose.pose.position.y]]),
+            np.array([numpify(own_pose.pose.orientation)]), goal_pose)[0]
+
+    def times_to_ball_for_poses(self, positions, orientations, goal_pose: PoseStamped):
+        """
+        Estimates the time to ball for multiple robots (e.g. the teammates) using the cost-to-go field,
+        see time_to_ball_from_distance_field
+
+        :param positions: Array of shape (n, 2) with the positions in the map frame
+        :param orientations: Array of shape (n, 4) with the orientations as quaternions
+        :param goal_pose: The ball approach pose in the map frame
+        :return: Array of the estimated times in the same order as the positions
+        """
+        if self.ball_distance_field is None:
+            return np.array([self.time_to_ball_from_poses(
+                PoseStamped(pose=Pose(Point(x, y, 0), Quaternion(*orientation))), goal_pose)
+                for (x, y), orientation in zip(positions.tolist(), orientations.tolist())])
+        config = self._blackboard.config
+        idx_x, idx_y = self._blackboard.world_model.field_2_costmap_coords(positions[:, 0], positions[:, 1])
+        path_costs = self.ball_distance_field[idx_x, idx_y]
+        qx, qy, qz, qw = np.asarray(orientations, dtype=float).T
+        start_thetas = np.arctan2(2 * (qw * qz + qx * qy), 1 - 2 * (qy ** 2 + qz ** 2))
+        goal_theta = euler_from_quaternion(numpify(goal_pose.pose.orientation))[2]
+        to_goal = np.array([goal_pose.pose.position.x, goal_pose.pose.position.y]) - positions
+        path_lengths = np.hypot(to_goal[:, 0], to_goal[:, 1])
+        # the path starts in the direction of the steepest descent of the field, i.e. to the neighbor cell
+        # with the lowest cost (the first one in row-major order on ties, the cell itself at the goal)
+        padded = np.pad(self.ball_distance_field, 1, constant_values=np.inf)
+        offsets = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+        neighbors = padded[idx_x[:, None] + 1 + offsets[:, 0], idx_y[:, None] + 1 + offsets[:, 1]]
+        steps = offsets[np.argmin(neighbors, axis=1)]
+        path_thetas = np.arctan2(steps[:, 1], steps[:, 0])
+        start_theta_diffs = np.abs((start_thetas - path_thetas + math.pi) % math.tau - math.pi)
+        # the path ends approximately in the direction of the straight line to the goal
+        end_thetas = np.arctan2(to_goal[:, 1], to_goal[:, 0])
+        goal_theta_diffs = np.abs((goal_theta - end_thetas + math.pi) % math.tau - math.pi)
+        times = path_costs + \
+            start_theta_diffs * config['time_to_ball_cost_start_angle'] + \
+            goal_theta_diffs * config['time_to_ball_cost_goal_angle']
+        # if the robot is close to the ball it does not turn to walk to it
+        start_goal_theta_diffs = np.abs((start_thetas - goal_theta + math.pi) % math.tau - math.pi)
+        close = path_lengths < self.orient_to_ball_distance
+        times[close] = path_costs[close] + \
+            start_goal_theta_diffs[close] * config['time_to_ball_cost_start_to_goal_angle']
+        return times
+
+    def time_to_ball_from_plan(self, own_pose: PoseStamped, goal_pose: PoseStamped):
+        """
+        Estimates the time to reach the goal pose based on a plan of the global planner.
+        The planner is called asynchronously with at most one request in flight, so this never blocks.
+        Results are cached by the quantized start and goal poses. As long as no plan is available
+        for the current poses, the straight line estimation is used instead.
+
+        :param own_pose: The pose of the robot in the map frame
+        :param goal_pose: The goal pose in the map frame
+        """
+        now = rospy.Time.now()
+        # Evict old results
+        self._plan_cache = {key: value for key, value in self._plan_cache.items()
+                            if now - value[0] < self.plan_cache_ttl}
+
+        # Collect the result of a finished request
+        if self._plan_future is not None and self._plan_future.done():
+            try:
+                self._plan_cache[self._plan_future_key] = (now, self._plan_future.result())
+            except Exception as e:
+                rospy.logwarn_throttle(5, f"Could not get a plan to estimate the time to ball: {e}")
+            self._plan_future = None
+
+        # Close targets are planned in process, which is faster than a round trip to the planner
+        local_path = self.plan_local_path(goal_pose, own_pose)
+        if local_path is not None:
+            return self.time_to_ball_from_path(own_pose, goal_pose, local_path)
+
+        key = self._quantize_poses(own_pose, goal_pose)
+        if key in self._plan_cache:
+            return self._plan_cache[key][1]
+
+        # Only request a new plan if the previous request is finished
+        if self._plan_future is None:
+            if self._plan_executor is None:
+                self._plan_executor = ThreadPoolExecutor(max_workers=1)
+                self.plan_service = rospy.ServiceProxy(
+                    self._blackboard.config.get('time_to_ball_plan_service', 'move_base/NavfnROS/make_plan'), GetPlan)
+            request = GetPlanRequest(start=own_pose, goal=goal_pose)
+            self._plan_future = self._plan_executor.submit(self._request_plan_time_to_ball, request)
+            self._plan_future_key = key
+        return self.time_to_ball_from_poses(own_pose, goal_pose)
+
+    def _quantize_poses(self, own_pose: PoseStamped, goal_pose: PoseStamped):
+        """
+        Returns a hashable key for the start and goal pose, rounded to the plan cache resolution
+        """
+        key = []
+        for pose in (own_pose, goal_pose):
+            theta = euler_from_quaternion(numpify(pose.pose.orientation))[2]
+            key.extend((round(pose.pose.position.x / self.plan_cache_resolution),
+                        round(pose.pose.position.y / self.plan_cache_resolution),
+                        # roughly the same resolution for the orientation as for the position at one meter distance
+                        round(theta / self.plan_cache_resolution)))
+        return tuple(key)
+
+    def _request_plan_time_to_ball(self, request: GetPlanRequest):
+        """
+        Requests a plan from the global planner and estimates the time to walk along it.
+        This runs in the plan executor thread.
+        """
+        plan = self.plan_service(request).plan
+        if len(plan.poses) < 2:
+            # No plan found, fall back to the straight line estimation
+            return self.time_to_ball_from_poses(request.start, request.goal)
+        points = np.array([[p.pose.position.x, p.pose.position.y] for p in plan.poses])
+        return self.time_to_ball_from_path(request.start, request.goal, points)
+
+    def time_to_ball_from_path(self, own_pose: PoseStamped, goal_pose: PoseStamped, points: np.ndarray):
+        """
+        Estimates the time to walk along the given path based on its length and heading changes
+
+        :param own_pose: The pose of the robot in the map frame
+        :param goal_pose: The goal pose in the map frame
+        :param points: Array of shape (n, 2) with the positions along the path from the robot to the goal
+        """
+        segment_lengths = np.linalg.norm(np.diff(points, axis=0), axis=1)
+        path_length = segment_lengths.sum()
+        if path_length < self.orient_to_ball_distance:
+            # if the robot is close to the ball it does not turn to walk to it
+            return self.time_to_ball_from_poses(own_pose, goal_pose)
+        # resample the path to get rid of the zig-zag of grid based planners
+        cumulative_length = np.concatenate(([0], np.cumsum(segment_lengths)))
+        sample_distances = np.append(np.arange(0, path_length, 0.25), path_length)
+        samples = np.stack((np.interp(sample_distances, cumulative_length, points[:, 0]),
+                            np.interp(sample_distances, cumulative_length, points[:, 1])), axis=1)
+        sample_directions = np.diff(samples, axis=0)
+        headings = np.arctan2(sample_directions[:, 1], sample_directions[:, 0])
+        heading_changes = np.abs((np.diff(headings) + math.pi) % math.tau - math.pi).sum()
+
+        start_theta = euler_from_quaternion(numpify(own_pose.pose.orientation))[2]
+        goal_theta = euler_from_quaternion(numpify(goal_pose.pose.orientation))[2]
+        start_theta_diff = abs((start_theta - headings[0] + math.pi) % math.tau - math.pi)
+        goal_theta_diff = abs((goal_theta - headings[-1] + math.pi) % math.tau - math.pi)
+        return path_length * self._blackboard.config['time_to_ball_cost_per_meter'] + \
+            start_theta_diff * self._blackboard.config['time_to_ball_cost_start_angle'] + \
+            heading_changes * self._blackboard.config['time_to_ball_cost_path_angle'] + \
+            goal_theta_diff * self._blackboard.config['time_to_ball_cost_goal_angle']
+
+    def plan_local_path(self, goal_pose: PoseStamped, own_pose: PoseStamped = None):
+        """
+        Plans a path to a close goal directly on the costmap of the world model.
+        The last path is reused while the start cell, the goal cell and the costmap do not change.
+
+        :param goal_pose: The goal pose in the map frame
+        :param own_pose: The pose of the robot in the map frame, the current position is used if not given
+        :return: Array of shape (n, 2) with the waypoints in the map frame from the robot to the goal or
+            None if the goal is further away than local_planner_max_distance or the position is unknown
+        """
+        if own_pose is None:
+            own_pose = self._blackboard.world_model.get_current_position_pose_stamped()
+            if own_pose is None:
+                return None
+        start = np.array([own_pose.pose.position.x, own_pose.pose.position.y])
+        goal = np.array([goal_pose.pose.position.x, goal_pose.pose.position.y])
+        if np.linalg.norm(goal - start) > self.local_planner_max_distance:
+            return None
+
+        world_model = self._blackboard.world_model
+        start_cell = world_model.field_2_costmap_coord(*start)
+        goal_cell = world_model.field_2_costmap_coord(*goal)
+        key = (start_cell, goal_cell, world_model.costmap_version)
+        if key != self._local_path_key:
+            begin = time.perf_counter()
+            if self._local_planner_weights_version != world_model.costmap_version:
+                self._local_planner_weights = \
+                    1 + self._blackboard.config['time_to_ball_obstacle_weight'] * world_model.obstacle_map
+                self._local_planner_weights_version = world_model.costmap_version
+            self._local_path = self.local_planner.plan(self._local_planner_weights, start_cell, goal_cell)
+            self._local_path_key = key
+            self.last_local_plan_duration = time.perf_counter() - begin
+            self.local_plans += 1
+            self.local_plan_duration_sum += self.last_local_plan_duration
+            self.local_plan_max_duration = max(self.local_plan_max_duration, self.last_local_plan_duration)
+        path = self._local_path
+        points = np.array([world_model.costmap_2_field_coord(*cell) for cell in path])
+        # use the exact positions instead of the cell centers for the start and the goal
+        points[0] = start
+        if len(points) > 1 and path[-1] == goal_cell:
+            points[-1] = goal
+        return points
+
+    def get_local_plan_stats(self):
+        """
+        Returns the number of local planner queries in the behavior loop and their mean and maximal duration
+        """
+        return {'plans': self.local_plans,
+                'mean_duration': self.local_plan_duration_sum / self.local_plans if self.local_plans else 0.0,
+                'max_duration': self.local_plan_max_duration}
+
+    def use_local_approach(self, goal: PoseStamped):
+        """
+        Returns whether the goal is close enough to be approached along a path of the local planner
+        instead of move_base
+        """
+        if not self.local_approach_enabled or self.local_planner_max_distance <= 0:
+            return False
+        relative_goal = self.transform_goal_to_base_footprint(goal)
+        if relative_goal is None:
+            return self.local_approach_active
+        if math.hypot(relative_goal[0], relative_goal[1]) > self.local_planner_max_distance:
+            self.local_approach_active = False
+        else:
+            self.local_approach_active = True
+        return self.local_approach_active
+
+    def local_approach(self, goal: PoseStamped):
+        """
+        Drives the robot to a close goal along a path of the local planner by steering towards its next waypoint
+        with velocity commands, so the approach does not go through move_base. The last waypoint is approached
+        with the goal orientation.
+
+        :param goal: The goal pose, e.g. the ball approach pose
+        :return: True if the goal is reached
+        """
+        config = self._blackboard.config
+        # move_base should not interfere with the direct commands, canceling is only published once
+        self.cancel_goal()
+        map_goal = self.transform_goal_to_map(goal)
+        if map_goal is None:
+            return False
+        points = self.plan_local_path(map_goal)
+        if points is None:
+            return False
+        if len(points) > 2:
+            # head towards the next waypoint
+            waypoint = PoseStamped()
+            waypoint.header.frame_id = self.map_frame
+            waypoint.pose.position = Point(points[1][0], points[1][1], 0)
+            direction = points[1] - points[0]
+            waypoint.pose.orientation = Quaternion(*quaternion_from_euler(0, 0, math.atan2(direction[1], direction[0])))
+            relative_waypoint = self.transform_goal_to_base_footprint(waypoint)
+            if relative_waypoint is None:
+                return False
+            self.servo_to(*relative_waypoint, config['local_approach_max_speed_x'],
+                          config['local_approach_max_speed_y'], config['local_approach_max_speed_yaw'])
+            return False
+
+        relative_goal = self.transform_goal_to_base_footprint(map_goal)
+        if relative_goal is None:
+            return False
+        x, y, yaw = relative_goal
+        if math.hypot(x, y) < config['direct_approach_position_tolerance'] and \
+                abs(yaw) < config['direct_approach_orientation_tolerance']:
+            self.direct_cmd_vel_pub.publish(Twist())
+            return True
+        self.servo_to(x, y, yaw, config['local_approach_max_speed_x'],
+                      config['local_approach_max_speed_y'], config['local_approach_max_speed_yaw'])
+        return False
+
+    def transform_goal_to_base_footprint(self, msg: PoseStamped):
+        """
+        Transforms a goal into the base_footprint frame using the newest transform
+
+        :return: x, y and yaw of the goal relative to the robot or None if the transform failed
+        """
+        base_footprint_frame = self._blackboard.world_model.base_footprint_frame
+        if msg.header.frame_id != base_footprint_frame:
+            try:
+                msg.header.stamp = rospy.Time(0)
+                msg = self.tf_buffer.transform(msg, base_footprint_frame, timeout=rospy.Duration(0.05))
+            except (tf2_ros.ConnectivityException, tf2_ros.LookupException, tf2_ros.ExtrapolationException) as e:
+                rospy.logwarn(e)
+                return None
+        yaw = euler_from_quaternion(numpify(msg.pose.orientation))[2]
+        return msg.pose.position.x, msg.pose.position.y, yaw
+
+    def use_direct_approach(self, goal: PoseStamped):
+        """
+        Returns whether the goal is close enough to be approached directly using the pose servo.
+        Once active, the direct approach is kept until the goal is further away than twice the radius.
+        """
+        if self.direct_approach_radius <= 0:
+            return False
+        relative_goal = self.transform_goal_to_base_footprint(goal)
+        if relative_goal is None:
+            return self.direct_approach_active
+        distance = math.hypot(relative_goal[0], relative_goal[1])
+        if self.direct_approach_active and distance > 2 * self.direct_approach_radius:
+            self.direct_approach_active = False
+            self.direct_approach_reached = False
+        return self.direct_approach_active or distance < self.direct_approach_radius
+
+    def direct_approach(self, goal: PoseStamped):
+        """
+        Drives the robot to a close goal by publishing velocities directly, similar to the DribbleForward action.
+        The goal should be recomputed each tick from the current ball position.
+
+        :param goal: The goal pose, e.g. the ball approach pose
+        :return: True if the goal is reached
+        """
+        config = self._blackboard.config
+        if not self.direct_approach_active:
+            # move_base should not interfere with the direct commands
+            self.cancel_goal()
+            self.direct_approach_active = True
+            self.direct_approach_reached = False
+            self.direct_approach_start_time = rospy.Time.now()
+
+        relative_goal = self.transform_goal_to_base_footprint(goal)
+        if relative_goal is None:
+            return False
+        x, y, yaw = relative_goal
+
+        if math.hypot(x, y) < config['direct_approach_position_tolerance'] and \
+                abs(yaw) < config['direct_approach_orientation_tolerance']:
+            if not self.direct_approach_reached:
+                self.last_direct_approach_duration = (rospy.Time.now() - self.direct_approach_start_time).to_sec()
+                rospy.logdebug(f"Direct approach took {self.last_direct_approach_duration:.3f} s")
+                self.direct_approach_reached = True
+            self.direct_approach_reached_tick = self._blackboard.scheduler.ticks
+            self.direct_cmd_vel_pub.publish(Twist())
+            return True
+
+        self.servo_to(x, y, yaw, config['direct_approach_max_speed_x'], config['direct_approach_max_speed_y'],
+                      config['direct_approach_max_speed_yaw'])
+        return False
+
+    def direct_approach_reached_recently(self):
+        """
+        Returns whether the direct approach reached its goal in this or the previous tick.
+        Decisions are evaluated before the action, so the previous tick is the last one in which it could be reached.
+        """
+        return self.direct_approach_reached_tick is not None and \
+            self.direct_approach_reached_tick >= self._blackboard.scheduler.ticks - 1
+
+    def servo_to(self, x, y, yaw, max_speed_x, max_speed_y, max_speed_yaw):
+        """
+        Publishes a velocity command towards a pose relative to the robot with the p factors of the direct approach.
+        The velocity commands are streamed, so the behavior keeps ticking with the maximal rate while servoing.
+        """
+        config = self._blackboard.config
+        cmd_vel = Twist()
+        cmd_vel.linear.x = np.clip(x * config['direct_approach_p_xy'], -max_speed_x, max_speed_x)
+        cmd_vel.linear.y = np.clip(y * config['direct_approach_p_xy'], -max_speed_y, max_speed_y)
+        cmd_vel.angular.z = np.clip(yaw * config['direct_approach_p_yaw'], -max_speed_yaw, max_speed_yaw)
+        self.direct_cmd_vel_pub.publish(cmd_vel)
+        self._blackboard.scheduler.notify()
+
+    def get_optimal_approach_angle(self, distance):
+        """
+        Chooses the approach angle to the ball from a ring of candidate angles around it.
+        Each candidate is scored by the estimated time to reach its approach pose
+        plus the cost of a kick from there in the approach direction.
+        The candidates are evaluated in vectorized batches, ordered by their difference to the direction
+        to the opponent goal, until the time budget is used up. The result is cached until the ball,
+        the robot pose or the costmap change.
+
+        :param distance: Distance of the approach pose to the ball
+        :return: The approach angle in the map frame
+        """
+        world_model = self._blackboard.world_model
+        config = self._blackboard.config
+        ball_x, ball_y = world_model.get_ball_position_xy()
+        goal_direction = world_model.get_map_based_opp_goal_angle_from_ball()
+        own_position = world_model.get_current_position()
+        if own_position is None:
+            return goal_direction
+        own_x, own_y, own_theta = own_position
+
+        # the resolution of the costmap is good enough to detect relevant changes
+        key = (round(ball_x * 10), round(ball_y * 10), round(own_x * 10), round(own_y * 10), round(own_theta * 10),
+               world_model.costmap_version, distance)
+        if key == self._optimal_approach_key:
+            return self._optimal_approach_angle
+
+        deadline = time.monotonic() + config['approach_time_budget']
+        num_candidates = config['approach_num_candidates']
+        offsets = np.linspace(-math.pi, math.pi, num_candidates, endpoint=False)
+        candidates = goal_direction + offsets[np.argsort(np.abs(offsets))]
+
+        best_angle = goal_direction
+        best_score = np.inf
+        for batch in np.array_split(candidates, max(1, num_candidates // 8)):
+            approach_x = ball_x - np.cos(batch) * distance
+            approach_y = ball_y - np.sin(batch) * distance
+            scores = self._times_to_approach_poses(own_x, own_y, own_theta, approach_x, approach_y, batch) + \
+                config['approach_kick_cost_weight'] * world_model.get_cost_of_kicks(
+                    ball_x, ball_y, batch, config['kick_cost_kick_length'], config['kick_cost_angular_range'])
+            best = np.argmin(scores)
+            if scores[best] < best_score:
+                best_score = scores[best]
+                best_angle = float(batch[best])
+            if time.monotonic() > deadline:
+                break
+
+        self._optimal_approach_key = key
+        self._optimal_approach_angle = best_angle
+        return best_angle
+
+    def _times_to_approach_poses(self, own_x, own_y, own_theta, goal_x, goal_y, goal_theta):
+        """
+        Vectorized version of time_to_ball_from_poses for multiple goal poses and a single start pose.
+        """
+        config = self._blackboard.config
+        path_length = np.hypot(goal_x - own_x, goal_y - own_y)
+        path_theta = np.arctan2(goal_y - own_y, goal_x - own_x)
+        start_goal_theta_diff = np.abs((own_theta - goal_theta + math.pi) % math.tau - math.pi)
+        start_theta_diff = np.abs((own_theta - path_theta + math.pi) % math.tau - math.pi)
+        goal_theta_diff = np.abs((goal_theta - path_theta + math.pi) % math.tau - math.pi)
+        # if the robot is close to the ball it does not turn to walk to it
+        turning_cost = np.where(
+            path_length < self.orient_to_ball_distance,
+            start_goal_theta_diff * config['time_to_ball_cost_start_to_goal_angle'],
+            start_theta_diff * config['time_to_ball_cost_start_angle'] +
+            goal_theta_diff * config['time_to_ball_cost_goal_angle'])
+        return path_length * config['time_to_ball_cost_per_meter'] + turning_cost
+
     def get_ball_goal(self, target, distance):
 
         if 'gradient_goal' == target:
@@ -163,6 +770,16 @@ class PathfindingCapsule:
 
             ball_point = (goal_x, goal_y, goal_angle, self._blackboard.map_frame)
 
+        elif 'optimal' == target:
+            goal_angle = self.get_optimal_approach_angle(distance)
+
+            ball_x, ball_y = self._blackboard.world_model.get_ball_position_xy()
+
+            goal_x = ball_x - math.cos(goal_angle) * distance
+            goal_y = ball_y - math.sin(goal_angle) * distance
+
+            ball_point = (goal_x, goal_y, goal_angle, self._blackboard.map_frame)
+
         elif 'detection_goal' == target:
 
             x_dist = self._blackboard.world_model.get_detection_based_goal_position_uv()[0] - \
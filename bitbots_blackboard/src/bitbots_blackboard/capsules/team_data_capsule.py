@@ -3,22 +3,54 @@ TeamDataCapsule
 ^^^^^^^^^^^^^^^
 """
 import math
-from collections import defaultdict
 
+import numpy as np
 import rospy
 from humanoid_league_msgs.msg import Strategy, TeamData
-from geometry_msgs.msg import PointStamped
+from geometry_msgs.msg import PointStamped, Pose, Point, Quaternion
 
 
 class TeamDataCapsule:
-    def __init__(self):
-        self.bot_id = rospy.get_param("bot_id", 1)
-        self.strategy_sender = None  # type: rospy.Publisher
-        self.time_to_ball_publisher = None  # type: rospy.Publisher
-        # indexed with one to match robot ids
-        self.team_data = {}
-        for i in range(1, 7):
-            self.team_data[i] = TeamData()
+    def __init__(self, blackboard):
+        parameters = blackboard.parameters
+        self.bot_id = parameters.get("bot_id", 1)
+        # both are only published if the value changed or the heartbeat is due
+        self.strategy_sender = None  # type: ChangePublisher
+        self.time_to_ball_publisher = None  # type: ChangePublisher
+        self.team_size = parameters.get('behavior/body/team_size', 6)
+        # The state of the team is stored in columns, the row of a robot is its id minus one
+        n = self.team_size
+        self.stamps = np.zeros(n)
+        self.frame_ids = [''] * n
+        self.robot_states = np.zeros(n, dtype=int)
+        self.robot_roles = np.zeros(n, dtype=int)
+        self.robot_actions = np.zeros(n, dtype=int)
+        self.robot_positions = np.zeros((n, 2))
+        self.robot_orientations = np.tile([0.0, 0.0, 0.0, 1.0], (n, 1))
+        # x, y and theta entries of the diagonal of the pose covariance
+        self.robot_covariances = np.zeros((n, 3))
+        self.ball_positions = np.zeros((n, 2))
+        self.ball_relative_positions = np.zeros((n, 2))
+        # x/y block of the ball covariance
+        self.ball_covariances = np.zeros((n, 2, 2))
+        self.robot_times_to_ball = np.zeros(n)
+        # the values of the message before the latest one of each robot, used to estimate velocities
+        self.previous_stamps = np.zeros(n)
+        self.previous_robot_positions = np.zeros((n, 2))
+        self.previous_ball_positions = np.zeros((n, 2))
+        self.previous_robot_times_to_ball = np.zeros(n)
+        # robot positions, ball positions and times to ball extrapolated to the current time
+        # to compensate the latency of the team communication
+        self.extrapolated = (self.robot_positions, self.ball_positions, self.robot_times_to_ball)
+        self.extrapolation_time = None
+        self.team_data_version = 0  # incremented with every received message
+        # times to ball of all robots estimated with our own cost-to-go field, used for the rank instead of the
+        # reported times in the 'distance_field' mode
+        self.field_times_to_ball = None  # type: np.ndarray
+        self.field_times_version = 0
+        # rank to ball based on the time to ball, cached for the views with and without the goalie
+        self.team_rank_cache = {}
+
         self.team_strategy = dict()
         self.times_to_ball = dict()
         self.roles = {
@@ -33,28 +65,34 @@ class TeamDataCapsule:
         }
         self.own_time_to_ball = 9999.0
         self.strategy = Strategy()
-        self.strategy.role = self.roles[rospy.get_param('role')]
+        self.strategy.role = self.roles[parameters.get('role')]
         self.strategy_update = None
         self.action_update = None
         self.role_update = None
-        self.data_timeout = rospy.get_param("team_data_timeout", 2)
-        self.ball_max_covariance = rospy.get_param("ball_max_covariance", 0.5)
-        self.ball_lost_time = rospy.Duration(rospy.get_param('behavior/body/ball_lost_time', 8.0))
-        self.pose_precision_threshold = rospy.get_param('behavior/body/pose_precision_threshold', None)
+        self.data_timeout = parameters.get("team_data_timeout", 2)
+        self.ball_max_covariance = parameters.get("ball_max_covariance", 0.5)
+        self.ball_lost_time = parameters.get('behavior/body/ball_lost_time', 8.0, rospy.Duration)
+        self.pose_precision_threshold = parameters.get('behavior/body/pose_precision_threshold')
+        self.extrapolate_team_data = parameters.get('behavior/body/team_data_extrapolation', True)
+        self.max_extrapolation_time = parameters.get('behavior/body/team_data_max_extrapolation_time', 1.0)
+        self.max_extrapolation_robot_speed = parameters.get('behavior/body/team_data_max_robot_speed', 0.5)
+        self.max_extrapolation_ball_speed = parameters.get('behavior/body/team_data_max_ball_speed', 3.0)
+        self.team_rank_max_age = parameters.get('behavior/body/team_rank_max_age', 0.1)
 
-    def is_valid(self, data: TeamData):
-        return rospy.Time.now() - data.header.stamp < rospy.Duration(self.data_timeout) \
-               and data.state != TeamData.STATE_PENALIZED
+    def valid_mask(self, now=None):
+        """Returns a mask of the robots with recent data that are not penalized"""
+        if now is None:
+            now = rospy.Time.now()
+        return (now.to_sec() - self.stamps < self.data_timeout) & (self.robot_states != TeamData.STATE_PENALIZED)
 
     def get_goalie_ball_position(self):
         """Return the ball relative to the goalie
 
         :return a tuple with the relative ball and the last update time
         """
-        for data in self.team_data.values():
-            role = data.strategy.role
-            if role == Strategy.ROLE_GOALIE and self.is_valid(data):
-                return data.ball_relative.pose.position.x, data.ball_relative.pose.position.y
+        goalies = np.flatnonzero(self.valid_mask() & (self.robot_roles == Strategy.ROLE_GOALIE))
+        if len(goalies) > 0:
+            return tuple(self.ball_relative_positions[goalies[0]])
         return None
 
     def get_goalie_ball_distance(self):
@@ -70,20 +108,13 @@ class TeamDataCapsule:
 
     def is_goalie_handling_ball(self):
         """ Returns true if the goalie is going to the ball."""
-        for data in self.team_data.values():
-            if self.is_valid(data) \
-                    and data.strategy.role == Strategy.ROLE_GOALIE \
-                    and data.strategy.action in [Strategy.ACTION_GOING_TO_BALL, Strategy.ACTION_KICKING]:
-                return True
-        return False
+        return bool(np.any(self.valid_mask()
+                           & (self.robot_roles == Strategy.ROLE_GOALIE)
+                           & np.isin(self.robot_actions, [Strategy.ACTION_GOING_TO_BALL, Strategy.ACTION_KICKING])))
 
     def is_team_mate_kicking(self):
         """Returns true if one of the players in the own team is kicking."""
-        for data in self.team_data.values():
-            if self.is_valid(data) and data.strategy.action == Strategy.ACTION_KICKING:
-                return True
-
-        return False
+        return bool(np.any(self.valid_mask() & (self.robot_actions == Strategy.ACTION_KICKING)))
 
     def team_rank_to_ball(self, own_ball_distance, count_goalies=True, use_time_to_ball=False):
         """Returns the rank of this robot compared to the team robots concerning ball distance.
@@ -92,23 +123,44 @@ class TeamDataCapsule:
 
         :return the rank from 1 (nearest) to the number of robots
         """
-        distances = []
-        for data in self.team_data.values():
-            # data should not be outdated, from a robot in play, only goalie if desired,
-            # x and y covariance values should be below threshold. orientation covariance of ball does not matter
-            # covariance is a 6x6 matrix as array. 0 is x, 7 is y
-            if self.is_valid(data) and (
-                    data.strategy.role != Strategy.ROLE_GOALIE or count_goalies) \
-                    and data.ball_absolute.covariance[0] < self.ball_max_covariance \
-                    and data.ball_absolute.covariance[7] < self.ball_max_covariance:
-                if use_time_to_ball:
-                    distances.append(data.time_to_position_at_ball)
-                else:
-                    distances.append(self.get_robot_ball_euclidian_distance(data))
-        for rank, distance in enumerate(sorted(distances)):
-            if own_ball_distance < distance:
-                return rank + 1
-        return len(distances) + 1
+        # data should not be outdated, from a robot in play, only goalie if desired,
+        # x and y covariance values should be below threshold. orientation covariance of ball does not matter
+        mask = self.valid_mask() \
+            & (self.ball_covariances[:, 0, 0] < self.ball_max_covariance) \
+            & (self.ball_covariances[:, 1, 1] < self.ball_max_covariance)
+        if not count_goalies:
+            mask &= self.robot_roles != Strategy.ROLE_GOALIE
+        robot_positions, ball_positions, times_to_ball = self.get_extrapolated_state()
+        if use_time_to_ball:
+            if self.field_times_to_ball is not None:
+                times_to_ball = self.field_times_to_ball
+            distances = times_to_ball[mask]
+        else:
+            distances = np.linalg.norm(ball_positions[mask] - robot_positions[mask], axis=1)
+        return int(np.count_nonzero(distances <= own_ball_distance)) + 1
+
+    def get_team_rank_to_ball(self, count_goalies=True):
+        """Returns the rank of this robot concerning the time to ball, like team_rank_to_ball with the own time to ball.
+        The rank is only recalculated if the own time to ball changes, new team data arrives or a teammate times out.
+        If the times to ball of the teammates are estimated with our distance field, they are used instead of the
+        reported ones.
+        With team data extrapolation, it is additionally recalculated after team_rank_max_age.
+
+        :return the rank from 1 (nearest) to the number of robots
+        """
+        now = rospy.Time.now()
+        key = (self.own_time_to_ball, self.team_data_version, self.field_times_version)
+        cached = self.team_rank_cache.get(count_goalies)
+        if cached is not None and cached[0] == key and now.to_sec() < cached[2]:
+            return cached[1]
+        rank = self.team_rank_to_ball(self.own_time_to_ball, count_goalies=count_goalies, use_time_to_ball=True)
+        # the result changes at the latest when the first valid teammate times out
+        valid_stamps = self.stamps[self.valid_mask(now)]
+        expiry = valid_stamps.min() + self.data_timeout if len(valid_stamps) > 0 else np.inf
+        if self.extrapolate_team_data:
+            expiry = min(expiry, now.to_sec() + self.team_rank_max_age)
+        self.team_rank_cache[count_goalies] = (key, rank, expiry)
+        return rank
 
     def get_robot_ball_euclidian_distance(self, robot_teamdata):
         ball_rel_x = robot_teamdata.ball_absolute.pose.position.x - robot_teamdata.robot_position.pose.position.x
@@ -152,18 +204,103 @@ class TeamDataCapsule:
 
     def get_active_teammate_poses(self, count_goalies=False):
         """ Returns the poses of all playing robots """
-        poses = []
-        for data in self.team_data.values():
-            if self.is_valid(data) and (data.strategy.role != Strategy.ROLE_GOALIE or count_goalies):
-                poses.append(data.robot_position.pose)
-        return poses
+        mask = self.valid_mask()
+        if not count_goalies:
+            mask &= self.robot_roles != Strategy.ROLE_GOALIE
+        robot_positions = self.get_extrapolated_state()[0]
+        return [Pose(Point(x, y, 0), Quaternion(*orientation))
+                for (x, y), orientation in zip(robot_positions[mask].tolist(), self.robot_orientations[mask].tolist())]
+
+    def set_field_times_to_ball(self, times_to_ball):
+        """
+        Sets the times to ball of all robots estimated with the own distance field, see team_rank_to_ball
+
+        :param times_to_ball: Array with one time per robot id or None to use the reported times again
+        """
+        # the version invalidates the cached rank, so it is only incremented if the times changed
+        if times_to_ball is None and self.field_times_to_ball is None:
+            return
+        if times_to_ball is not None and self.field_times_to_ball is not None and \
+                np.array_equal(times_to_ball, self.field_times_to_ball):
+            return
+        self.field_times_to_ball = times_to_ball
+        self.field_times_version += 1
 
     def get_own_time_to_ball(self):
         return self.own_time_to_ball
 
     def team_data_callback(self, msg):
+        if not 1 <= msg.robot_id <= self.team_size:
+            rospy.logwarn_throttle(5, f"Ignoring team data of robot {msg.robot_id}, the team size is {self.team_size}")
+            return
+        i = msg.robot_id - 1
         # Save team data
-        self.team_data[msg.robot_id] = msg
+        self.previous_stamps[i] = self.stamps[i]
+        self.previous_robot_positions[i] = self.robot_positions[i]
+        self.previous_ball_positions[i] = self.ball_positions[i]
+        self.previous_robot_times_to_ball[i] = self.robot_times_to_ball[i]
+
+        self.stamps[i] = msg.header.stamp.to_sec()
+        self.frame_ids[i] = msg.header.frame_id
+        self.robot_states[i] = msg.state
+        self.robot_roles[i] = msg.strategy.role
+        self.robot_actions[i] = msg.strategy.action
+        robot_pose = msg.robot_position.pose
+        self.robot_positions[i] = robot_pose.position.x, robot_pose.position.y
+        self.robot_orientations[i] = robot_pose.orientation.x, robot_pose.orientation.y, \
+            robot_pose.orientation.z, robot_pose.orientation.w
+        # covariance is a 6x6 matrix as array. 0 is x, 7 is y and 35 is theta
+        covariance = msg.robot_position.covariance
+        self.robot_covariances[i] = covariance[0], covariance[7], covariance[35]
+        self.ball_positions[i] = msg.ball_absolute.pose.position.x, msg.ball_absolute.pose.position.y
+        self.ball_relative_positions[i] = msg.ball_relative.pose.position.x, msg.ball_relative.pose.position.y
+        covariance = msg.ball_absolute.covariance
+        self.ball_covariances[i] = (covariance[0], covariance[1]), (covariance[6], covariance[7])
+        self.robot_times_to_ball[i] = msg.time_to_position_at_ball
+        self.extrapolation_time = None
+        self.team_data_version += 1
+
+    def get_extrapolated_state(self):
+        """
+        Returns the robot positions, ball positions and times to ball of all robots. They are extrapolated
+        to the current time based on the last two messages of each robot.
+        The extrapolation is cached until a new message arrives or the time has advanced noticeably.
+        """
+        if not self.extrapolate_team_data:
+            return self.robot_positions, self.ball_positions, self.robot_times_to_ball
+        now = rospy.Time.now()
+        if self.extrapolation_time is None or (now - self.extrapolation_time).to_sec() > 0.01:
+            self.extrapolated = self.calculate_extrapolated_state(now)
+            self.extrapolation_time = now
+        return self.extrapolated
+
+    def calculate_extrapolated_state(self, now):
+        """
+        Extrapolates the team state of all robots at once to the given time.
+        The age of each message is capped at team_data_max_extrapolation_time and the estimated velocities at
+        team_data_max_robot_speed and team_data_max_ball_speed. Without a usable previous message,
+        the state is assumed to be static.
+        """
+        ages = np.clip(now.to_sec() - self.stamps, 0, self.max_extrapolation_time)
+        dt = self.stamps - self.previous_stamps
+        # velocities are only estimated from two recent messages of the same robot
+        usable = (self.previous_stamps > 0) & (dt > 1e-3) & (dt < self.data_timeout)
+        dt = np.where(usable, dt, 1.0)
+
+        def extrapolate(current, last, max_speed):
+            velocity = np.where(usable[:, np.newaxis], (current - last) / dt[:, np.newaxis], 0.0)
+            speed = np.linalg.norm(velocity, axis=1)
+            velocity *= np.minimum(1.0, max_speed / np.maximum(speed, 1e-9))[:, np.newaxis]
+            return current + velocity * ages[:, np.newaxis]
+
+        robot_positions = extrapolate(self.robot_positions, self.previous_robot_positions,
+                                      self.max_extrapolation_robot_speed)
+        ball_positions = extrapolate(self.ball_positions, self.previous_ball_positions,
+                                     self.max_extrapolation_ball_speed)
+        # the time to the ball decreases at most as fast as the time passes
+        time_rates = np.where(usable, (self.robot_times_to_ball - self.previous_robot_times_to_ball) / dt, 0.0)
+        times_to_ball = np.maximum(0.0, self.robot_times_to_ball + np.clip(time_rates, -1.0, 1.0) * ages)
+        return robot_positions, ball_positions, times_to_ball
 
     def publish_strategy(self):
         """Publish for team comm"""
@@ -184,34 +321,29 @@ class TeamDataCapsule:
         """Returns true if a teammate has seen the ball accurately enough"""
         return self.get_teammate_ball() is not None
 
+    def teammate_ball_mask(self, now=None):
+        """Returns a mask of the robots that have seen the ball recently with accurate enough localization and
+        ball precision"""
+        if now is None:
+            now = rospy.Time.now()
+        return self.valid_mask(now) \
+            & (now.to_sec() - self.stamps < self.ball_lost_time.to_sec()) \
+            & (self.ball_covariances[:, 0, 0] < self.ball_max_covariance) \
+            & (self.ball_covariances[:, 1, 1] < self.ball_max_covariance) \
+            & (self.robot_covariances[:, 0] < self.pose_precision_threshold['x_sdev']) \
+            & (self.robot_covariances[:, 1] < self.pose_precision_threshold['y_sdev']) \
+            & (self.robot_covariances[:, 2] < self.pose_precision_threshold['theta_sdev'])
+
     def get_teammate_ball(self):
         """Returns the ball from the closest teammate that has accurate enough localization and ball precision"""
-        def std_dev_from_covariance(covariance):
-            x_sdev = covariance[0]  # position 0,0 in a 6x6-matrix
-            y_sdev = covariance[7]  # position 1,1 in a 6x6-matrix
-            theta_sdev = covariance[35]  # position 5,5 in a 6x6-matrix
-            return x_sdev, y_sdev, theta_sdev
-
-        best_robot_dist = 9999
-        best_ball = None
-        for robot_name, single_teamdata in self.team_data.items():
-            if not self.is_valid(single_teamdata):
-                continue
-            ball = single_teamdata.ball_absolute
-            ball_x_std_dev, ball_y_std_dev, _ = std_dev_from_covariance(ball.covariance)
-            robot = single_teamdata.robot_position
-            robot_x_std_dev, robot_y_std_dev, robot_theta_std_dev = std_dev_from_covariance(robot.covariance)
-            stamp = single_teamdata.header.stamp
-            if rospy.Time.now() - stamp < self.ball_lost_time:
-                if ball_x_std_dev < self.ball_max_covariance and ball_y_std_dev < self.ball_max_covariance:
-                    if robot_x_std_dev < self.pose_precision_threshold['x_sdev'] and \
-                            robot_y_std_dev < self.pose_precision_threshold['y_sdev'] and \
-                            robot_theta_std_dev < self.pose_precision_threshold['theta_sdev']:
-                        robot_dist = self.get_robot_ball_euclidian_distance(single_teamdata)
-                        if robot_dist < best_robot_dist:
-                            best_ball = PointStamped()
-                            best_ball.header = single_teamdata.header
-                            best_ball.point.x = single_teamdata.ball_absolute.pose.position.x
-                            best_ball.point.y = single_teamdata.ball_absolute.pose.position.y
-                            best_robot_dist = robot_dist
+        mask = self.teammate_ball_mask()
+        if not np.any(mask):
+            return None
+        robot_positions, ball_positions, _ = self.get_extrapolated_state()
+        distances = np.where(mask, np.linalg.norm(ball_positions - robot_positions, axis=1), np.inf)
+        best = int(np.argmin(distances))
+        best_ball = PointStamped()
+        best_ball.header.stamp = rospy.Time.from_sec(self.stamps[best])
+        best_ball.header.frame_id = self.frame_ids[best]
+        best_ball.point.x, best_ball.point.y = ball_positions[best]
         return best_ball
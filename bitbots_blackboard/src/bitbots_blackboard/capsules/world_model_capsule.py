@@ -3,14 +3,17 @@ WorldModelCapsule
 ^^^^^^^^^^^^^^^^^^
 
 Provides information about the world model.
+WorldModelCore only tracks the ball and the pose of the robot, WorldModelCapsule extends it with the goal,
+the team ball, the costmap and the kick evaluation.
 """
+import copy
 import math
+import threading
+import time
+from collections import namedtuple
+
 import ros_numpy
 import numpy as np
-from scipy.ndimage import gaussian_filter
-import matplotlib.pyplot as plt
-from scipy.interpolate import griddata
-from PIL import Image, ImageDraw
 
 import rospy
 import tf2_ros as tf2
@@ -23,6 +26,21 @@ from nav_msgs.msg import OccupancyGrid, MapMetaData
 from tf.transformations import euler_from_quaternion, quaternion_from_euler
 from humanoid_league_msgs.msg import PoseWithCertaintyArray, PoseWithCertainty
 import sensor_msgs.point_cloud2 as pc2
+from bitbots_blackboard.costmap_worker import CostmapWorker, obstacle_layer, pass_layer
+
+
+# Result of a kick direction evaluation. The directions are sorted by their absolute value and the costs
+# are stated in the same order. It is never modified after creation, so it can be shared between threads.
+KickEvaluation = namedtuple('KickEvaluation', ['stamp', 'best_direction', 'directions', 'costs'])
+
+# The own ball: relative to the robot, in the odom and map frame, the x/y covariance in the map frame, the time at which
+# it was seen and a version that is incremented with every change. The callbacks replace the record as a whole,
+# so the behavior never reads a partially updated ball. odom, map and map_covariance are set by WorldModelCapsule.
+BallState = namedtuple('BallState', ['relative', 'odom', 'map', 'map_covariance', 'seen_time', 'version'])
+
+# Parameters in behavior/body that the base costmap depends on
+BASE_COSTMAP_PARAMETERS = ['goalpost_safety_distance', 'keep_out_border', 'in_field_value_our_side', 'corner_value',
+                           'goalpost_value', 'goal_value', 'base_costmap_smoothing_sigma']
 
 
 class GoalRelative:
@@ -41,35 +59,267 @@ class GoalRelative:
         return p
 
 
-class WorldModelCapsule:
+class WorldModelCore:
+    """
+    The ball and pose part of the world model. It only tracks the ball relative to the robot and does not
+    build a costmap, so it is cheap enough for nodes that just need to know where the ball is, e.g. the head behavior.
+    Its parameters are read from the config of the blackboard, so the head does not need the body parameters.
+    """
     def __init__(self, blackboard):
         self._blackboard = blackboard
-        self.body_config = rospy.get_param("behavior/body")
+        self._parameters = blackboard.parameters  # type: ParameterStore
         # This pose is not supposed to be used as robot pose. Just as precision measurement for the TF position.
         self.pose = PoseWithCovarianceStamped()
         self.tf_buffer = tf2.Buffer(cache_time=rospy.Duration(30))
         self.tf_listener = tf2.TransformListener(self.tf_buffer)
 
-        self.odom_frame = rospy.get_param('~odom_frame', 'odom')
-        self.map_frame = rospy.get_param('~map_frame', 'map')
-        self.ball_frame = rospy.get_param('~ball_frame', 'ball')
-        self.base_footprint_frame = rospy.get_param('~base_footprint_frame', 'base_footprint')
-
-        self.ball = PointStamped()  # The ball in the base footprint frame
-        self.ball_odom = PointStamped()  # The ball in the odom frame (when localization is not usable)
-        self.ball_odom.header.stamp = rospy.Time(0)
-        self.ball_odom.header.frame_id = self.odom_frame
-        self.ball_map = PointStamped()  # The ball in the map frame (when localization is usable)
-        self.ball_map.header.stamp = rospy.Time(0)
-        self.ball_map.header.frame_id = self.map_frame
+        self.odom_frame = self._parameters.get('~odom_frame', 'odom')
+        self.map_frame = self._parameters.get('~map_frame', 'map')
+        self.ball_frame = self._parameters.get('~ball_frame', 'ball')
+        self.base_footprint_frame = self._parameters.get('~base_footprint_frame', 'base_footprint')
+
+        self.ball_state = BallState(relative=PointStamped(), odom=None, map=None, map_covariance=None,
+                                    seen_time=rospy.Time(0), version=0)
+        # only the writers of the ball state are serialized, the readers just take the current record
+        self.ball_lock = blackboard.locks.create('ball')
+        config = blackboard.config
+        self.ball_lost_time = rospy.Duration(config.get('ball_lost_time', 8.0))
+        self.ball_filtered = None
+        self.goal_seen_time = rospy.Time(0)
+        self.ball_seen = False
+
+        self.use_localization = config['use_localization']
+
+        self.pose_precision_threshold = config['pose_precision_threshold']
+
+    def transform_newest(self, stamped, target_frame):
+        """
+        Transforms a stamped message with the newest available transform without waiting for tf.
+        The callbacks are processed at the start of a tick, so a missing transform must not stall it.
+
+        :param stamped: A stamped message, e.g. a PointStamped, the message itself is not changed
+        :param target_frame: The frame to transform into
+        :raises: tf2.LookupException, tf2.ConnectivityException or tf2.ExtrapolationException
+        """
+        stamped = copy.copy(stamped)
+        stamped.header = Header(frame_id=stamped.header.frame_id, stamp=rospy.Time(0))
+        return self.tf_buffer.transform(stamped, target_frame, timeout=rospy.Duration(0))
+
+    ############
+    ### Ball ###
+    ############
+
+    @property
+    def ball(self):
+        """The ball in the base footprint frame"""
+        return self.ball_state.relative
+
+    @property
+    def ball_seen_time(self):
+        return self.ball_state.seen_time
+
+    @property
+    def ball_version(self):
+        """Incremented every time the own ball changes"""
+        return self.ball_state.version
+
+    def ball_seen_self(self):
+        """Returns true if we have seen the ball recently (less than ball_lost_time ago)"""
+        return rospy.Time.now() - self.ball_seen_time < self.ball_lost_time
+
+    def ball_last_seen(self):
+        """Returns the time at which the ball was last seen by ourselves"""
+        return self.ball_seen_time
+
+    def get_ball_stamped_relative(self):
+        """ Returns the ball in the base_footprint frame i.e. relative to the robot projected on the ground"""
+        return self.ball
+
+    def ball_filtered_callback(self, msg: PoseWithCovarianceStamped):
+        self.ball_filtered = msg
+
+        # When the precision is not sufficient, the ball ages.
+        x_sdev = msg.pose.covariance[0]  # position 0,0 in a 6x6-matrix
+        y_sdev = msg.pose.covariance[7]  # position 1,1 in a 6x6-matrix
+        if x_sdev > self._blackboard.config['ball_position_precision_threshold']['x_sdev'] or \
+                y_sdev > self._blackboard.config['ball_position_precision_threshold']['y_sdev']:
+            self.forget_ball(own=True, team=False, reset_ball_filter=False)
+            return
+
+        self.update_ball(PointStamped(msg.header, msg.pose.pose.position), msg)
+
+    def update_ball(self, ball_buffer, msg: PoseWithCovarianceStamped):
+        """
+        Stores a precise enough ball of the ball filter. The core only transforms it into the base footprint frame.
+
+        :param ball_buffer: The ball position as PointStamped in the frame of the message
+        :param msg: The message of the ball filter
+        """
+        try:
+            ball = self.transform_newest(ball_buffer, self.base_footprint_frame)
+        except (tf2.ConnectivityException, tf2.LookupException, tf2.ExtrapolationException) as e:
+            rospy.logwarn(e)
+            return
+        with self.ball_lock:
+            self.ball_state = self.ball_state._replace(relative=ball, seen_time=rospy.Time.now(),
+                                                       version=self.ball_state.version + 1)
+        self.ball_seen = True
+
+    def forget_ball(self, own=True, team=True, reset_ball_filter=True):
+        """
+        Forget that we saw a ball. The core only knows the own ball, see WorldModelCapsule.forget_ball
+        """
+        if own:  # Forget own ball
+            with self.ball_lock:
+                self.ball_state = self.ball_state._replace(relative=PointStamped(), seen_time=rospy.Time(0),
+                                                           version=self.ball_state.version + 1)
+
+    ###########
+    # ## Goal #
+    ###########
+
+    def goal_last_seen(self):
+        # We are currently not seeing any goal, we know where they are based
+        # on the localisation. Therefore, any_goal_last_seen returns the time
+        # from the stamp of the last position update
+        return self.goal_seen_time
+
+    ###########
+    # ## Pose #
+    ###########
+
+    def pose_callback(self, pos: PoseWithCovarianceStamped):
+        self.pose = pos
+
+    def get_current_position(self):
+        """
+        Returns the current position as determined by the localization
+        :returns x,y,theta
+        """
+        transform = self.get_current_position_transform()
+        if transform is None:
+            return None
+        orientation = transform.transform.rotation
+        theta = euler_from_quaternion([orientation.x, orientation.y, orientation.z, orientation.w])[2]
+        return transform.transform.translation.x, transform.transform.translation.y, theta
+
+    def get_current_position_pose_stamped(self) -> PoseStamped:
+        """
+        Returns the current position as determined by the localization as a PoseStamped
+        """
+        transform = self.get_current_position_transform()
+        if transform is None:
+            return None
+        ps = PoseStamped()
+        ps.header = transform.header
+        ps.pose.position.x = transform.transform.translation.x
+        ps.pose.position.y = transform.transform.translation.y
+        ps.pose.position.z = transform.transform.translation.z
+        ps.pose.orientation = transform.transform.rotation
+        return ps
+
+    def get_current_position_transform(self) -> TransformStamped:
+        """
+        Returns the current position as determined by the localization as a TransformStamped
+        """
+        try:
+            # get the most recent transform
+            transform = self.tf_buffer.lookup_transform(self.map_frame, self.base_footprint_frame, rospy.Time(0))
+        except (tf2.LookupException, tf2.ConnectivityException, tf2.ExtrapolationException) as e:
+            rospy.logwarn(e)
+            return None
+        return transform
+
+    def get_localization_precision(self):
+        """
+        Returns the current localization precision based on the covariance matrix.
+        """
+        x_sdev = self.pose.pose.covariance[0]  # position 0,0 in a 6x6-matrix
+        y_sdev = self.pose.pose.covariance[7]  # position 1,1 in a 6x6-matrix
+        theta_sdev = self.pose.pose.covariance[35]  # position 5,5 in a 6x6-matrix
+        return (x_sdev, y_sdev, theta_sdev)
+
+    def localization_precision_in_threshold(self) -> bool:
+        """
+        Returns whether the last localization precision values were in the threshold defined in the settings.
+        """
+        # Check whether we can transform into and from the map frame seconds.
+        if not self.localization_pose_current():
+            return False
+        # get the standard deviation values of the covariance matrix
+        precision = self.get_localization_precision()
+        # return whether those values are in the threshold
+        return precision[0] < self.pose_precision_threshold['x_sdev'] and \
+               precision[1] < self.pose_precision_threshold['y_sdev'] and \
+               precision[2] < self.pose_precision_threshold['theta_sdev']
+
+    def localization_pose_current(self) -> bool:
+        """
+        Returns whether we can transform into and from the map frame.
+        """
+        # if we can do this, we should be able to transform the ball
+        # (unless the localization dies in the next 0.2 seconds)
+        try:
+            t = rospy.Time.now()-rospy.Duration(0.3)
+        except TypeError as e:
+            rospy.logerr(e)
+            t = rospy.Time(0)
+        return self.tf_buffer.can_transform(self.base_footprint_frame, self.map_frame, t)   
+
+    #############
+    # ## Common #
+    #############
+
+    def get_uv_from_xy(self, x, y):
+        """ Returns the relativ positions of the robot to this absolute position"""
+        current_position = self.get_current_position()
+        x2 = x - current_position[0]
+        y2 = y - current_position[1]
+        theta = -1 * current_position[2]
+        u = math.cos(theta) * x2 + math.sin(theta) * y2
+        v = math.cos(theta) * y2 - math.sin(theta) * x2
+        return u, v
+
+    def get_xy_from_uv(self, u, v):
+        """ Returns the absolute position from the given relative position to the robot"""
+        pos_x, pos_y, theta = self.get_current_position()
+        angle = math.atan2(v, u) + theta
+        hypotenuse = math.sqrt(u ** 2 + v ** 2)
+        return pos_x + math.sin(angle) * hypotenuse, pos_y + math.cos(angle) * hypotenuse
+
+    def get_distance_to_xy(self, x, y):
+        """ Returns distance from robot to given position """
+        u, v = self.get_uv_from_xy(x, y)
+        dist = math.sqrt(u ** 2 + v ** 2)
+        return dist
+
+
+class WorldModelCapsule(WorldModelCore):
+    """
+    The full world model of the body behavior. In addition to the core, it tracks the ball in the odom and map frame,
+    the goal and the team ball and maintains the costmap with the obstacles and the kick evaluation.
+    """
+    def __init__(self, blackboard):
+        super().__init__(blackboard)
+
+        ball_odom = PointStamped()  # The ball in the odom frame (when localization is not usable)
+        ball_odom.header.stamp = rospy.Time(0)
+        ball_odom.header.frame_id = self.odom_frame
+        ball_map = PointStamped()  # The ball in the map frame (when localization is usable)
+        ball_map.header.stamp = rospy.Time(0)
+        ball_map.header.frame_id = self.map_frame
+        self.ball_state = self.ball_state._replace(odom=ball_odom, map=ball_map, map_covariance=np.eye(2))
         self.ball_teammate = PointStamped()
         self.ball_teammate.header.stamp = rospy.Time(0)
         self.ball_teammate.header.frame_id = self.map_frame
-        self.ball_lost_time = rospy.Duration(rospy.get_param('behavior/body/ball_lost_time', 8.0))
         self.ball_twist_map = None
-        self.ball_filtered = None
-        self.ball_twist_lost_time = rospy.Duration(rospy.get_param('behavior/body/ball_twist_lost_time', 2))
-        self.ball_twist_precision_threshold = rospy.get_param('behavior/body/ball_twist_precision_threshold', None)
+        self.ball_twist_lost_time = self._parameters.get('behavior/body/ball_twist_lost_time', 2, rospy.Duration)
+        self.ball_twist_precision_threshold = self._parameters.get('behavior/body/ball_twist_precision_threshold')
+        # Combination of the own ball and the balls of all teammates, weighted by their covariances
+        self.use_fused_team_ball = self.body_config['use_fused_team_ball']
+        self.fused_ball = None  # type: PointStamped
+        self.fused_ball_covariance = None  # type: np.ndarray
+        self.fused_ball_key = None
         self.reset_ball_filter = rospy.ServiceProxy('ball_filter_reset', Trigger)
 
         self.goal = GoalRelative()  # The goal in the base footprint frame
@@ -79,21 +329,15 @@ class WorldModelCapsule:
 
         self.my_data = dict()
         self.counter = 0
-        self.ball_seen_time = rospy.Time(0)
         self.ball_seen_time_teammate = rospy.Time(0)
-        self.goal_seen_time = rospy.Time(0)
-        self.ball_seen = False
         self.ball_seen_teammate = False
-        self.field_length = rospy.get_param('field_length', None)
-        self.field_width = rospy.get_param('field_width', None)
-        self.goal_width = rospy.get_param('goal_width', None)
-        self.map_margin = rospy.get_param('behavior/body/map_margin', 1.0)
-        self.obstacle_costmap_smoothing_sigma = rospy.get_param("behavior/body/obstacle_costmap_smoothing_sigma", 1.0)
-        self.obstacle_cost = rospy.get_param("behavior/body/obstacle_cost", 1.0)
-
-        self.use_localization = rospy.get_param('behavior/body/use_localization', None)
-
-        self.pose_precision_threshold = rospy.get_param('behavior/body/pose_precision_threshold', None)
+        self.field_length = self._parameters.get('field_length')
+        self.field_width = self._parameters.get('field_width')
+        self.goal_width = self._parameters.get('goal_width')
+        self.map_margin = self._parameters.get('behavior/body/map_margin', 1.0)
+        self.obstacle_costmap_smoothing_sigma = self._parameters.get(
+            "behavior/body/obstacle_costmap_smoothing_sigma", 1.0)
+        self.obstacle_cost = self._parameters.get("behavior/body/obstacle_cost", 1.0)
 
         # Publisher for visualization in RViZ
         self.ball_publisher = rospy.Publisher('debug/viz_ball', PointStamped, queue_size=1)
@@ -105,19 +349,71 @@ class WorldModelCapsule:
 
         self.base_costmap = None  # generated once in constructor field features
         self.costmap = None  # updated on the fly based on the base_costmap
+        self.obstacle_map = None  # smoothed obstacle layer of the costmap
+        self.pass_map = None  # offsets of the pass regions in the costmap
+        self.costmap_version = 0  # incremented every time the costmap changes
         self.gradient_map = None  # global heading map (static) only dependent on field structure
 
         # Calculates the base costmap and gradient map based on it
         self.calc_base_costmap()
+        self.costmap = self.base_costmap.copy()
+        self.obstacle_map = np.zeros_like(self.costmap)
+        self.costmap_version += 1
         self.calc_gradients()
+        # only the base costmap is recalculated when its parameters change, the obstacles are kept.
+        # the listener runs in the timer thread of the parameter store, so it only records the change
+        # and the base costmap is recalculated at the start of the next tick, see update_costmap
+        self.base_costmap_changed_parameters = set()
+        self.base_costmap_lock = blackboard.locks.create('base costmap')
+        self._parameters.add_listener(['behavior/body/' + name for name in BASE_COSTMAP_PARAMETERS],
+                                      self.base_costmap_parameters_changed)
+        # the obstacle and pass region layers can be maintained in a separate process, see poll_costmap_worker
+        self.costmap_worker = None  # type: CostmapWorker
+        if self.body_config['costmap_worker_process']:
+            self.costmap_worker = CostmapWorker(
+                self.base_costmap, self.obstacle_cost, self.obstacle_costmap_smoothing_sigma)
+            rospy.on_shutdown(self.costmap_worker.shutdown)
+
+        # The best kick direction is evaluated in a worker thread, so the behavior loop only reads the latest result
+        self.kick_evaluation = None  # type: KickEvaluation
+        self.kick_evaluation_max_age = rospy.Duration(self.body_config['kick_evaluation_max_age'])
+        self.kick_evaluation_rate = self.body_config['kick_evaluation_rate']
+        if self.kick_evaluation_rate <= 0:
+            rospy.logwarn(f"kick_evaluation_rate must be positive, but is {self.kick_evaluation_rate}, using 1")
+            self.kick_evaluation_rate = 1
+        self.kick_evaluation_trigger = threading.Event()
+        # can be reduced when the behavior is too slow, see BodyBlackboard.set_degradation_level
+        self.num_kick_angles = self.body_config['num_kick_angles']
+        # sample the costmap along rays instead of rasterizing each kick area
+        self.coarse_kick_cost = False
+        # publish the costmap and the used ball for debugging
+        self.debug_publishing = True
+        self.kick_evaluation_thread = threading.Thread(target=self.kick_evaluation_worker, daemon=True)
+        self.kick_evaluation_thread.start()
+
+    @property
+    def body_config(self):
+        """The cached behavior/body parameters"""
+        return self._parameters.snapshot('behavior/body')
 
     ############
     ### Ball ###
     ############
 
-    def ball_seen_self(self):
-        """Returns true if we have seen the ball recently (less than ball_lost_time ago)"""
-        return rospy.Time.now() - self.ball_seen_time < self.ball_lost_time
+    @property
+    def ball_odom(self):
+        """The ball in the odom frame (when localization is not usable)"""
+        return self.ball_state.odom
+
+    @property
+    def ball_map(self):
+        """The ball in the map frame (when localization is usable)"""
+        return self.ball_state.map
+
+    @property
+    def ball_map_covariance(self):
+        """x/y covariance of the own ball"""
+        return self.ball_state.map_covariance
 
     def ball_last_seen(self):
         """
@@ -143,50 +439,95 @@ class WorldModelCapsule:
         ball = self.get_best_ball_point_stamped()
         return ball.point.x, ball.point.y
 
-    def get_ball_stamped_relative(self):
-        """ Returns the ball in the base_footprint frame i.e. relative to the robot projected on the ground"""
-        return self.ball
+    def get_fused_ball(self):
+        """
+        Returns the inverse covariance weighted combination of the own ball and the balls of all teammates
+        in the map frame. It is only recalculated if the own ball or the team data have changed. With team data
+        extrapolation, it is additionally recalculated once per tick of the behavior for the newly extrapolated balls.
+        The ball filter is expected to publish in a frame that is aligned with the map, so the covariance is not rotated.
+
+        :return: The fused ball or None if neither we nor a teammate have seen the ball
+        """
+        ball_state = self.ball_state
+        own_valid = rospy.Time.now() - ball_state.seen_time < self.ball_lost_time
+        team_data = getattr(self._blackboard, "team_data", None)
+        if team_data is not None:
+            team_mask = team_data.teammate_ball_mask()
+            # the teammate balls are extrapolated to the current time like in the other uses of the team data
+            team_ball_positions = team_data.get_extrapolated_state()[1]
+            key = (ball_state.version, own_valid, team_data.team_data_version, team_mask.tobytes(),
+                   self._blackboard.scheduler.ticks if team_data.extrapolate_team_data else None)
+        else:
+            team_mask = None
+            key = (ball_state.version, own_valid)
+        if key == self.fused_ball_key:
+            return self.fused_ball
+
+        positions = np.empty((0, 2))
+        covariances = np.empty((0, 2, 2))
+        if own_valid:
+            positions = np.array([[ball_state.map.point.x, ball_state.map.point.y]])
+            covariances = ball_state.map_covariance[np.newaxis]
+        if team_mask is not None and np.any(team_mask):
+            positions = np.concatenate((positions, team_ball_positions[team_mask]))
+            covariances = np.concatenate((covariances, team_data.ball_covariances[team_mask]))
+
+        if len(positions) == 0:
+            self.fused_ball = None
+            self.fused_ball_covariance = None
+        else:
+            # a small regularization keeps the inversion stable for (almost) certain observations
+            information = np.linalg.inv(covariances + np.eye(2) * 1e-6)
+            self.fused_ball_covariance = np.linalg.inv(information.sum(axis=0))
+            fused_position = self.fused_ball_covariance @ np.einsum('kij,kj->i', information, positions)
+            self.fused_ball = PointStamped()
+            # zero stamp to get the newest transform when this is transformed later
+            self.fused_ball.header.stamp = rospy.Time(0)
+            self.fused_ball.header.frame_id = self.map_frame
+            self.fused_ball.point.x, self.fused_ball.point.y = fused_position
+        self.fused_ball_key = key
+        return self.fused_ball
+
+    def publish_used_ball(self, ball, source, stamp):
+        """Publishes which ball is used for debugging"""
+        if not self.debug_publishing:
+            return
+        self.used_ball_pub.publish(ball)
+        h = Header()
+        h.stamp = stamp
+        h.frame_id = source
+        self.which_ball_pub.publish(h)
 
     def get_best_ball_point_stamped(self):
         """
         Returns the best ball, either its own ball has been in the ball_lost_lost time
-        or from teammate if the robot itself has lost it and teamcom is available
+        or from teammate if the robot itself has lost it and teamcom is available.
+        If use_fused_team_ball is set, the fused ball of the team is used when we are localized.
         """
+        ball_state = self.ball_state
         if self.use_localization and self.localization_precision_in_threshold():
+            fused_ball = self.get_fused_ball() if self.use_fused_team_ball else None
+            if fused_ball is not None:
+                self.publish_used_ball(fused_ball, "fused_ball", rospy.Time.now())
+                return fused_ball
             if self.ball_seen_self() or not hasattr(self._blackboard, "team_data"):
-                self.used_ball_pub.publish(self.ball_map)
-                h = Header()
-                h.stamp = self.ball_map.header.stamp
-                h.frame_id = "own_ball_map"
-                self.which_ball_pub.publish(h)
-                return self.ball_map
+                self.publish_used_ball(ball_state.map, "own_ball_map", ball_state.map.header.stamp)
+                return ball_state.map
             else:
                 teammate_ball = self._blackboard.team_data.get_teammate_ball()
                 if teammate_ball is not None and self.tf_buffer.can_transform(self.base_footprint_frame,
                                                                               teammate_ball.header.frame_id,
                                                                               teammate_ball.header.stamp,
                                                                               timeout=rospy.Duration(0.2)):
-                    self.used_ball_pub.publish(teammate_ball)
-                    h = Header()
-                    h.stamp = teammate_ball.header.stamp
-                    h.frame_id = "teammate_ball"
-                    self.which_ball_pub.publish(h)
+                    self.publish_used_ball(teammate_ball, "teammate_ball", teammate_ball.header.stamp)
                     return teammate_ball
                 else:
                     rospy.logerr("our ball is bad but the teammates ball is worse or cant be transformed")
-                    h = Header()
-                    h.stamp = self.ball_map.header.stamp
-                    h.frame_id = "own_ball_map"
-                    self.which_ball_pub.publish(h)
-                    self.used_ball_pub.publish(self.ball_map)
-                    return self.ball_map
+                    self.publish_used_ball(ball_state.map, "own_ball_map", ball_state.map.header.stamp)
+                    return ball_state.map
         else:
-            h = Header()
-            h.stamp = self.ball_odom.header.stamp
-            h.frame_id = "own_ball_odom"
-            self.which_ball_pub.publish(h)
-            self.used_ball_pub.publish(self.ball_odom)
-            return self.ball_odom
+            self.publish_used_ball(ball_state.odom, "own_ball_odom", ball_state.odom.header.stamp)
+            return ball_state.odom
 
     def get_ball_position_uv(self):
         ball = self.get_best_ball_point_stamped()
@@ -221,31 +562,25 @@ class WorldModelCapsule:
     def get_ball_speed(self):
         raise NotImplementedError
 
-    def ball_filtered_callback(self, msg: PoseWithCovarianceStamped):
-        self.ball_filtered = msg
-
-        # When the precision is not sufficient, the ball ages.
-        x_sdev = msg.pose.covariance[0]  # position 0,0 in a 6x6-matrix
-        y_sdev = msg.pose.covariance[7]  # position 1,1 in a 6x6-matrix
-        if x_sdev > self.body_config['ball_position_precision_threshold']['x_sdev'] or \
-                y_sdev > self.body_config['ball_position_precision_threshold']['y_sdev']:
-            self.forget_ball(own=True, team=False, reset_ball_filter=False)
-            return
-
-        ball_buffer = PointStamped(msg.header, msg.pose.pose.position)
+    def update_ball(self, ball_buffer, msg: PoseWithCovarianceStamped):
+        """Stores the ball in the base footprint, odom and map frame"""
         try:
-            self.ball = self.tf_buffer.transform(ball_buffer, self.base_footprint_frame, timeout=rospy.Duration(0.3))
-            self.ball_odom = self.tf_buffer.transform(ball_buffer, self.odom_frame, timeout=rospy.Duration(0.3))
-            self.ball_map = self.tf_buffer.transform(ball_buffer, self.map_frame, timeout=rospy.Duration(0.3))
-            # Set timestamps to zero to get the newest transform when this is transformed later
-            self.ball_odom.header.stamp = rospy.Time(0)
-            self.ball_map.header.stamp = rospy.Time(0)
-            self.ball_seen_time = rospy.Time.now()
-            self.ball_publisher.publish(self.ball)
-            self.ball_seen = True
-
+            ball = self.transform_newest(ball_buffer, self.base_footprint_frame)
+            ball_odom = self.transform_newest(ball_buffer, self.odom_frame)
+            ball_map = self.transform_newest(ball_buffer, self.map_frame)
         except (tf2.ConnectivityException, tf2.LookupException, tf2.ExtrapolationException) as e:
             rospy.logwarn(e)
+            return
+        # Set timestamps to zero to get the newest transform when this is transformed later
+        ball_odom.header.stamp = rospy.Time(0)
+        ball_map.header.stamp = rospy.Time(0)
+        covariance = msg.pose.covariance
+        ball_map_covariance = np.array([[covariance[0], covariance[1]], [covariance[6], covariance[7]]])
+        with self.ball_lock:
+            self.ball_state = BallState(ball, ball_odom, ball_map, ball_map_covariance, rospy.Time.now(),
+                                        self.ball_state.version + 1)
+        self.ball_publisher.publish(ball)
+        self.ball_seen = True
 
     def recent_ball_twist_available(self):
         if self.ball_twist_map is None:
@@ -270,8 +605,8 @@ class WorldModelCapsule:
                 point_b.point.y = msg.twist.twist.linear.y
                 point_b.point.z = msg.twist.twist.linear.z
                 # transform start and endpoint of velocity vector
-                point_a = self.tf_buffer.transform(point_a, self.map_frame, timeout=rospy.Duration(0.3))
-                point_b = self.tf_buffer.transform(point_b, self.map_frame, timeout=rospy.Duration(0.3))
+                point_a = self.transform_newest(point_a, self.map_frame)
+                point_b = self.transform_newest(point_b, self.map_frame)
                 # build new twist using transform vector
                 self.ball_twist_map = TwistStamped(header=msg.header)
                 self.ball_twist_map.header.frame_id = self.map_frame
@@ -295,31 +630,32 @@ class WorldModelCapsule:
         :param reset_ball_filter: Reset the ball filter, defaults to True
         :type reset_ball_filter: bool, optional
         """
-        if own:  # Forget own ball
-            self.ball_seen_time = rospy.Time(0)
-            self.ball = PointStamped()
+        super().forget_ball(own, team, reset_ball_filter)
 
         if team:  # Forget team ball
             self.ball_seen_time_teammate = rospy.Time(0)
             self.ball_teammate = PointStamped()
 
         if reset_ball_filter:  # Reset the ball filter
-            result = self.reset_ball_filter()
-            if result.success:
-                rospy.loginfo(f"Received message from ball filter: '{result.message}'", logger_name='bitbots_blackboard')
+            async_calls = getattr(self._blackboard, "async_calls", None)
+            if async_calls is not None:
+                # the service call must not block the behavior
+                async_calls.submit(self.call_reset_ball_filter)
             else:
-                rospy.logwarn(f"Ball filter reset failed with: '{result.message}'", logger_name='bitbots_blackboard')
+                self.call_reset_ball_filter()
+
+    def call_reset_ball_filter(self):
+        result = self.reset_ball_filter()
+        if result.success:
+            rospy.loginfo(f"Received message from ball filter: '{result.message}'", logger_name='bitbots_blackboard')
+        else:
+            rospy.logwarn(f"Ball filter reset failed with: '{result.message}'", logger_name='bitbots_blackboard')
+        return result
 
     ###########
     # ## Goal #
     ###########
 
-    def goal_last_seen(self):
-        # We are currently not seeing any goal, we know where they are based
-        # on the localisation. Therefore, any_goal_last_seen returns the time
-        # from the stamp of the last position update
-        return self.goal_seen_time
-
     def get_map_based_opp_goal_center_uv(self):
         x, y = self.get_map_based_opp_goal_center_xy()
         return self.get_uv_from_xy(x, y)
@@ -423,10 +759,8 @@ class WorldModelCapsule:
             goal_left_buffer = PointStamped(goal_parts.header, left_post)
             goal_right_buffer = PointStamped(goal_parts.header, right_post)
             try:
-                self.goal_odom.left_post = self.tf_buffer.transform(goal_left_buffer, self.odom_frame,
-                                                                    timeout=rospy.Duration(0.2)).point
-                self.goal_odom.right_post = self.tf_buffer.transform(goal_right_buffer, self.odom_frame,
-                                                                     timeout=rospy.Duration(0.2)).point
+                self.goal_odom.left_post = self.transform_newest(goal_left_buffer, self.odom_frame).point
+                self.goal_odom.right_post = self.transform_newest(goal_right_buffer, self.odom_frame).point
                 self.goal_odom.header.frame_id = self.odom_frame
                 self.goal_seen_time = rospy.Time.now()
             except (tf2.ConnectivityException, tf2.LookupException, tf2.ExtrapolationException) as e:
@@ -437,115 +771,6 @@ class WorldModelCapsule:
             self.goal_seen_time = rospy.Time.now()
         self.goal_publisher.publish(self.goal_odom.to_pose_with_certainty_array())
 
-    ###########
-    # ## Pose #
-    ###########
-
-    def pose_callback(self, pos: PoseWithCovarianceStamped):
-        self.pose = pos
-
-    def get_current_position(self):
-        """
-        Returns the current position as determined by the localization
-        :returns x,y,theta
-        """
-        transform = self.get_current_position_transform()
-        if transform is None:
-            return None
-        orientation = transform.transform.rotation
-        theta = euler_from_quaternion([orientation.x, orientation.y, orientation.z, orientation.w])[2]
-        return transform.transform.translation.x, transform.transform.translation.y, theta
-
-    def get_current_position_pose_stamped(self) -> PoseStamped:
-        """
-        Returns the current position as determined by the localization as a PoseStamped
-        """
-        transform = self.get_current_position_transform()
-        if transform is None:
-            return None
-        ps = PoseStamped()
-        ps.header = transform.header
-        ps.pose.position.x = transform.transform.translation.x
-        ps.pose.position.y = transform.transform.translation.y
-        ps.pose.position.z = transform.transform.translation.z
-        ps.pose.orientation = transform.transform.rotation
-        return ps
-
-    def get_current_position_transform(self) -> TransformStamped:
-        """
-        Returns the current position as determined by the localization as a TransformStamped
-        """
-        try:
-            # get the most recent transform
-            transform = self.tf_buffer.lookup_transform(self.map_frame, self.base_footprint_frame, rospy.Time(0))
-        except (tf2.LookupException, tf2.ConnectivityException, tf2.ExtrapolationException) as e:
-            rospy.logwarn(e)
-            return None
-        return transform
-
-    def get_localization_precision(self):
-        """
-        Returns the current localization precision based on the covariance matrix.
-        """
-        x_sdev = self.pose.pose.covariance[0]  # position 0,0 in a 6x6-matrix
-        y_sdev = self.pose.pose.covariance[7]  # position 1,1 in a 6x6-matrix
-        theta_sdev = self.pose.pose.covariance[35]  # position 5,5 in a 6x6-matrix
-        return (x_sdev, y_sdev, theta_sdev)
-
-    def localization_precision_in_threshold(self) -> bool:
-        """
-        Returns whether the last localization precision values were in the threshold defined in the settings.
-        """
-        # Check whether we can transform into and from the map frame seconds.
-        if not self.localization_pose_current():
-            return False
-        # get the standard deviation values of the covariance matrix
-        precision = self.get_localization_precision()
-        # return whether those values are in the threshold
-        return precision[0] < self.pose_precision_threshold['x_sdev'] and \
-               precision[1] < self.pose_precision_threshold['y_sdev'] and \
-               precision[2] < self.pose_precision_threshold['theta_sdev']
-
-    def localization_pose_current(self) -> bool:
-        """
-        Returns whether we can transform into and from the map frame.
-        """
-        # if we can do this, we should be able to transform the ball
-        # (unless the localization dies in the next 0.2 seconds)
-        try:
-            t = rospy.Time.now()-rospy.Duration(0.3)
-        except TypeError as e:
-            rospy.logerr(e)
-            t = rospy.Time(0)
-        return self.tf_buffer.can_transform(self.base_footprint_frame, self.map_frame, t)   
-
-    #############
-    # ## Common #
-    #############
-
-    def get_uv_from_xy(self, x, y):
-        """ Returns the relativ positions of the robot to this absolute position"""
-        current_position = self.get_current_position()
-        x2 = x - current_position[0]
-        y2 = y - current_position[1]
-        theta = -1 * current_position[2]
-        u = math.cos(theta) * x2 + math.sin(theta) * y2
-        v = math.cos(theta) * y2 - math.sin(theta) * x2
-        return u, v
-
-    def get_xy_from_uv(self, u, v):
-        """ Returns the absolute position from the given relative position to the robot"""
-        pos_x, pos_y, theta = self.get_current_position()
-        angle = math.atan2(v, u) + theta
-        hypotenuse = math.sqrt(u ** 2 + v ** 2)
-        return pos_x + math.sin(angle) * hypotenuse, pos_y + math.cos(angle) * hypotenuse
-
-    def get_distance_to_xy(self, x, y):
-        """ Returns distance from robot to given position """
-        u, v = self.get_uv_from_xy(x, y)
-        dist = math.sqrt(u ** 2 + v ** 2)
-        return dist
-
     ############
     # Obstacle #
     ############
@@ -554,21 +779,25 @@ class WorldModelCapsule:
         """
         Callback with new obstacles
         """
-        # Init a new obstacle costmap
-        obstacle_map = np.zeros_like(self.costmap)
-        # Iterate over all obstacles
-        for p in pc2.read_points(msg, field_names=("x", "y", "z"), skip_nans=True):
-            # Convert position to array index
-            idx_x, idx_y = self.field_2_costmap_coord(p[0], p[1])
-            # Draw obstacle with smoothing independent weight on obstacle costmap
-            obstacle_map[idx_x, idx_y] = \
-                self.obstacle_cost * self.obstacle_costmap_smoothing_sigma
-        # Smooth obstacle map
-        obstacle_map = gaussian_filter(obstacle_map, self.obstacle_costmap_smoothing_sigma)
+        points = np.array([p[:2] for p in pc2.read_points(msg, field_names=("x", "y", "z"), skip_nans=True)])
+        # Convert positions to array indices
+        if len(points) > 0:
+            obstacle_idx = self.field_2_costmap_coords(points[:, 0], points[:, 1])
+        else:
+            obstacle_idx = (np.empty(0, dtype=int), np.empty(0, dtype=int))
+        if self.costmap_worker is not None:
+            # the layers are smoothed and merged in the worker process
+            self.costmap_worker.update_obstacles(obstacle_idx, self.get_pass_region_coords())
+            return
+        # Draw obstacles with smoothing independent weight on obstacle costmap and smooth it
+        obstacle_map = obstacle_layer(self.costmap.shape, obstacle_idx[0], obstacle_idx[1],
+                                      self.obstacle_cost, self.obstacle_costmap_smoothing_sigma)
+        self.obstacle_map = obstacle_map
         # Get pass offsets
         self.pass_map = self.get_pass_regions()
         # Merge costmaps
         self.costmap = self.base_costmap.copy() + obstacle_map - self.pass_map
+        self.costmap_version += 1
         # Publish debug costmap
         self.costmap_debug_draw()
 
@@ -576,6 +805,8 @@ class WorldModelCapsule:
         """
         Publishes the costmap for rviz
         """
+        if not self.debug_publishing:
+            return
         # Normalize costmap to match the rviz color scheme in a good way
         normalized_costmap = (255 - ((self.costmap - np.min(self.costmap)) / (np.max(self.costmap) - np.min(self.costmap))) * 255 / 2.1).astype(np.int8).T
         # Build the OccupancyGrid message
@@ -595,15 +826,47 @@ class WorldModelCapsule:
         # Publish
         self.costmap_publisher.publish(msg)
 
+    def update_costmap(self):
+        """
+        Recalculates the base costmap if its parameters changed and takes over the newest costmap
+        of the costmap worker process. Called at the start of each behavior tick.
+        """
+        with self.base_costmap_lock:
+            changed_parameters = self.base_costmap_changed_parameters
+            self.base_costmap_changed_parameters = set()
+        if changed_parameters:
+            self.update_base_costmap(changed_parameters)
+        self.poll_costmap_worker()
+
+    def poll_costmap_worker(self):
+        """
+        Takes over the newest costmap of the costmap worker process, if it calculated a new one.
+        """
+        if self.costmap_worker is None:
+            return
+        layers = self.costmap_worker.read()
+        if layers is None:
+            return
+        self.costmap, self.obstacle_map = layers
+        self.costmap_version += 1
+        # Publish debug costmap
+        self.costmap_debug_draw()
+
     def get_pass_regions(self):
         """
         Draws a costmap for the pass regions
         """
+        idx_x, idx_y = self.get_pass_region_coords()
+        return pass_layer(self.costmap.shape, idx_x, idx_y)
+
+    def get_pass_region_coords(self):
+        """
+        Returns the costmap indices of the pass positions in front of the active teammates
+
+        :return: Array of x indices and array of y indices
+        """
         pass_dist = 1.0
-        pass_weight = 20.0
-        pass_smooth = 4.0
-        # Init a new costmap
-        costmap = np.zeros_like(self.costmap)
+        idx_x, idx_y = [], []
         # Iterate over possible team mate poses
         for pose in self._blackboard.team_data.get_active_teammate_poses(count_goalies=False):
             # Get positions
@@ -614,11 +877,10 @@ class WorldModelCapsule:
             # Position between robot and goal but 1m away from the robot
             pass_pos = vector_teammate_to_goal / np.linalg.norm(vector_teammate_to_goal) * pass_dist + teammate_position
             # Convert position to array index
-            idx_x, idx_y = self.field_2_costmap_coord(pass_pos[0], pass_pos[1])
-            # Draw pass position with smoothing independent weight on costmap
-            costmap[idx_x, idx_y] = pass_weight * pass_smooth
-        # Smooth obstacle map
-        return gaussian_filter(costmap, pass_smooth)
+            pass_x, pass_y = self.field_2_costmap_coord(pass_pos[0], pass_pos[1])
+            idx_x.append(pass_x)
+            idx_y.append(pass_y)
+        return np.array(idx_x, dtype=int), np.array(idx_y, dtype=int)
 
     def field_2_costmap_coord(self, x, y):
         """
@@ -634,6 +896,32 @@ class WorldModelCapsule:
                         max(0, (y + self.field_width / 2 + self.map_margin) * 10)))
         return idx_x, idx_y
 
+    def field_2_costmap_coords(self, x, y):
+        """
+        Vectorized version of field_2_costmap_coord for arrays of field positions.
+
+        :param x: Array of x positions relative to the center point
+        :param y: Array of y positions relative to the center point
+        :return: Array of x indices and array of y indices of the coresponding costmap slots
+        """
+        idx_x = np.clip((np.asarray(x) + self.field_length / 2 + self.map_margin) * 10,
+                        0, ((self.field_length + self.map_margin * 2) * 10) - 1).astype(int)
+        idx_y = np.clip((np.asarray(y) + self.field_width / 2 + self.map_margin) * 10,
+                        0, ((self.field_width + self.map_margin * 2) * 10) - 1).astype(int)
+        return idx_x, idx_y
+
+    def costmap_2_field_coord(self, idx_x, idx_y):
+        """
+        Converts costmap indices to the field position of the center of the corresponding costmap slot.
+
+        :param idx_x: The x index of the costmap slot
+        :param idx_y: The y index of the costmap slot
+        :return: The x and y field position of the costmap slot
+        """
+        x = (idx_x + 0.5) / 10 - self.field_length / 2 - self.map_margin
+        y = (idx_y + 0.5) / 10 - self.field_width / 2 - self.map_margin
+        return x, y
+
     def calc_gradients(self):
         """
         Recalculates the gradient map based on the current costmap.
@@ -672,14 +960,17 @@ class WorldModelCapsule:
         Builds the base costmap based on the bahavior parameters.
         This costmap includes a gradient towards the enemy goal and high costs outside the playable area
         """
+        # scipy is imported on first use to keep the startup of the behavior fast
+        from scipy.interpolate import griddata
+        from scipy.ndimage import gaussian_filter
         # Get parameters
-        goalpost_safety_distance = rospy.get_param(
-            "behavior/body/goalpost_safety_distance")  # offset in y direction from the goalpost
-        keep_out_border = rospy.get_param("behavior/body/keep_out_border")  # dangerous border area
-        in_field_value_our_side = rospy.get_param("behavior/body/in_field_value_our_side")  # start value on our side
-        corner_value = rospy.get_param("behavior/body/corner_value")  # cost in a corner
-        goalpost_value = rospy.get_param("behavior/body/goalpost_value")  # cost at a goalpost
-        goal_value = rospy.get_param("behavior/body/goal_value")  # cost in the goal
+        config = self.body_config
+        goalpost_safety_distance = config["goalpost_safety_distance"]  # offset in y direction from the goalpost
+        keep_out_border = config["keep_out_border"]  # dangerous border area
+        in_field_value_our_side = config["in_field_value_our_side"]  # start value on our side
+        corner_value = config["corner_value"]  # cost in a corner
+        goalpost_value = config["goalpost_value"]  # cost at a goalpost
+        goal_value = config["goal_value"]  # cost in the goal
 
         # Create Grid
         grid_x, grid_y = np.mgrid[
@@ -741,12 +1032,41 @@ class WorldModelCapsule:
                                 method='linear')
 
         # Smooth the costmap to get more continus gradients
-        self.base_costmap = gaussian_filter(interpolated, rospy.get_param("behavior/body/base_costmap_smoothing_sigma"))
-        self.costmap = self.base_costmap.copy()
+        self.base_costmap = gaussian_filter(interpolated, config["base_costmap_smoothing_sigma"])
 
         # plt.imshow(self.costmap, origin='lower')
         # plt.show()
 
+    def base_costmap_parameters_changed(self, changed_parameters):
+        """
+        Listener of the parameter store, records the changed parameters of the base costmap
+        for the next call of update_costmap
+
+        :param changed_parameters: Names of the changed parameters
+        """
+        with self.base_costmap_lock:
+            self.base_costmap_changed_parameters.update(changed_parameters)
+
+    def update_base_costmap(self, changed_parameters):
+        """
+        Recalculates the base costmap and the gradient map after parameters of the base costmap changed.
+        The current obstacles and pass regions are applied to the new base costmap.
+
+        :param changed_parameters: Names of the changed parameters
+        """
+        rospy.loginfo(f"Recalculating the base costmap, changed parameters: {sorted(changed_parameters)}")
+        self.calc_base_costmap()
+        self.calc_gradients()
+        if self.costmap_worker is not None:
+            # the worker applies its obstacles and pass regions, the result is taken over on the next tick
+            self.costmap_worker.update_base_costmap(self.base_costmap)
+            return
+        costmap = self.base_costmap + self.obstacle_map
+        if self.pass_map is not None:
+            costmap = costmap - self.pass_map
+        self.costmap = costmap
+        self.costmap_version += 1
+
     def get_gradient_at_field_position(self, x, y):
         """
         Gets the gradient tuple at a given field position
@@ -773,6 +1093,7 @@ class WorldModelCapsule:
         """
         # for debugging only
         if False and self.costmap.sum() > 0:
+            import matplotlib.pyplot as plt
             # Create Grid
             grid_x, grid_y = np.mgrid[0:self.field_length:self.field_length * 10j,
                              0:self.field_width:self.field_width * 10j]
@@ -807,6 +1128,7 @@ class WorldModelCapsule:
         return self.get_cost_of_kick(pose.pose.position.x, pose.pose.position.y, d, kick_length, angular_range)
 
     def get_cost_of_kick(self, x, y, direction, kick_length, angular_range):
+        from PIL import Image, ImageDraw
 
         # create a mask in the size of the costmap consisting of 8-bit values initialized as 0
         mask = Image.new('L', (self.costmap.shape[1], self.costmap.shape[0]))
@@ -837,19 +1159,97 @@ class WorldModelCapsule:
         # This should contribute way less than the max and should have an impact if the max values are similar in all directions.
         return masked_costmap.max() * 0.75 + masked_costmap.min() * 0.25
 
+    def get_cost_of_kicks(self, x, y, directions, kick_length, angular_range):
+        """
+        Estimates the cost of kicks from the given field position in multiple directions at once.
+        Instead of rasterizing the kick area like get_cost_of_kick, it is sampled with a fan of rays.
+
+        :param x: Field coordinate of the ball in the x direction
+        :param y: Field coordinate of the ball in the y direction
+        :param directions: Array of kick directions in the map frame
+        :param kick_length: Estimated length of the kick
+        :param angular_range: Angular range of the kick area
+        :return: Array with the cost for each direction
+        """
+        directions = np.asarray(directions, dtype=float)
+        # sample the kick area with the resolution of the costmap
+        distances = np.linspace(0, kick_length, max(2, int(kick_length * 10) + 1))
+        ray_offsets = np.linspace(-0.5 * angular_range, 0.5 * angular_range, 5)
+        angles = directions[:, np.newaxis, np.newaxis] + ray_offsets[np.newaxis, np.newaxis, :]
+        sample_x = x + distances[np.newaxis, :, np.newaxis] * np.cos(angles)
+        sample_y = y + distances[np.newaxis, :, np.newaxis] * np.sin(angles)
+        idx_x, idx_y = self.field_2_costmap_coords(sample_x, sample_y)
+        costs = self.costmap[idx_x, idx_y].reshape(len(directions), -1)
+        # same weighting of the maximal and minimal cost as in get_cost_of_kick
+        return costs.max(axis=1) * 0.75 + costs.min(axis=1) * 0.25
+
     def get_current_cost_of_kick(self, direction, kick_length, angular_range):
         return self.get_cost_of_kick_relative(0, 0, direction, kick_length, angular_range)
 
-    def get_best_kick_direction(self, min_angle, max_angle, num_kick_angles, kick_length, angular_range):
+    def evaluate_kick_directions(self, min_angle, max_angle, num_kick_angles, kick_length, angular_range):
+        """
+        Calculates the cost of kicks from the current position in evenly spaced directions.
+
+        :return: KickEvaluation with the direction of the least cost and the cost of every direction
+        """
+        stamp = rospy.Time.now()
         # list of possible kick directions, sorted by absolute value to
         # prefer forward kicks to side kicks if their costs are equal
         kick_directions = sorted(np.linspace(min_angle,
                                              max_angle,
                                              num=num_kick_angles), key=abs)
-
+        position = self.get_current_position() if self.coarse_kick_cost and self.costmap is not None else None
+        if position is not None:
+            # all directions at once with the cheaper sampling of the costmap
+            costs = self.get_cost_of_kicks(position[0], position[1], np.array(kick_directions) + position[2],
+                                           kick_length, angular_range).tolist()
+        else:
+            costs = [self.get_current_cost_of_kick(direction=direction,
+                                                   kick_length=kick_length,
+                                                   angular_range=angular_range)
+                     for direction in kick_directions]
         # get the kick direction with the least cost
-        kick_direction = kick_directions[np.argmin([self.get_current_cost_of_kick(direction=direction,
-                                                                                  kick_length=kick_length,
-                                                                                  angular_range=angular_range)
-                                                    for direction in kick_directions])]
-        return kick_direction
+        return KickEvaluation(stamp, kick_directions[int(np.argmin(costs))], tuple(kick_directions), tuple(costs))
+
+    def get_best_kick_direction(self, min_angle, max_angle, num_kick_angles, kick_length, angular_range):
+        return self.evaluate_kick_directions(
+            min_angle, max_angle, num_kick_angles, kick_length, angular_range).best_direction
+
+    def evaluate_default_kick_directions(self):
+        """
+        Evaluates the kick directions with the kick parameters of the config
+        """
+        return self.evaluate_kick_directions(-self.body_config['max_kick_angle'],
+                                             self.body_config['max_kick_angle'],
+                                             self.num_kick_angles,
+                                             self.body_config['kick_cost_kick_length'],
+                                             self.body_config['kick_cost_angular_range'])
+
+    def get_latest_kick_evaluation(self):
+        """
+        Returns the latest evaluation of the worker thread with the kick parameters of the config.
+        If it is older than kick_evaluation_max_age, the stale result is returned and the worker is triggered
+        to evaluate again immediately. The kick directions are never evaluated in the calling thread.
+
+        :return: The latest KickEvaluation or None if the worker has not finished its first evaluation yet
+        :rtype: KickEvaluation
+        """
+        evaluation = self.kick_evaluation
+        if evaluation is None or rospy.Time.now() - evaluation.stamp > self.kick_evaluation_max_age:
+            self.kick_evaluation_trigger.set()
+        return evaluation
+
+    def kick_evaluation_worker(self):
+        """
+        Evaluates the kick directions with the kick evaluation rate, so the result is at most one period older
+        than the costmap and the pose. A stale result requested by the behavior starts the next evaluation immediately.
+        """
+        period = 1.0 / self.kick_evaluation_rate
+        while not rospy.is_shutdown():
+            start = time.monotonic()
+            self.kick_evaluation_trigger.clear()
+            try:
+                self.kick_evaluation = self.evaluate_default_kick_directions()
+            except Exception as e:
+                rospy.logwarn_throttle(5, f"Kick evaluation failed: {e}")
+            self.kick_evaluation_trigger.wait(max(0.0, period - (time.monotonic() - start)))
@@ -0,0 +1,54 @@
+"""
+ChangePublisher
+^^^^^^^^^^^^^^^
+
+Wraps a publisher so that a message is only sent if it differs from the previously sent one
+or if the heartbeat period has passed since then.
+"""
+import copy
+
+import rospy
+
+
+class ChangePublisher:
+    def __init__(self, publisher, heartbeat_period=1.0):
+        """
+        :param publisher: The wrapped rospy.Publisher
+        :param heartbeat_period: Time in seconds after which an unchanged message is sent again
+        """
+        self.publisher = publisher
+        self.heartbeat_period = rospy.Duration(heartbeat_period)
+        self.last_message = None
+        self.last_publish_time = None
+        self.published = 0
+        self.suppressed = 0
+
+    def publish(self, *args, **kwargs):
+        """
+        Publishes the message like rospy.Publisher.publish if it has changed or the heartbeat is due
+
+        :return: True if the message was sent
+        """
+        # the message is copied, as callers often modify and republish the same message object
+        message = copy.deepcopy((args, kwargs))
+        now = rospy.Time.now()
+        if message == self.last_message and now - self.last_publish_time < self.heartbeat_period:
+            self.suppressed += 1
+            return False
+        self.publisher.publish(*args, **kwargs)
+        self.last_message = message
+        self.last_publish_time = now
+        self.published += 1
+        return True
+
+    def invalidate(self):
+        """Forces the next message to be sent, e.g. because someone else published on the same topic"""
+        self.last_message = None
+
+    def is_last_message(self, *args, **kwargs):
+        """Returns whether the given message equals the last sent one"""
+        return (args, kwargs) == self.last_message
+
+    def __getattr__(self, name):
+        # everything else is delegated to the wrapped publisher
+        return getattr(self.publisher, name)
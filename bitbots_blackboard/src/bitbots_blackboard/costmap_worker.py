@@ -0,0 +1,194 @@
+"""
+CostmapWorker
+^^^^^^^^^^^^^
+
+Maintains the obstacle layer, the pass regions and the merged costmap in a separate process, so smoothing the layers
+does not compete with the behavior loop and the callbacks for the GIL. Obstacle and pass region updates are sent
+through a queue. The worker only processes the newest update and writes the costmap and the obstacle layer into a
+shared memory double buffer with a version counter, from which the behavior reads them. The version counter
+is used as a seqlock, it is odd while the worker writes.
+
+The layer functions are also used by the world model when the costmap is maintained in the behavior process.
+"""
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Weight and smoothing of a pass region in the costmap
+PASS_WEIGHT = 20.0
+PASS_SMOOTH = 4.0
+
+# Layers in each buffer of the shared memory
+COSTMAP_LAYER = 0
+OBSTACLE_LAYER = 1
+
+
+def obstacle_layer(shape, idx_x, idx_y, obstacle_cost, smoothing_sigma):
+    """
+    Draws the obstacles with a smoothing independent weight and smooths them
+
+    :param shape: Shape of the costmap
+    :param idx_x: Array of the x indices of the obstacles in the costmap
+    :param idx_y: Array of the y indices of the obstacles in the costmap
+    """
+    from scipy.ndimage import gaussian_filter
+    layer = np.zeros(shape)
+    layer[idx_x, idx_y] = obstacle_cost * smoothing_sigma
+    return gaussian_filter(layer, smoothing_sigma)
+
+
+def pass_layer(shape, idx_x, idx_y):
+    """
+    Draws the pass regions with a smoothing independent weight and smooths them
+
+    :param shape: Shape of the costmap
+    :param idx_x: Array of the x indices of the pass positions in the costmap
+    :param idx_y: Array of the y indices of the pass positions in the costmap
+    """
+    from scipy.ndimage import gaussian_filter
+    layer = np.zeros(shape)
+    layer[idx_x, idx_y] = PASS_WEIGHT * PASS_SMOOTH
+    return gaussian_filter(layer, PASS_SMOOTH)
+
+
+def _shared_arrays(shm, shape):
+    """Returns the header (version, active buffer) and the buffers that are stored in the shared memory"""
+    header = np.ndarray((2,), dtype=np.int64, buffer=shm.buf)
+    buffers = np.ndarray((2, 2) + tuple(shape), dtype=np.float64, buffer=shm.buf, offset=header.nbytes)
+    return header, buffers
+
+
+def _shared_memory_size(shape):
+    return np.dtype(np.int64).itemsize * 2 + np.dtype(np.float64).itemsize * 4 * int(np.prod(shape))
+
+
+def _run_worker(shm_name, shape, updates, base_costmap, obstacle_cost, smoothing_sigma):
+    """Main function of the worker process"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    header, buffers = _shared_arrays(shm, shape)
+    parent = os.getppid()
+    obstacles_map = np.zeros(shape)
+    pass_map = np.zeros(shape)
+    try:
+        while True:
+            try:
+                update = updates.get(timeout=1.0)
+            except queue.Empty:
+                if os.getppid() != parent:
+                    break  # the behavior died without stopping the worker
+                continue
+            # only the newest obstacles are relevant, older ones in the queue are dropped
+            obstacles = None
+            while update is not None:
+                kind, data = update
+                if kind == 'stop':
+                    return
+                if kind == 'base':
+                    base_costmap = data
+                else:
+                    obstacles = data
+                try:
+                    update = updates.get_nowait()
+                except queue.Empty:
+                    update = None
+            # if only the base costmap changed, the last obstacles are applied to it
+            if obstacles is not None:
+                obstacle_idx, pass_idx = obstacles
+                obstacles_map = obstacle_layer(shape, obstacle_idx[0], obstacle_idx[1], obstacle_cost, smoothing_sigma)
+                pass_map = pass_layer(shape, pass_idx[0], pass_idx[1])
+            costmap = base_costmap + obstacles_map - pass_map
+            # the odd version tells readers that a write is in progress.
+            # it goes to the inactive buffer, so a reader usually only retries if it is overtaken by two writes
+            header[0] += 1
+            inactive = 1 - header[1]
+            buffers[inactive, COSTMAP_LAYER] = costmap
+            buffers[inactive, OBSTACLE_LAYER] = obstacles_map
+            header[1] = inactive
+            header[0] += 1
+    finally:
+        del header, buffers
+        shm.close()
+
+
+class CostmapWorker:
+    def __init__(self, base_costmap, obstacle_cost, smoothing_sigma):
+        """
+        Starts the worker process
+
+        :param base_costmap: The base costmap, its shape is the shape of all layers
+        :param obstacle_cost: Cost of an obstacle
+        :param smoothing_sigma: Sigma of the gaussian smoothing of the obstacles
+        """
+        self.shape = base_costmap.shape
+        self._shm = shared_memory.SharedMemory(create=True, size=_shared_memory_size(self.shape))
+        self._header, self._buffers = _shared_arrays(self._shm, self.shape)
+        self._header[:] = 0
+        self._buffers[:, COSTMAP_LAYER] = base_costmap
+        self._buffers[:, OBSTACLE_LAYER] = 0
+        # the behavior only reads from the buffers
+        self._buffers.flags.writeable = False
+        self.read_version = 0
+        # spawn instead of fork, because the behavior process runs threads
+        context = multiprocessing.get_context('spawn')
+        self._updates = context.Queue()
+        self._process = context.Process(
+            target=_run_worker, name='costmap_worker', daemon=True,
+            args=(self._shm.name, self.shape, self._updates, base_costmap, obstacle_cost, smoothing_sigma))
+        self._process.start()
+        # Metrics
+        self.updates_sent = 0
+        self.read_retries = 0
+
+    def update_obstacles(self, obstacle_idx, pass_idx):
+        """
+        Sends new obstacles and pass regions to the worker
+
+        :param obstacle_idx: Tuple of arrays of the x and y indices of the obstacles in the costmap
+        :param pass_idx: Tuple of arrays of the x and y indices of the pass positions in the costmap
+        """
+        self._updates.put(('obstacles', (obstacle_idx, pass_idx)))
+        self.updates_sent += 1
+
+    def update_base_costmap(self, base_costmap):
+        """Sends a new base costmap to the worker, the last obstacles are applied to it"""
+        self._updates.put(('base', base_costmap))
+
+    def read(self):
+        """
+        Returns copies of the newest costmap and obstacle layer, if the worker wrote new ones since the last read
+
+        :return: Tuple of the costmap and the obstacle layer or None
+        """
+        if self._header[0] == self.read_version:
+            return None
+        while True:
+            version = int(self._header[0])
+            if version % 2 == 1:
+                # the worker is writing
+                self.read_retries += 1
+                time.sleep(0)
+                continue
+            active = int(self._header[1])
+            costmap = self._buffers[active, COSTMAP_LAYER].copy()
+            obstacles = self._buffers[active, OBSTACLE_LAYER].copy()
+            # the copy is consistent if the worker did not start a write while it was taken
+            if self._header[0] == version and self._header[1] == active:
+                break
+            self.read_retries += 1
+        self.read_version = version
+        return costmap, obstacles
+
+    def shutdown(self):
+        """Stops the worker process and frees the shared memory"""
+        if self._process.is_alive():
+            self._updates.put(('stop', None))
+            self._process.join(timeout=1.0)
+            if self._process.is_alive():
+                self._process.terminate()
+        del self._header, self._buffers
+        self._shm.close()
+        self._shm.unlink()
@@ -0,0 +1,149 @@
+"""
+GridPlanner
+^^^^^^^^^^^
+
+A lightweight A* planner on the costmap grid of the world model.
+It is meant for short approaches, where a round trip to move_base costs more than planning in process.
+"""
+import heapq
+import math
+
+import numpy as np
+
+# Offsets of the 8 neighbors of a grid cell and the length of the step to them (in cells)
+NEIGHBOR_OFFSETS = np.array([(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)])
+NEIGHBOR_STEPS = np.linalg.norm(NEIGHBOR_OFFSETS, axis=1)
+
+
+class GridPlanner:
+    def __init__(self, max_expansions=4000):
+        """
+        :param max_expansions: Maximum number of expanded cells per query. If it is exceeded, the path to
+            the expanded cell closest to the goal is returned.
+        """
+        self.max_expansions = max_expansions
+        self.last_expansions = 0
+
+    @staticmethod
+    def _octile_distance(x, y, goal):
+        dx = np.abs(x - goal[0])
+        dy = np.abs(y - goal[1])
+        return np.maximum(dx, dy) + (math.sqrt(2) - 1) * np.minimum(dx, dy)
+
+    def plan(self, weights, start, goal):
+        """
+        Plans a path on the grid from start to goal.
+
+        :param weights: 2D array with the cost of traversing each cell (per cell length), all values have to be >= 1
+        :param start: (x, y) index of the start cell
+        :param goal: (x, y) index of the goal cell
+        :return: List of (x, y) cell indices from start to goal, simplified with line of sight shortcuts
+        """
+        # Work on flat indices of a grid with an impassable border, so no bounds checks are needed
+        padded_shape = (weights.shape[0] + 2, weights.shape[1] + 2)
+        padded_weights = np.pad(weights.astype(float), 1, constant_values=np.inf).ravel()
+        closed = np.ones(padded_shape, dtype=bool)
+        closed[1:-1, 1:-1] = False
+        closed = closed.ravel()
+        cost = np.full(closed.shape, np.inf)
+        parent = np.full(closed.shape, -1, dtype=int)
+        offsets = NEIGHBOR_OFFSETS[:, 0] * padded_shape[1] + NEIGHBOR_OFFSETS[:, 1]
+        grid_x, grid_y = np.indices(padded_shape)
+        heuristics = self._octile_distance(grid_x - 1, grid_y - 1, goal).ravel()
+
+        start_idx = int(np.ravel_multi_index((start[0] + 1, start[1] + 1), padded_shape))
+        goal_idx = int(np.ravel_multi_index((goal[0] + 1, goal[1] + 1), padded_shape))
+        cost[start_idx] = 0
+        best = start_idx
+        # ties are broken in favor of cells closer to the goal, which avoids expanding whole plateaus
+        open_list = [(heuristics[start_idx], heuristics[start_idx], start_idx)]
+        self.last_expansions = 0
+        while open_list:
+            _, heuristic, current = heapq.heappop(open_list)
+            if closed[current]:
+                continue
+            closed[current] = True
+            if heuristic < heuristics[best]:
+                best = current
+            if current == goal_idx or self.last_expansions >= self.max_expansions:
+                break
+            self.last_expansions += 1
+
+            # Expand all neighbors at once, the cost of a step is the mean of both cells
+            neighbors = offsets + current
+            open_mask = ~closed[neighbors]
+            neighbors = neighbors[open_mask]
+            new_cost = cost[current] + \
+                NEIGHBOR_STEPS[open_mask] * (padded_weights[current] + padded_weights[neighbors]) / 2
+            improved = new_cost < cost[neighbors]
+            neighbors, new_cost = neighbors[improved], new_cost[improved]
+            cost[neighbors] = new_cost
+            parent[neighbors] = current
+            neighbor_heuristics = heuristics[neighbors]
+            for item in zip((new_cost + neighbor_heuristics).tolist(), neighbor_heuristics.tolist(),
+                            neighbors.tolist()):
+                heapq.heappush(open_list, item)
+
+        # Follow the parents back to the start
+        path = [best]
+        while path[-1] != start_idx:
+            path.append(int(parent[path[-1]]))
+        path.reverse()
+        path_x, path_y = np.unravel_index(path, padded_shape)
+        return self.shortcut(weights, list(zip((path_x - 1).tolist(), (path_y - 1).tolist())))
+
+    def shortcut(self, weights, path):
+        """
+        Removes waypoints from a grid path if the straight line between the remaining waypoints
+        is not more expensive than the original path (similar to the any-angle paths of Theta*).
+
+        :param weights: 2D array with the cost of traversing each cell
+        :param path: List of (x, y) cell indices
+        :return: The simplified path
+        """
+        if len(path) < 3:
+            return path
+        points = np.array(path)
+        # cost of the original path up to every waypoint
+        step_costs = np.linalg.norm(np.diff(points, axis=0), axis=1) * \
+            (weights[points[:-1, 0], points[:-1, 1]] + weights[points[1:, 0], points[1:, 1]]) / 2
+        path_costs = np.concatenate(([0], np.cumsum(step_costs)))
+
+        simplified = [path[0]]
+        anchor = 0
+        while anchor < len(path) - 1:
+            # take the furthest waypoint that can be reached directly without additional cost
+            next_waypoint = anchor + 1
+            for candidate in range(len(path) - 1, anchor + 1, -1):
+                if self.line_cost(weights, points[anchor], points[candidate]) <= \
+                        path_costs[candidate] - path_costs[anchor] + 1e-6:
+                    next_waypoint = candidate
+                    break
+            simplified.append(path[next_waypoint])
+            anchor = next_waypoint
+        return simplified
+
+    @staticmethod
+    def line_cost(weights, start, end):
+        """
+        Returns the cost of the straight line between two cells, i.e. the sum of the weights of all crossed cells
+        times the length of the line inside of them. A line through the corner of a cell does not cross it,
+        like the diagonal steps of the planner, but a line through any other part of a cell does,
+        so a shortcut never cuts through an impassable cell.
+        """
+        start = np.asarray(start, dtype=float)
+        delta = np.asarray(end, dtype=float) - start
+        length = float(np.linalg.norm(delta))
+        if length == 0:
+            return 0.0
+        # fractions of the line at which it crosses the border between two cells
+        crossings = [np.array([0.0, 1.0])]
+        for axis in range(2):
+            if delta[axis] != 0:
+                low, high = sorted((start[axis], start[axis] + delta[axis]))
+                crossings.append((np.arange(np.floor(low) + 0.5, high, 1.0) - start[axis]) / delta[axis])
+        # rounding merges the crossings of both axes in a corner
+        fractions = np.unique(np.round(np.concatenate(crossings), 9))
+        middles = start + ((fractions[:-1] + fractions[1:]) / 2)[:, np.newaxis] * delta
+        cells = np.floor(middles + 0.5).astype(int)
+        return float(np.sum(weights[cells[:, 0], cells[:, 1]] * np.diff(fractions))) * length
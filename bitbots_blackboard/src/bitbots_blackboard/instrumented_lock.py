@@ -0,0 +1,82 @@
+"""
+InstrumentedLock
+^^^^^^^^^^^^^^^^
+
+A lock that counts how often it was acquired and how often and how long threads had to wait for it,
+to find lock contention between the behavior loop and the callback threads. The LockRegistry creates
+either instrumented or plain locks, so the instrumentation can be disabled without changing the users.
+"""
+import threading
+import time
+
+
+class InstrumentedLock:
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        # Metrics, only modified while the lock is held
+        self.acquisitions = 0
+        self.contentions = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self._lock.acquire(False):
+            self.acquisitions += 1
+            return True
+        if not blocking:
+            return False
+        start = time.perf_counter()
+        if not self._lock.acquire(True, timeout):
+            return False
+        waited = time.perf_counter() - start
+        self.acquisitions += 1
+        self.contentions += 1
+        self.wait_time += waited
+        self.max_wait_time = max(self.max_wait_time, waited)
+        return True
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def get_stats(self):
+        """Returns the metrics of the lock as a dict"""
+        return {
+            'acquisitions': self.acquisitions,
+            'contentions': self.contentions,
+            'mean_wait_time': self.wait_time / self.contentions if self.contentions > 0 else 0.0,
+            'max_wait_time': self.max_wait_time,
+        }
+
+
+class LockRegistry:
+    def __init__(self, instrumented=False):
+        """
+        :param instrumented: Whether the created locks are instrumented, otherwise they are plain threading.Locks
+        """
+        self.instrumented = instrumented
+        self.locks = {}
+
+    def create(self, name):
+        """
+        Creates a lock and registers it by name
+
+        :param name: Name of the lock in the stats
+        """
+        lock = InstrumentedLock(name) if self.instrumented else threading.Lock()
+        self.locks[name] = lock
+        return lock
+
+    def get_stats(self):
+        """Returns the metrics of all instrumented locks by name"""
+        return {name: lock.get_stats() for name, lock in self.locks.items() if isinstance(lock, InstrumentedLock)}
@@ -0,0 +1,156 @@
+"""
+ParameterStore
+^^^^^^^^^^^^^^
+
+Fetches the parameter namespaces of the behavior once from the parameter server and serves cached values,
+so reading a parameter on the behavior loop does not cause an XML-RPC call. The namespaces can be refreshed
+periodically in the background. Listeners are notified about changed parameters, so they can recompute
+structures that are derived from them, e.g. the base costmap.
+"""
+import threading
+
+import rospy
+
+
+class ParameterStore:
+    def __init__(self, namespaces):
+        """
+        :param namespaces: Parameter namespaces that are fetched at once, e.g. 'behavior/body' or '~'
+        """
+        self.namespaces = list(namespaces)
+        # namespace -> dict of the parameters in it, replaced as a whole on refresh
+        self._namespace_values = {namespace: self._fetch_namespace(namespace) for namespace in self.namespaces}
+        # single parameters outside of the namespaces, fetched on first access and not refreshed
+        self._single_values = {}
+        # (name, type) -> converted value
+        self._cache = {}
+        self._listeners = []  # (parameter names or prefixes, callback)
+        self._lock = threading.Lock()
+        self._refresh_timer = None
+        # Metrics
+        self.server_calls = len(self.namespaces)
+        self.refreshes = 0
+
+    @staticmethod
+    def _fetch_namespace(namespace):
+        values = rospy.get_param(namespace, {})
+        if not isinstance(values, dict):
+            rospy.logwarn(f"Parameter namespace {namespace} is not a namespace")
+            return {}
+        return values
+
+    def _split(self, name):
+        """Returns the namespace that contains the parameter and the remaining key path or None"""
+        if name.startswith('~'):
+            if '~' in self._namespace_values:
+                return '~', [key for key in name[1:].split('/') if key]
+            return None, None
+        for namespace in self.namespaces:
+            if namespace != '~' and name.startswith(namespace + '/'):
+                return namespace, [key for key in name[len(namespace) + 1:].split('/') if key]
+        return None, None
+
+    def snapshot(self, namespace):
+        """
+        Returns the current values of a namespace. The dict must not be modified, it is replaced on refresh.
+
+        :param namespace: One of the namespaces given to the constructor
+        """
+        return self._namespace_values[namespace]
+
+    def get(self, name, default=None, param_type=None):
+        """
+        Returns the value of a parameter without a call to the parameter server, if its namespace is cached.
+        Parameters outside of the cached namespaces are fetched once and cached as well.
+
+        :param name: Name of the parameter as for rospy.get_param
+        :param default: Value that is returned if the parameter does not exist
+        :param param_type: Type the value is converted to, e.g. float or rospy.Duration
+        """
+        key = (name, param_type)
+        # a refresh replaces the cache, so a value converted from an outdated namespace is not stored in the new one
+        cache = self._cache
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        namespace, path = self._split(name)
+        if namespace is not None:
+            value = self._namespace_values[namespace]
+            for part in path:
+                if not isinstance(value, dict) or part not in value:
+                    value = default
+                    break
+                value = value[part]
+        else:
+            if name not in self._single_values:
+                self.server_calls += 1
+                self._single_values[name] = rospy.get_param(name, default)
+            value = self._single_values[name]
+        if value is not None and param_type is not None:
+            value = param_type(value)
+        cache[key] = value
+        return value
+
+    def add_listener(self, names, callback):
+        """
+        Registers a callback that is called with the set of changed parameter names after a refresh,
+        if one of the given parameters or a parameter below one of the given namespaces changed.
+        The callback is called in the thread that refreshes the parameters.
+
+        :param names: Full parameter names or namespaces, e.g. 'behavior/body/corner_value'
+        :param callback: Function that takes the set of changed parameter names
+        """
+        self._listeners.append((tuple(names), callback))
+
+    def refresh(self):
+        """
+        Fetches all namespaces again and notifies the listeners about changed parameters
+
+        :return: The set of changed parameter names
+        """
+        with self._lock:
+            changed = set()
+            for namespace in self.namespaces:
+                values = self._fetch_namespace(namespace)
+                self.server_calls += 1
+                changed.update(self._changed_names(namespace, self._namespace_values[namespace], values))
+                self._namespace_values[namespace] = values
+            self.refreshes += 1
+            if not changed:
+                return changed
+            # the cached values of changed parameters and of namespaces containing them are dropped,
+            # the others stay valid
+            self._cache = {key: value for key, value in self._cache.items()
+                           if not any(self._matches(changed_name, key[0]) for changed_name in changed)}
+        for names, callback in self._listeners:
+            if any(self._matches(changed_name, name) for changed_name in changed for name in names):
+                callback(changed)
+        return changed
+
+    @staticmethod
+    def _matches(changed_name, name):
+        return changed_name == name or changed_name.startswith(name.rstrip('/') + '/')
+
+    @classmethod
+    def _changed_names(cls, prefix, old, new):
+        """Returns the full names of all parameters that differ between two namespace dicts"""
+        separator = '' if prefix == '~' else '/'
+        changed = set()
+        for key in set(old) | set(new):
+            name = prefix + separator + key
+            old_value, new_value = old.get(key), new.get(key)
+            if isinstance(old_value, dict) and isinstance(new_value, dict):
+                changed.update(cls._changed_names(name, old_value, new_value))
+            elif old_value != new_value or (key in old) != (key in new):
+                changed.add(name)
+        return changed
+
+    def start_refresh(self, period):
+        """
+        Refreshes the namespaces periodically in a timer thread
+
+        :param period: Refresh period in seconds, 0 disables the refresh
+        """
+        if period > 0 and self._refresh_timer is None:
+            self._refresh_timer = rospy.Timer(rospy.Duration(period), lambda _: self.refresh())
@@ -0,0 +1,129 @@
+"""
+SubscriptionManager
+^^^^^^^^^^^^^^^^^^^
+
+Subscribes the topics of a behavior and defers the processing of their messages to the behavior loop.
+The subscriber callbacks only store the raw messages, the expensive processing, e.g. tf transforms or
+costmap updates, runs once at the start of the tick. Each topic has a policy:
+
+- ``latest``: only the newest message is processed, older unprocessed messages are coalesced
+- ``queue``: the messages are processed in order, the oldest ones are dropped when the queue is full
+- ``all``: every message is processed immediately in the callback thread, as with a plain subscriber
+"""
+import collections
+import threading
+import traceback
+
+import rospy
+
+LATEST = 'latest'
+QUEUE = 'queue'
+ALL = 'all'
+POLICIES = (LATEST, QUEUE, ALL)
+
+
+class _Subscription:
+    def __init__(self, topic, callback, policy, queue_size, notify, lock):
+        self.topic = topic
+        self.callback = callback
+        self.policy = policy
+        self.notify = notify
+        self._lock = lock
+        self._pending = collections.deque(maxlen=1 if policy == LATEST else queue_size)
+        # Metrics
+        self.received = 0
+        self.processed = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def receive(self, msg):
+        """Callback of the rospy subscriber, stores the message or processes it directly with the 'all' policy"""
+        if self.policy == ALL:
+            self.received += 1
+            self.callback(msg)
+            self.processed += 1
+        else:
+            with self._lock:
+                self.received += 1
+                # the deque discards the oldest message when it is full
+                if len(self._pending) == self._pending.maxlen:
+                    if self.policy == LATEST:
+                        self.coalesced += 1
+                    else:
+                        self.dropped += 1
+                self._pending.append(msg)
+        if self.notify is not None:
+            self.notify()
+
+    def take(self):
+        """Returns the pending messages and clears them"""
+        with self._lock:
+            messages = list(self._pending)
+            self._pending.clear()
+        return messages
+
+    def get_stats(self):
+        return {
+            'policy': self.policy,
+            'received': self.received,
+            'processed': self.processed,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+        }
+
+
+class SubscriptionManager:
+    def __init__(self, policies=None, locks=None, notify=None):
+        """
+        :param policies: Dict of topic names to policies that override the policies given on subscription
+        :param locks: LockRegistry that creates the locks of the message buffers, plain locks by default
+        :param notify: Function that is called when a message of a notifying subscription arrives,
+            e.g. the notify method of the TickScheduler
+        """
+        self.policies = policies or {}
+        self.locks = locks
+        self.notify = notify
+        self.subscriptions = []
+
+    def subscribe(self, topic, msg_type, callback, policy=LATEST, queue_size=10, notify=False):
+        """
+        Subscribes a topic with a processing policy
+
+        :param topic: Name of the topic
+        :param msg_type: Message class of the topic
+        :param callback: Function that processes a message, called in process() unless the policy is 'all'
+        :param policy: 'latest', 'queue' or 'all', overridden by the policies given to the constructor
+        :param queue_size: Maximal number of pending messages with the 'queue' policy
+        :param notify: Whether an arriving message notifies the behavior loop
+        """
+        policy = self.policies.get(topic, policy)
+        if policy not in POLICIES:
+            rospy.logwarn(f"Unknown subscription policy {policy} for topic {topic}, using '{LATEST}'")
+            policy = LATEST
+        name = 'subscription ' + topic
+        lock = self.locks.create(name) if self.locks is not None else threading.Lock()
+        subscription = _Subscription(topic, callback, policy, queue_size, self.notify if notify else None, lock)
+        self.subscriptions.append(subscription)
+        # the deferred callbacks only store the message, so the queue of rospy is not a bottleneck
+        rospy.Subscriber(topic, msg_type, subscription.receive, queue_size=None if policy == ALL else queue_size)
+        return subscription
+
+    def process(self):
+        """
+        Processes the pending messages of all deferred subscriptions in the order of subscription.
+        Should be called by the behavior loop at the start of each tick.
+        """
+        for subscription in self.subscriptions:
+            if subscription.policy == ALL:
+                continue
+            for msg in subscription.take():
+                try:
+                    subscription.callback(msg)
+                except Exception:
+                    # a failing callback must not stop the behavior loop, like in a callback thread of rospy
+                    rospy.logerr(f"Processing a message of {subscription.topic} failed:\n{traceback.format_exc()}")
+                subscription.processed += 1
+
+    def get_stats(self):
+        """Returns the received, processed, coalesced and dropped messages by topic"""
+        return {subscription.topic: subscription.get_stats() for subscription in self.subscriptions}
@@ -0,0 +1,109 @@
+"""
+TickScheduler
+^^^^^^^^^^^^^
+
+Decides when the behavior loop ticks. Callbacks signal that relevant data changed, which triggers a tick
+immediately, limited by a maximum rate. Deadlines, e.g. of behavior timers, trigger a tick as well.
+Without events, the loop ticks with a minimum rate. Actions that stream commands keep the maximum rate
+by notifying the scheduler in every tick.
+
+The scheduler measures the time with a given clock, e.g. the ROS clock, so that the periods and deadlines
+are also correct in simulation time. As such a clock can run faster or slower than the wall clock,
+the waits are split into slices of at most max_wait_slice wall clock seconds and the clock is checked again.
+"""
+import threading
+import time
+
+
+class TickScheduler:
+    def __init__(self, max_rate, min_rate, lock=None, clock=time.monotonic, max_wait_slice=0.01):
+        """
+        :param max_rate: Maximum tick rate in Hz, also when events arrive more often
+        :param min_rate: Tick rate in Hz when no events arrive
+        :param lock: Lock that protects the event time, e.g. an InstrumentedLock, a new lock by default
+        :param clock: Function that returns the current time in seconds, e.g. rospy.get_time
+        :param max_wait_slice: Maximal wall clock time in seconds that is waited before the clock is checked again
+        """
+        self.min_period = 1.0 / max_rate
+        self.max_period = 1.0 / min_rate
+        self.clock = clock
+        self.max_wait_slice = max_wait_slice
+        self._event = threading.Event()
+        self._lock = lock if lock is not None else threading.Lock()
+        self._first_event_time = None
+        self.last_tick_time = None
+        # Metrics
+        self.ticks = 0
+        self.idle_ticks = 0
+        self.events = 0
+        self.latency_sum = 0.0
+        self.max_latency = 0.0
+
+    def notify(self):
+        """Signals that relevant data changed, so the loop should tick as soon as possible"""
+        with self._lock:
+            if self._first_event_time is None:
+                self._first_event_time = self.clock()
+            self.events += 1
+        self._event.set()
+
+    def wrap(self, callback):
+        """Returns a callback that calls the given callback and notifies the scheduler afterwards"""
+        def notifying_callback(*args, **kwargs):
+            result = callback(*args, **kwargs)
+            self.notify()
+            return result
+        return notifying_callback
+
+    def wait_for_tick(self, time_until_deadline=None):
+        """
+        Blocks until the next tick is due, which is on the first event or deadline after the minimal period
+        or after the maximal period without events.
+
+        :param time_until_deadline: Seconds until the next deadline, e.g. of a behavior timer, or None
+        :return: True if the tick was triggered by an event or a deadline
+        """
+        deadline = None
+        if time_until_deadline is not None:
+            deadline = self.clock() + max(0.0, time_until_deadline)
+        if self.last_tick_time is not None:
+            earliest = self.last_tick_time + self.min_period
+            delay = earliest - self.clock()
+            while delay > 0:
+                time.sleep(min(delay, self.max_wait_slice))
+                delay = earliest - self.clock()
+            latest = self.last_tick_time + self.max_period
+            if deadline is not None:
+                latest = min(latest, deadline)
+            remaining = latest - self.clock()
+            while remaining > 0 and not self._event.wait(min(remaining, self.max_wait_slice)):
+                remaining = latest - self.clock()
+
+        with self._lock:
+            event_time = self._first_event_time
+            self._first_event_time = None
+            self._event.clear()
+        tick_time = self.clock()
+        if event_time is None and deadline is not None and deadline <= tick_time:
+            # a deadline is handled like an event that happened at the deadline
+            event_time = deadline
+        self.ticks += 1
+        if event_time is None:
+            self.idle_ticks += 1
+        else:
+            latency = tick_time - event_time
+            self.latency_sum += latency
+            self.max_latency = max(self.max_latency, latency)
+        self.last_tick_time = tick_time
+        return event_time is not None
+
+    def get_stats(self):
+        """Returns the metrics of the scheduler as a dict"""
+        event_ticks = self.ticks - self.idle_ticks
+        return {
+            'ticks': self.ticks,
+            'idle_ticks': self.idle_ticks,
+            'events': self.events,
+            'mean_latency': self.latency_sum / event_ticks if event_ticks > 0 else 0.0,
+            'max_latency': self.max_latency,
+        }
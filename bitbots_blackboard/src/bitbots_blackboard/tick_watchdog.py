@@ -0,0 +1,66 @@
+"""
+TickWatchdog
+^^^^^^^^^^^^
+
+Measures the duration of each behavior tick against a budget. If the budget is exceeded for several
+consecutive ticks, the degradation level is increased, and if there is enough headroom for a longer time,
+it is decreased again. What each level means is decided by the user of the watchdog.
+"""
+import time
+
+
+class TickWatchdog:
+    def __init__(self, budget, max_level, overrun_ticks=25, recovery_ticks=250, headroom=0.7):
+        """
+        :param budget: Time budget of a tick in seconds
+        :param max_level: Highest degradation level
+        :param overrun_ticks: Number of consecutive ticks over the budget after which the level is increased
+        :param recovery_ticks: Number of consecutive ticks with headroom after which the level is decreased
+        :param headroom: Fraction of the budget below which a tick counts as having headroom
+        """
+        self.budget = budget
+        self.max_level = max_level
+        self.overrun_ticks = overrun_ticks
+        self.recovery_ticks = recovery_ticks
+        self.headroom = headroom
+        self.level = 0
+        self._tick_start = None
+        self._consecutive_overruns = 0
+        self._consecutive_headroom = 0
+        # Metrics
+        self.last_duration = 0.0
+        self.overruns = 0
+        self.level_changes = 0
+
+    def start_tick(self):
+        self._tick_start = time.perf_counter()
+
+    def end_tick(self):
+        """
+        Ends the measurement of a tick and adapts the degradation level
+
+        :return: True if the degradation level changed
+        """
+        self.last_duration = time.perf_counter() - self._tick_start
+        if self.last_duration > self.budget:
+            self.overruns += 1
+            self._consecutive_overruns += 1
+            self._consecutive_headroom = 0
+        elif self.last_duration < self.budget * self.headroom:
+            self._consecutive_headroom += 1
+            self._consecutive_overruns = 0
+        else:
+            self._consecutive_overruns = 0
+            self._consecutive_headroom = 0
+
+        previous_level = self.level
+        if self._consecutive_overruns >= self.overrun_ticks and self.level < self.max_level:
+            self.level += 1
+            self._consecutive_overruns = 0
+        elif self._consecutive_headroom >= self.recovery_ticks and self.level > 0:
+            self.level -= 1
+            self._consecutive_headroom = 0
+        if self.level != previous_level:
+            self.level_changes += 1
+            return True
+        return False
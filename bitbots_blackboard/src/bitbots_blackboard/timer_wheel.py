@@ -0,0 +1,91 @@
+"""
+TimerWheel
+^^^^^^^^^^
+
+Named behavior timers and expiry deadlines, ordered in a heap so that the behavior loop knows
+when the next timer expires and does not need to tick just to observe the time passing.
+"""
+import heapq
+import itertools
+
+import rospy
+
+
+class TimerWheel:
+    def __init__(self):
+        self.timers = dict()  # end time of each named timer
+        # (deadline in seconds, sequence number, timer name or None for registered deadlines)
+        self._deadlines = []
+        self._sequence = itertools.count()
+
+    def start(self, timer_name, duration_secs):
+        """
+        Starts a timer, its end is registered as a deadline
+        :param timer_name: Name of the timer
+        :param duration_secs: Duration of the timer in seconds
+        """
+        end = rospy.Time.now() + rospy.Duration.from_sec(duration_secs)
+        self.timers[timer_name] = end
+        heapq.heappush(self._deadlines, (end.to_sec(), next(self._sequence), timer_name))
+
+    def end(self, timer_name):
+        """
+        Ends a timer
+        :param timer_name: Name of the timer
+        """
+        self.timers[timer_name] = rospy.Time.now()
+
+    def running(self, timer_name):
+        """
+        :return: Whether the timer is running. False if the timer doesn't exist.
+        """
+        if timer_name not in self.timers:
+            return False
+        return rospy.Time.now() < self.timers[timer_name]
+
+    def remaining(self, timer_name):
+        """
+        :return: The number of seconds left on the timer. -1 if the timer doesn't exist.
+        """
+        if timer_name not in self.timers:
+            return -1
+        return (self.timers[timer_name] - rospy.Time.now()).to_sec()
+
+    def expired(self, timer_name):
+        """
+        :return: Whether the timer has ended. Also true, if timer doesn't exist.
+        """
+        if timer_name not in self.timers:
+            return True  # Don't wait for a non-existing Timer
+        return rospy.Time.now() > self.timers[timer_name]
+
+    def register_deadline(self, deadline):
+        """
+        Registers a point in time at which the behavior has to be evaluated, e.g. the end of a timed action
+        :param deadline: rospy.Time of the deadline
+        """
+        heapq.heappush(self._deadlines, (deadline.to_sec(), next(self._sequence), None))
+
+    def next_deadline(self):
+        """
+        :return: The earliest deadline in the future as rospy.Time or None if there is none
+        """
+        now = rospy.Time.now().to_sec()
+        while self._deadlines:
+            deadline, _, timer_name = self._deadlines[0]
+            # drop passed deadlines and deadlines of timers that were restarted or ended
+            if deadline <= now or (timer_name is not None and
+                                   abs(self.timers.get(timer_name, rospy.Time(0)).to_sec() - deadline) > 1e-6):
+                heapq.heappop(self._deadlines)
+                continue
+            return rospy.Time.from_sec(deadline)
+        return None
+
+    def time_until_next_deadline(self):
+        """
+        :return: Seconds until the next deadline or None if there is none
+        """
+        deadline = self.next_deadline()
+        if deadline is None:
+            return None
+        return (deadline - rospy.Time.now()).to_sec()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+import unittest
+from unittest import mock
+
+import rospy
+from std_msgs.msg import Float32
+
+from bitbots_blackboard.change_publisher import ChangePublisher
+
+
+class ChangePublisherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.now = rospy.Time(100)
+        patcher = mock.patch('rospy.Time.now', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.publisher = mock.MagicMock()
+        self.change_publisher = ChangePublisher(self.publisher, heartbeat_period=1.0)
+
+    def test_unchanged_message_is_suppressed(self):
+        self.assertTrue(self.change_publisher.publish(Float32(1.0)))
+        self.assertFalse(self.change_publisher.publish(Float32(1.0)))
+        self.assertTrue(self.change_publisher.publish(Float32(2.0)))
+        self.assertEqual(self.publisher.publish.call_count, 2)
+        self.assertEqual(self.change_publisher.published, 2)
+        self.assertEqual(self.change_publisher.suppressed, 1)
+
+    def test_modified_message_object_is_sent(self):
+        msg = Float32(1.0)
+        self.change_publisher.publish(msg)
+        msg.data = 2.0
+        self.assertTrue(self.change_publisher.publish(msg))
+
+    def test_heartbeat(self):
+        self.change_publisher.publish(Float32(1.0))
+        self.now = rospy.Time.from_sec(100.9)
+        self.assertFalse(self.change_publisher.publish(Float32(1.0)))
+        self.now = rospy.Time.from_sec(101.1)
+        self.assertTrue(self.change_publisher.publish(Float32(1.0)))
+        # the heartbeat period starts again with the last sent message
+        self.now = rospy.Time.from_sec(101.5)
+        self.assertFalse(self.change_publisher.publish(Float32(1.0)))
+
+    def test_invalidate(self):
+        self.change_publisher.publish(Float32(1.0))
+        self.assertTrue(self.change_publisher.is_last_message(Float32(1.0)))
+        self.change_publisher.invalidate()
+        self.assertFalse(self.change_publisher.is_last_message(Float32(1.0)))
+        self.assertTrue(self.change_publisher.publish(Float32(1.0)))
+
+
+if __name__ == '__main__':
+    unittest.main()
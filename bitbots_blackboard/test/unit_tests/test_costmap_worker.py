@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+import threading
+import time
+import unittest
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from bitbots_blackboard.costmap_worker import CostmapWorker, obstacle_layer, pass_layer
+
+SHAPE = (40, 30)
+OBSTACLE_COST = 2.0
+SIGMA = 1.5
+
+
+class CostmapWorkerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.base_costmap = np.linspace(0.0, 1.0, SHAPE[0] * SHAPE[1]).reshape(SHAPE)
+        self.worker = CostmapWorker(self.base_costmap, OBSTACLE_COST, SIGMA)
+
+    def tearDown(self):
+        if hasattr(self.worker, '_shm'):
+            self.worker.shutdown()
+
+    def read_next(self, timeout=10.0):
+        """Waits until the worker wrote a new costmap and returns it"""
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            layers = self.worker.read()
+            if layers is not None:
+                return layers
+            time.sleep(0.001)
+        self.fail('the worker did not write a costmap')
+
+    def expected_layers(self, base_costmap, obstacle_idx, pass_idx):
+        obstacles = obstacle_layer(SHAPE, obstacle_idx[0], obstacle_idx[1], OBSTACLE_COST, SIGMA)
+        return base_costmap + obstacles - pass_layer(SHAPE, pass_idx[0], pass_idx[1]), obstacles
+
+    def test_nothing_to_read_before_an_update(self):
+        self.assertIsNone(self.worker.read())
+
+    def test_obstacles_are_merged_into_the_costmap(self):
+        obstacle_idx = (np.array([5, 20]), np.array([7, 12]))
+        pass_idx = (np.array([30]), np.array([25]))
+        self.worker.update_obstacles(obstacle_idx, pass_idx)
+        costmap, obstacles = self.read_next()
+        expected_costmap, expected_obstacles = self.expected_layers(self.base_costmap, obstacle_idx, pass_idx)
+        np.testing.assert_allclose(costmap, expected_costmap)
+        np.testing.assert_allclose(obstacles, expected_obstacles)
+        # the same costmap is not returned twice
+        self.assertIsNone(self.worker.read())
+
+    def test_base_costmap_update_keeps_the_last_obstacles(self):
+        obstacle_idx = (np.array([10]), np.array([10]))
+        no_pass = (np.empty(0, dtype=int), np.empty(0, dtype=int))
+        self.worker.update_obstacles(obstacle_idx, no_pass)
+        self.read_next()
+        new_base = np.full(SHAPE, 3.0)
+        self.worker.update_base_costmap(new_base)
+        costmap, obstacles = self.read_next()
+        expected_costmap, expected_obstacles = self.expected_layers(new_base, obstacle_idx, no_pass)
+        np.testing.assert_allclose(costmap, expected_costmap)
+        np.testing.assert_allclose(obstacles, expected_obstacles)
+
+    def test_only_the_newest_obstacles_are_applied(self):
+        no_pass = (np.empty(0, dtype=int), np.empty(0, dtype=int))
+        for x in range(1, 20):
+            self.worker.update_obstacles((np.array([x]), np.array([x])), no_pass)
+        newest = (np.array([19]), np.array([19]))
+        end = time.monotonic() + 10.0
+        while time.monotonic() < end:
+            costmap, obstacles = self.read_next()
+            if obstacles[19, 19] > 0:
+                break
+        expected_costmap, expected_obstacles = self.expected_layers(self.base_costmap, newest, no_pass)
+        np.testing.assert_allclose(costmap, expected_costmap)
+        np.testing.assert_allclose(obstacles, expected_obstacles)
+
+    def test_concurrent_reads_are_consistent(self):
+        # without obstacles every written costmap is uniform, so a costmap with different values is a torn read
+        stop = threading.Event()
+
+        def write_base_costmaps():
+            value = 0.0
+            while not stop.is_set():
+                value += 1.0
+                self.worker.update_base_costmap(np.full(SHAPE, value))
+                time.sleep(0.0002)
+
+        writer = threading.Thread(target=write_base_costmaps, daemon=True)
+        writer.start()
+        reads = 0
+        last_value = 0.0
+        end = time.monotonic() + 1.0
+        try:
+            while time.monotonic() < end:
+                layers = self.worker.read()
+                if layers is None:
+                    continue
+                costmap, obstacles = layers
+                reads += 1
+                self.assertEqual(costmap.min(), costmap.max())
+                # the values only increase, so an older costmap after a newer one is also inconsistent
+                self.assertGreaterEqual(costmap[0, 0], last_value)
+                self.assertFalse(np.any(obstacles))
+                last_value = costmap[0, 0]
+        finally:
+            stop.set()
+            writer.join()
+        self.assertGreater(reads, 0)
+
+    def test_shutdown_stops_the_process_and_frees_the_shared_memory(self):
+        process = self.worker._process
+        shm_name = self.worker._shm.name
+        self.assertTrue(process.is_alive())
+        self.worker.shutdown()
+        self.assertFalse(process.is_alive())
+        self.assertEqual(process.exitcode, 0)
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=shm_name)
+        del self.worker._shm
+
+    def test_crashed_worker_keeps_the_last_costmap(self):
+        obstacle_idx = (np.array([5]), np.array([5]))
+        no_pass = (np.empty(0, dtype=int), np.empty(0, dtype=int))
+        self.worker.update_obstacles(obstacle_idx, no_pass)
+        costmap, _ = self.read_next()
+        self.worker._process.kill()
+        self.worker._process.join(timeout=5.0)
+        # the behavior neither blocks nor reads a broken costmap, it keeps the last one
+        self.worker.update_obstacles((np.array([9]), np.array([9])), no_pass)
+        self.assertIsNone(self.worker.read())
+        np.testing.assert_allclose(costmap, self.worker._buffers[int(self.worker._header[1]), 0])
+        # the shared memory is freed even though the worker can not be stopped anymore
+        shm_name = self.worker._shm.name
+        self.worker.shutdown()
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=shm_name)
+        del self.worker._shm
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+import unittest
+
+import numpy as np
+
+from bitbots_blackboard.grid_planner import GridPlanner
+
+
+def crossed_cells(start, end, samples_per_cell=50):
+    """
+    Returns all cells whose interior is crossed by the straight line between two cell centers, sampled densely.
+    Samples on a cell border are skipped, so a diagonal step between two cells that only touches
+    the corners of its neighbors does not count as crossing them.
+    """
+    start, end = np.array(start, dtype=float), np.array(end, dtype=float)
+    num_samples = max(2, int(np.linalg.norm(end - start) * samples_per_cell) + 1)
+    samples = np.linspace(start, end, num_samples)
+    on_border = np.any(np.isclose(np.abs(samples - np.floor(samples)), 0.5), axis=1)
+    cells = np.floor(samples[~on_border] + 0.5).astype(int)
+    return {tuple(cell) for cell in cells.tolist()}
+
+
+class GridPlannerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.planner = GridPlanner()
+
+    def assert_connected(self, path):
+        """Checks that consecutive grid steps of an unsimplified path are neighbors"""
+        for (ax, ay), (bx, by) in zip(path, path[1:]):
+            self.assertLessEqual(max(abs(ax - bx), abs(ay - by)), 1)
+
+    def assert_free(self, weights, path):
+        """Checks that no segment of a (simplified) path crosses a lethal cell"""
+        for a, b in zip(path, path[1:]):
+            for cell in crossed_cells(a, b):
+                self.assertTrue(np.isfinite(weights[cell]), f"segment {a} -> {b} crosses lethal cell {cell}")
+
+    def test_start_equals_goal(self):
+        weights = np.ones((5, 5))
+        self.assertEqual(self.planner.plan(weights, (2, 3), (2, 3)), [(2, 3)])
+
+    def test_free_grid_is_straight_line(self):
+        weights = np.ones((10, 10))
+        self.assertEqual(self.planner.plan(weights, (0, 0), (9, 4)), [(0, 0), (9, 4)])
+
+    def test_path_around_obstacle(self):
+        weights = np.ones((9, 9))
+        # a lethal wall between start and goal with a gap at the top
+        weights[4, :7] = np.inf
+        path = self.planner.plan(weights, (1, 1), (7, 1))
+        self.assertEqual(path[0], (1, 1))
+        self.assertEqual(path[-1], (7, 1))
+        self.assertGreater(len(path), 2)
+        self.assertTrue(any(y >= 7 for _, y in path))
+        self.assert_free(weights, path)
+
+    def test_unreachable_goal(self):
+        weights = np.ones((9, 9))
+        # the goal is enclosed by lethal cells
+        weights[5:8, 5:8] = np.inf
+        weights[6, 6] = 1
+        path = self.planner.plan(weights, (0, 0), (6, 6))
+        self.assertEqual(path[0], (0, 0))
+        # the path ends at a free cell next to the enclosure
+        self.assertNotEqual(path[-1], (6, 6))
+        self.assertTrue(np.isfinite(weights[path[-1]]))
+        self.assertLessEqual(max(abs(path[-1][0] - 6), abs(path[-1][1] - 6)), 2)
+        self.assert_free(weights, path)
+
+    def test_shortcut_never_crosses_lethal_cells(self):
+        rng = np.random.default_rng(42)
+        for _ in range(50):
+            weights = 1 + rng.random((20, 20)) * 3
+            weights[rng.random((20, 20)) < 0.2] = np.inf
+            weights[0, 0] = weights[19, 19] = 1
+            path = self.planner.plan(weights, (0, 0), (19, 19))
+            self.assert_free(weights, path)
+
+    def test_shortcut_keeps_corners(self):
+        weights = np.ones((6, 6))
+        weights[1:, 2] = np.inf
+        path = [(5, 0), (4, 0), (3, 0), (2, 0), (1, 0), (0, 1), (0, 2), (0, 3), (1, 4), (2, 4), (3, 4)]
+        self.assert_connected(path)
+        simplified = self.planner.shortcut(weights, path)
+        self.assertEqual(simplified[0], (5, 0))
+        self.assertEqual(simplified[-1], (3, 4))
+        self.assert_free(weights, simplified)
+
+    def test_expansion_limit_returns_partial_path(self):
+        planner = GridPlanner(max_expansions=10)
+        weights = np.ones((50, 50))
+        path = planner.plan(weights, (0, 0), (49, 49))
+        self.assertEqual(path[0], (0, 0))
+        self.assertNotEqual(path[-1], (49, 49))
+        self.assertLessEqual(planner.last_expansions, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+import copy
+import unittest
+from unittest import mock
+
+import rospy
+
+from bitbots_blackboard.parameter_store import ParameterStore
+
+
+class ParameterStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = {
+            'behavior': {
+                'body': {'rate': 10, 'costmap': {'corner_value': 1.0, 'goal_value': 2.0}},
+                'body_extra': {'value': 3},
+            },
+            'field_length': 9,
+            'node': {'map_frame': 'map'},
+        }
+        self.calls = []
+        patcher = mock.patch('rospy.get_param', side_effect=self.get_param)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_param(self, name, default=None):
+        """Parameter server with the private namespace of the node 'node'"""
+        self.calls.append(name)
+        value = self.server
+        for key in name.replace('~', 'node/').split('/'):
+            if not key:
+                continue
+            if not isinstance(value, dict) or key not in value:
+                return default
+            value = value[key]
+        return copy.deepcopy(value)
+
+    def test_cached_namespaces(self):
+        store = ParameterStore(['behavior/body', '~'])
+        self.assertEqual(store.get('behavior/body/rate'), 10)
+        self.assertEqual(store.get('behavior/body/costmap/goal_value'), 2.0)
+        self.assertEqual(store.get('~map_frame'), 'map')
+        self.assertEqual(store.get('behavior/body/missing', 5), 5)
+        self.assertEqual(store.snapshot('behavior/body')['rate'], 10)
+        # only the namespaces were fetched
+        self.assertEqual(self.calls, ['behavior/body', '~'])
+
+    def test_namespace_precedence(self):
+        # a parameter is served from the first namespace that contains its name
+        store = ParameterStore(['behavior', 'behavior/body'])
+        self.assertEqual(store.get('behavior/body/rate'), 10)
+        self.server['behavior']['body']['rate'] = 20
+        store.refresh()
+        self.assertEqual(store.get('behavior/body/rate'), 20)
+        # a namespace is not the prefix of another namespace with a longer name
+        store = ParameterStore(['behavior/body'])
+        self.calls.clear()
+        self.assertEqual(store.get('behavior/body_extra/value'), 3)
+        self.assertEqual(self.calls, ['behavior/body_extra/value'])
+
+    def test_single_parameters_are_fetched_once(self):
+        store = ParameterStore(['behavior/body'])
+        self.calls.clear()
+        self.assertEqual(store.get('field_length'), 9)
+        self.assertEqual(store.get('field_length'), 9)
+        self.assertEqual(store.get('field_length', param_type=float), 9.0)
+        self.assertEqual(self.calls, ['field_length'])
+
+    def test_refresh_updates_changed_values(self):
+        store = ParameterStore(['behavior/body'])
+        self.assertEqual(store.get('behavior/body/rate', param_type=float), 10.0)
+        self.assertEqual(store.refresh(), set())
+        self.server['behavior']['body']['rate'] = 20
+        self.server['behavior']['body']['costmap']['corner_value'] = 1.5
+        self.assertEqual(store.refresh(), {'behavior/body/rate', 'behavior/body/costmap/corner_value'})
+        self.assertEqual(store.get('behavior/body/rate', param_type=float), 20.0)
+        self.assertEqual(store.get('behavior/body/costmap/corner_value'), 1.5)
+        self.assertEqual(store.refreshes, 2)
+
+    def test_listeners(self):
+        store = ParameterStore(['behavior/body'])
+        costmap_listener = mock.MagicMock()
+        rate_listener = mock.MagicMock()
+        store.add_listener(['behavior/body/costmap'], costmap_listener)
+        store.add_listener(['behavior/body/rate'], rate_listener)
+        self.server['behavior']['body']['costmap']['goal_value'] = 3.0
+        store.refresh()
+        costmap_listener.assert_called_once_with({'behavior/body/costmap/goal_value'})
+        rate_listener.assert_not_called()
+
+    def test_start_refresh(self):
+        store = ParameterStore(['behavior/body'])
+        with mock.patch('rospy.Timer') as timer:
+            store.start_refresh(0)
+            timer.assert_not_called()
+            store.start_refresh(2.0)
+            timer.assert_called_once()
+            self.assertEqual(timer.call_args[0][0], rospy.Duration(2.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+import math
+import unittest
+from unittest import mock
+
+import rospy
+from actionlib_msgs.msg import GoalStatus
+from geometry_msgs.msg import PoseStamped
+from move_base_msgs.msg import MoveBaseActionResult
+from tf.transformations import quaternion_from_euler
+
+from bitbots_blackboard.capsules.pathfinding_capsule import PathfindingCapsule
+
+POSITION_THRESHOLD = 0.1
+ORIENTATION_THRESHOLD = 10.0
+REFRESH_PERIOD = 5.0
+
+
+class FakeParameters:
+    """Returns the test values instead of the parameter server values"""
+    values = {
+        'behavior/body/pathfinding_position_threshold': POSITION_THRESHOLD,
+        'behavior/body/pathfinding_orientation_threshold': ORIENTATION_THRESHOLD,
+        'behavior/body/pathfinding_goal_refresh_period': REFRESH_PERIOD,
+    }
+
+    def get(self, name, default=None, param_type=None):
+        value = self.values.get(name, default)
+        return param_type(value) if param_type is not None and value is not None else value
+
+
+def map_goal(x, y, yaw_degrees):
+    goal = PoseStamped()
+    goal.header.frame_id = 'map'
+    goal.pose.position.x = x
+    goal.pose.position.y = y
+    goal.pose.orientation.x, goal.pose.orientation.y, goal.pose.orientation.z, goal.pose.orientation.w = \
+        quaternion_from_euler(0, 0, math.radians(yaw_degrees))
+    return goal
+
+
+def result(status, goal_stamp):
+    msg = MoveBaseActionResult()
+    msg.status.status = status
+    msg.status.goal_id.stamp = goal_stamp
+    return msg
+
+
+class PathfindingGoalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.now = rospy.Time(100)
+        patchers = [mock.patch('rospy.Time.now', side_effect=lambda: self.now),
+                    mock.patch('tf2_ros.Buffer'), mock.patch('tf2_ros.TransformListener')]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.pathfinding = PathfindingCapsule(mock.Mock(parameters=FakeParameters(), config={}))
+        self.pathfinding.pathfinding_pub = mock.Mock()
+        self.pathfinding.pathfinding_cancel_pub = mock.Mock()
+
+    def send(self, goal):
+        """Publishes the goal and returns whether it was sent to move_base"""
+        sent = self.pathfinding.goals_sent
+        self.pathfinding.publish(goal)
+        return self.pathfinding.goals_sent > sent
+
+    def test_first_goal_is_sent(self):
+        self.assertTrue(self.send(map_goal(1.0, 1.0, 0.0)))
+        self.assertEqual(self.pathfinding.pathfinding_pub.publish.call_count, 1)
+
+    def test_position_threshold(self):
+        self.send(map_goal(1.0, 1.0, 0.0))
+        self.assertFalse(self.send(map_goal(1.0 + 0.9 * POSITION_THRESHOLD, 1.0, 0.0)))
+        self.assertTrue(self.send(map_goal(1.0, 1.0 + 1.1 * POSITION_THRESHOLD, 0.0)))
+        self.assertEqual(self.pathfinding.get_goal_publish_stats(), {'sent': 2, 'suppressed': 1})
+
+    def test_orientation_threshold(self):
+        self.send(map_goal(1.0, 1.0, 0.0))
+        self.assertFalse(self.send(map_goal(1.0, 1.0, 0.9 * ORIENTATION_THRESHOLD)))
+        self.assertTrue(self.send(map_goal(1.0, 1.0, 1.1 * ORIENTATION_THRESHOLD)))
+
+    def test_orientation_difference_wraps_around(self):
+        self.send(map_goal(1.0, 1.0, 178.0))
+        self.assertFalse(self.send(map_goal(1.0, 1.0, -178.0)))
+
+    def test_unchanged_goal_is_refreshed(self):
+        self.send(map_goal(1.0, 1.0, 0.0))
+        self.now += rospy.Duration(REFRESH_PERIOD * 0.9)
+        self.assertFalse(self.send(map_goal(1.0, 1.0, 0.0)))
+        self.now += rospy.Duration(REFRESH_PERIOD * 0.2)
+        self.assertTrue(self.send(map_goal(1.0, 1.0, 0.0)))
+
+    def test_aborted_goal_is_retried(self):
+        self.send(map_goal(1.0, 1.0, 0.0))
+        self.now += rospy.Duration(1)
+        self.pathfinding.status_callback(result(GoalStatus.ABORTED, self.now))
+        self.assertTrue(self.send(map_goal(1.0, 1.0, 0.0)))
+        self.assertEqual(self.pathfinding.status, -1)
+        # the retried goal is not retried again until it is aborted as well
+        self.assertFalse(self.send(map_goal(1.0, 1.0, 0.0)))
+
+    def test_result_of_the_current_goal_is_kept_for_suppressed_goals(self):
+        self.send(map_goal(1.0, 1.0, 0.0))
+        self.pathfinding.status_callback(result(GoalStatus.SUCCEEDED, self.now))
+        self.assertFalse(self.send(map_goal(1.0, 1.0, 0.0)))
+        self.assertEqual(self.pathfinding.status, GoalStatus.SUCCEEDED)
+
+    def test_stale_result_of_a_previous_goal_is_ignored(self):
+        self.send(map_goal(1.0, 1.0, 0.0))
+        first_goal_stamp = self.now
+        self.now += rospy.Duration(1)
+        self.send(map_goal(2.0, 1.0, 0.0))
+        for status in (GoalStatus.SUCCEEDED, GoalStatus.ABORTED):
+            self.pathfinding.status_callback(result(status, first_goal_stamp))
+            self.assertEqual(self.pathfinding.status, -1)
+            self.assertFalse(self.send(map_goal(2.0, 1.0, 0.0)))
+
+    def test_cancel_resets_the_status_and_resends_the_goal(self):
+        self.send(map_goal(1.0, 1.0, 0.0))
+        self.pathfinding.status_callback(result(GoalStatus.SUCCEEDED, self.now))
+        self.pathfinding.cancel_goal()
+        self.assertEqual(self.pathfinding.status, -1)
+        self.assertTrue(self.send(map_goal(1.0, 1.0, 0.0)))
+
+
+if __name__ == '__main__':
+    unittest.main()
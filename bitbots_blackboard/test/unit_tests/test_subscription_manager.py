@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+import unittest
+from unittest import mock
+
+from std_msgs.msg import Int32
+
+from bitbots_blackboard.subscription_manager import SubscriptionManager
+
+
+class SubscriptionManagerTestCase(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch('rospy.Subscriber')
+        self.subscriber = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.notify = mock.MagicMock()
+        self.manager = SubscriptionManager(notify=self.notify)
+        self.received = []
+
+    def subscribe(self, policy, **kwargs):
+        return self.manager.subscribe('topic', Int32, lambda msg: self.received.append(msg.data), policy, **kwargs)
+
+    def test_latest_coalesces(self):
+        subscription = self.subscribe('latest')
+        for i in range(3):
+            subscription.receive(Int32(i))
+        self.assertEqual(self.received, [])
+        self.manager.process()
+        self.assertEqual(self.received, [2])
+        self.manager.process()
+        self.assertEqual(self.received, [2])
+        stats = self.manager.get_stats()['topic']
+        self.assertEqual((stats['received'], stats['processed'], stats['coalesced'], stats['dropped']), (3, 1, 2, 0))
+
+    def test_queue_drops_oldest(self):
+        subscription = self.subscribe('queue', queue_size=2)
+        for i in range(3):
+            subscription.receive(Int32(i))
+        self.manager.process()
+        self.assertEqual(self.received, [1, 2])
+        stats = self.manager.get_stats()['topic']
+        self.assertEqual((stats['received'], stats['processed'], stats['coalesced'], stats['dropped']), (3, 2, 0, 1))
+
+    def test_all_processes_immediately(self):
+        subscription = self.subscribe('all')
+        subscription.receive(Int32(1))
+        subscription.receive(Int32(2))
+        self.assertEqual(self.received, [1, 2])
+        self.manager.process()
+        self.assertEqual(self.received, [1, 2])
+        # the rospy subscriber does not limit the queue for immediately processed messages
+        self.assertIsNone(self.subscriber.call_args[1]['queue_size'])
+
+    def test_notify(self):
+        silent = self.manager.subscribe('silent', Int32, lambda msg: None)
+        notifying = self.manager.subscribe('notifying', Int32, lambda msg: None, notify=True)
+        silent.receive(Int32(1))
+        self.notify.assert_not_called()
+        notifying.receive(Int32(1))
+        self.notify.assert_called_once_with()
+
+    def test_configured_policy_overrides(self):
+        manager = SubscriptionManager(policies={'topic': 'all', 'other': 'unknown'})
+        self.assertEqual(manager.subscribe('topic', Int32, lambda msg: None, 'queue').policy, 'all')
+        with mock.patch('rospy.logwarn'):
+            self.assertEqual(manager.subscribe('other', Int32, lambda msg: None, 'queue').policy, 'latest')
+
+    def test_failing_callback_does_not_stop_processing(self):
+        def fail(msg):
+            raise ValueError()
+        failing = self.manager.subscribe('failing', Int32, fail)
+        working = self.subscribe('latest')
+        failing.receive(Int32(1))
+        working.receive(Int32(2))
+        with mock.patch('rospy.logerr') as logerr:
+            self.manager.process()
+        logerr.assert_called_once()
+        self.assertEqual(self.received, [2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+import math
+import unittest
+from unittest import mock
+
+import numpy as np
+import rospy
+from humanoid_league_msgs.msg import Strategy, TeamData
+
+from bitbots_blackboard.capsules.team_data_capsule import TeamDataCapsule
+
+TEAM_SIZE = 6
+DATA_TIMEOUT = 2
+BALL_MAX_COVARIANCE = 0.5
+MAX_EXTRAPOLATION_TIME = 1.0
+MAX_ROBOT_SPEED = 0.5
+MAX_BALL_SPEED = 3.0
+
+
+class FakeParameters:
+    """Returns the test values instead of the parameter server values"""
+    values = {
+        'role': 'striker',
+        'team_data_timeout': DATA_TIMEOUT,
+        'ball_max_covariance': BALL_MAX_COVARIANCE,
+        'behavior/body/team_size': TEAM_SIZE,
+        'behavior/body/pose_precision_threshold': {'x_sdev': 1.0, 'y_sdev': 1.0, 'theta_sdev': 1.0},
+        'behavior/body/team_data_extrapolation': True,
+        'behavior/body/team_data_max_extrapolation_time': MAX_EXTRAPOLATION_TIME,
+        'behavior/body/team_data_max_robot_speed': MAX_ROBOT_SPEED,
+        'behavior/body/team_data_max_ball_speed': MAX_BALL_SPEED,
+    }
+
+    def get(self, name, default=None, param_type=None):
+        value = self.values.get(name, default)
+        return param_type(value) if param_type is not None and value is not None else value
+
+
+def team_data(robot_id, stamp, robot, ball, time_to_ball, role=Strategy.ROLE_STRIKER,
+              state=TeamData.STATE_ACTIVE, ball_covariance=0.1):
+    msg = TeamData()
+    msg.header.stamp = rospy.Time.from_sec(stamp)
+    msg.header.frame_id = 'map'
+    msg.robot_id = robot_id
+    msg.state = state
+    msg.strategy.role = role
+    msg.robot_position.pose.position.x, msg.robot_position.pose.position.y = robot
+    msg.robot_position.pose.orientation.w = 1.0
+    msg.ball_absolute.pose.position.x, msg.ball_absolute.pose.position.y = ball
+    covariance = [0.0] * 36
+    covariance[0] = covariance[7] = ball_covariance
+    msg.ball_absolute.covariance = covariance
+    msg.time_to_position_at_ball = time_to_ball
+    return msg
+
+
+class DictTeamData:
+    """
+    The team data stored as messages in dicts indexed by the robot id, with the extrapolation and the rank
+    to the ball as they were calculated before the team state was stored in columns
+    """
+    def __init__(self):
+        self.team_data = {i: TeamData() for i in range(1, TEAM_SIZE + 1)}
+        self.previous_team_data = {i: TeamData() for i in range(1, TEAM_SIZE + 1)}
+
+    def team_data_callback(self, msg):
+        self.previous_team_data[msg.robot_id] = self.team_data[msg.robot_id]
+        self.team_data[msg.robot_id] = msg
+
+    def is_valid(self, data, now):
+        return now - data.header.stamp < rospy.Duration(DATA_TIMEOUT) and data.state != TeamData.STATE_PENALIZED
+
+    def extrapolated_team_data(self, now):
+        """Returns the robot position, ball position and time to ball of each robot id, extrapolated to now"""
+        robot_ids = list(self.team_data.keys())
+        latest = [self.team_data[i] for i in robot_ids]
+        previous = [self.previous_team_data[i] for i in robot_ids]
+
+        def positions(messages, field):
+            return np.array([[getattr(m, field).pose.position.x, getattr(m, field).pose.position.y]
+                             for m in messages])
+
+        latest_stamps = np.array([m.header.stamp.to_sec() for m in latest])
+        previous_stamps = np.array([m.header.stamp.to_sec() for m in previous])
+        ages = np.clip(now.to_sec() - latest_stamps, 0, MAX_EXTRAPOLATION_TIME)
+        dt = latest_stamps - previous_stamps
+        usable = (previous_stamps > 0) & (dt > 1e-3) & (dt < DATA_TIMEOUT)
+        dt = np.where(usable, dt, 1.0)
+
+        def extrapolate(current, last, max_speed):
+            velocity = np.where(usable[:, np.newaxis], (current - last) / dt[:, np.newaxis], 0.0)
+            speed = np.linalg.norm(velocity, axis=1)
+            velocity *= np.minimum(1.0, max_speed / np.maximum(speed, 1e-9))[:, np.newaxis]
+            return current + velocity * ages[:, np.newaxis]
+
+        robot_positions = extrapolate(positions(latest, 'robot_position'), positions(previous, 'robot_position'),
+                                      MAX_ROBOT_SPEED)
+        ball_positions = extrapolate(positions(latest, 'ball_absolute'), positions(previous, 'ball_absolute'),
+                                     MAX_BALL_SPEED)
+        times_to_ball = np.array([m.time_to_position_at_ball for m in latest])
+        time_rates = np.where(usable, (times_to_ball - np.array([m.time_to_position_at_ball for m in previous])) / dt,
+                              0.0)
+        times_to_ball = np.maximum(0.0, times_to_ball + np.clip(time_rates, -1.0, 1.0) * ages)
+        return {robot_id: (tuple(robot_positions[index]), tuple(ball_positions[index]), times_to_ball[index])
+                for index, robot_id in enumerate(robot_ids)}
+
+    def team_rank_to_ball(self, now, own_ball_distance, count_goalies=True, use_time_to_ball=False):
+        extrapolated = self.extrapolated_team_data(now)
+        distances = []
+        for robot_id, data in self.team_data.items():
+            if self.is_valid(data, now) and (data.strategy.role != Strategy.ROLE_GOALIE or count_goalies) \
+                    and data.ball_absolute.covariance[0] < BALL_MAX_COVARIANCE \
+                    and data.ball_absolute.covariance[7] < BALL_MAX_COVARIANCE:
+                robot, ball, time_to_ball = extrapolated[robot_id]
+                if use_time_to_ball:
+                    distances.append(time_to_ball)
+                else:
+                    distances.append(math.hypot(ball[0] - robot[0], ball[1] - robot[1]))
+        for rank, distance in enumerate(sorted(distances)):
+            if own_ball_distance < distance:
+                return rank + 1
+        return len(distances) + 1
+
+
+class TeamDataCapsuleTestCase(unittest.TestCase):
+    def setUp(self):
+        self.now = rospy.Time(100)
+        patcher = mock.patch('rospy.Time.now', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.capsule = TeamDataCapsule(mock.Mock(parameters=FakeParameters()))
+        self.reference = DictTeamData()
+        messages = [
+            # valid striker, moving towards the ball
+            team_data(1, 98.0, (0.0, 0.0), (2.0, 0.0), 4.0),
+            team_data(1, 99.5, (0.3, 0.0), (2.0, 0.2), 3.5),
+            # valid goalie, the ball moves faster than the maximal ball speed
+            team_data(2, 99.0, (-4.0, 0.0), (1.0, 0.0), 2.0, role=Strategy.ROLE_GOALIE),
+            team_data(2, 99.6, (-4.0, 0.1), (-1.0, 0.0), 1.5, role=Strategy.ROLE_GOALIE),
+            # stale, the last message is older than the team data timeout
+            team_data(3, 96.0, (1.0, 1.0), (1.5, 1.0), 0.5),
+            team_data(3, 97.5, (1.1, 1.0), (1.5, 1.0), 0.4),
+            # penalized
+            team_data(4, 99.8, (0.5, 0.5), (0.6, 0.5), 0.1, state=TeamData.STATE_PENALIZED),
+            # ball too uncertain
+            team_data(5, 99.8, (0.0, 2.0), (0.2, 2.0), 0.2, ball_covariance=0.8),
+            # only a single message, so it is not extrapolated
+            team_data(6, 99.9, (3.0, -1.0), (2.0, 0.0), 3.0),
+        ]
+        for msg in messages:
+            self.capsule.team_data_callback(msg)
+            self.reference.team_data_callback(msg)
+
+    def assert_extrapolation_matches(self):
+        robot_positions, ball_positions, times_to_ball = self.capsule.get_extrapolated_state()
+        for robot_id, (robot, ball, time_to_ball) in self.reference.extrapolated_team_data(self.now).items():
+            np.testing.assert_allclose(robot_positions[robot_id - 1], robot)
+            np.testing.assert_allclose(ball_positions[robot_id - 1], ball)
+            self.assertAlmostEqual(times_to_ball[robot_id - 1], time_to_ball)
+
+    def assert_ranks_match(self, own_distances):
+        for count_goalies in (True, False):
+            for use_time_to_ball in (True, False):
+                for own_distance in own_distances:
+                    with self.subTest(own_distance=own_distance, count_goalies=count_goalies,
+                                      use_time_to_ball=use_time_to_ball):
+                        self.assertEqual(
+                            self.capsule.team_rank_to_ball(own_distance, count_goalies, use_time_to_ball),
+                            self.reference.team_rank_to_ball(self.now, own_distance, count_goalies, use_time_to_ball))
+
+    def test_extrapolated_state_matches_dict_team_data(self):
+        self.assert_extrapolation_matches()
+        # the age of the messages is capped
+        self.now = rospy.Time.from_sec(101.5)
+        self.assert_extrapolation_matches()
+
+    def test_rank_to_ball_matches_dict_team_data(self):
+        # includes a tie with the static time to ball of robot 6
+        self.assert_ranks_match([0.0, 0.5, 1.0, 1.5, 2.5, 3.0, 3.5, 10.0])
+
+    def test_rank_to_ball_after_a_teammate_times_out(self):
+        self.now = rospy.Time.from_sec(101.55)
+        self.assert_ranks_match([0.0, 1.0, 2.0, 3.0, 10.0])
+        # only the goalie and robot 6 are still valid
+        self.assertEqual(self.capsule.team_rank_to_ball(10.0, count_goalies=True), 3)
+        self.assertEqual(self.capsule.team_rank_to_ball(10.0, count_goalies=False), 2)
+
+    def test_rank_ignores_stale_penalized_and_uncertain_teammates(self):
+        # robots 3, 4 and 5 would all be closer to the ball
+        self.assertEqual(self.capsule.team_rank_to_ball(0.3, use_time_to_ball=True), 1)
+        self.assertEqual(self.capsule.team_rank_to_ball(10.0, use_time_to_ball=True), 4)
+        self.assertEqual(self.capsule.team_rank_to_ball(10.0, count_goalies=False, use_time_to_ball=True), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+import unittest
+from unittest import mock
+
+from bitbots_blackboard.tick_watchdog import TickWatchdog
+
+
+class TickWatchdogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.watchdog = TickWatchdog(budget=0.01, max_level=2, overrun_ticks=3, recovery_ticks=5, headroom=0.5)
+
+    def tick(self, duration):
+        """Runs a tick of the given duration and returns whether the level changed"""
+        with mock.patch('time.perf_counter', side_effect=[0.0, duration]):
+            self.watchdog.start_tick()
+            return self.watchdog.end_tick()
+
+    def test_overruns_increase_level(self):
+        self.assertFalse(self.tick(0.02))
+        self.assertFalse(self.tick(0.02))
+        self.assertTrue(self.tick(0.02))
+        self.assertEqual(self.watchdog.level, 1)
+        self.assertEqual(self.watchdog.overruns, 3)
+
+    def test_overruns_have_to_be_consecutive(self):
+        for duration in (0.02, 0.02, 0.008, 0.02, 0.02):
+            self.assertFalse(self.tick(duration))
+        self.assertEqual(self.watchdog.level, 0)
+
+    def test_level_is_limited(self):
+        changes = [self.tick(0.02) for _ in range(12)]
+        self.assertEqual(changes.count(True), 2)
+        self.assertEqual(self.watchdog.level, 2)
+
+    def test_headroom_decreases_level(self):
+        for _ in range(6):
+            self.tick(0.02)
+        self.assertEqual(self.watchdog.level, 2)
+        changes = [self.tick(0.001) for _ in range(5)]
+        self.assertEqual(changes, [False, False, False, False, True])
+        self.assertEqual(self.watchdog.level, 1)
+
+    def test_ticks_without_headroom_do_not_recover(self):
+        for _ in range(3):
+            self.tick(0.02)
+        # between the headroom and the budget, the level is kept
+        for _ in range(10):
+            self.assertFalse(self.tick(0.008))
+        self.assertEqual(self.watchdog.level, 1)
+
+    def test_level_does_not_drop_below_zero(self):
+        for _ in range(10):
+            self.assertFalse(self.tick(0.001))
+        self.assertEqual(self.watchdog.level, 0)
+        self.assertEqual(self.watchdog.level_changes, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+import unittest
+from unittest import mock
+
+import rospy
+
+from bitbots_blackboard.timer_wheel import TimerWheel
+
+
+class TimerWheelTestCase(unittest.TestCase):
+    def setUp(self):
+        self.now = rospy.Time(100)
+        patcher = mock.patch('rospy.Time.now', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.wheel = TimerWheel()
+
+    def test_deadlines_are_ordered(self):
+        self.wheel.start('late', 3.0)
+        self.wheel.start('early', 1.0)
+        self.wheel.register_deadline(rospy.Time(102))
+        self.assertEqual(self.wheel.next_deadline(), rospy.Time(101))
+        self.assertAlmostEqual(self.wheel.time_until_next_deadline(), 1.0)
+        self.now = rospy.Time(101)
+        self.assertEqual(self.wheel.next_deadline(), rospy.Time(102))
+        self.now = rospy.Time(102)
+        self.assertEqual(self.wheel.next_deadline(), rospy.Time(103))
+        self.now = rospy.Time(103)
+        self.assertIsNone(self.wheel.next_deadline())
+        self.assertIsNone(self.wheel.time_until_next_deadline())
+
+    def test_restarted_timer_replaces_its_deadline(self):
+        self.wheel.start('timer', 1.0)
+        self.wheel.start('timer', 5.0)
+        self.assertEqual(self.wheel.next_deadline(), rospy.Time(105))
+
+    def test_ended_timer_drops_its_deadline(self):
+        self.wheel.start('ended', 1.0)
+        self.wheel.start('running', 2.0)
+        self.wheel.end('ended')
+        self.assertEqual(self.wheel.next_deadline(), rospy.Time(102))
+
+    def test_timer_state(self):
+        self.assertTrue(self.wheel.expired('unknown'))
+        self.assertFalse(self.wheel.running('unknown'))
+        self.assertEqual(self.wheel.remaining('unknown'), -1)
+        self.wheel.start('timer', 2.0)
+        self.assertTrue(self.wheel.running('timer'))
+        self.assertFalse(self.wheel.expired('timer'))
+        self.assertAlmostEqual(self.wheel.remaining('timer'), 2.0)
+        self.now = rospy.Time.from_sec(102.5)
+        self.assertFalse(self.wheel.running('timer'))
+        self.assertTrue(self.wheel.expired('timer'))
+
+
+if __name__ == '__main__':
+    unittest.main()
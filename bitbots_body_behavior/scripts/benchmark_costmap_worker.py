@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Compares the tick timing jitter of the behavior loop when the obstacle layers of the costmap are calculated
+in a callback thread of the behavior process and when they are calculated in the costmap worker process.
+
+A loop with the rate of the behavior does some Python work in each tick, while a second thread receives
+obstacles with the rate of the obstacle detection. In the thread mode, this thread smooths and merges the layers
+like the robot_obstacle_callback of the world model does. In the process mode, it sends them to the worker and
+the loop takes over the newest costmap at the start of each tick. No roscore is required.
+
+Before the timing, a consistency check reads the costmap as fast as possible while uniform base costmaps
+are written, so a read that mixes two writes of the worker is detected.
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from bitbots_blackboard.costmap_worker import CostmapWorker, obstacle_layer, pass_layer
+
+
+def behavior_work(costmap, iterations):
+    """Stand-in for the decisions and actions of a tick, mostly Python code that holds the GIL"""
+    value = 0.0
+    for i in range(iterations):
+        value += costmap[i % costmap.shape[0], (i * 7) % costmap.shape[1]]
+    return value
+
+
+def random_indices(shape, count, rng):
+    return rng.integers(0, shape[0], count), rng.integers(0, shape[1], count)
+
+
+def run(mode, args, base_costmap):
+    shape = base_costmap.shape
+    rng = np.random.default_rng(0)
+    state = {'costmap': base_costmap.copy()}
+    stop = threading.Event()
+    worker = None
+    if mode == 'process':
+        worker = CostmapWorker(base_costmap, 2.0, 1.5)
+
+    def obstacle_callbacks():
+        period = 1.0 / args.obstacle_rate
+        while not stop.wait(period):
+            obstacle_idx = random_indices(shape, args.obstacles, rng)
+            pass_idx = random_indices(shape, 3, rng)
+            if worker is not None:
+                worker.update_obstacles(obstacle_idx, pass_idx)
+            else:
+                obstacles = obstacle_layer(shape, obstacle_idx[0], obstacle_idx[1], 2.0, 1.5)
+                state['costmap'] = base_costmap + obstacles - pass_layer(shape, pass_idx[0], pass_idx[1])
+
+    callback_thread = threading.Thread(target=obstacle_callbacks, daemon=True)
+    callback_thread.start()
+    # give the worker process time to start
+    time.sleep(1.0)
+
+    period = 1.0 / args.rate
+    lateness = []
+    durations = []
+    start = time.perf_counter()
+    for tick in range(int(args.duration * args.rate)):
+        scheduled = start + tick * period
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        begin = time.perf_counter()
+        lateness.append(begin - scheduled)
+        if worker is not None:
+            layers = worker.read()
+            if layers is not None:
+                state['costmap'] = layers[0]
+        behavior_work(state['costmap'], args.work)
+        durations.append(time.perf_counter() - begin)
+    stop.set()
+    callback_thread.join()
+    if worker is not None:
+        worker.shutdown()
+    return lateness, durations
+
+
+def check_consistency(duration, shape):
+    """
+    Sends uniform base costmaps with increasing values to the worker and reads the costmap concurrently.
+    Without obstacles, each written costmap is uniform, so a costmap with different values is a torn read.
+
+    :return: Number of reads, number of torn reads and retries of the reader
+    """
+    worker = CostmapWorker(np.zeros(shape), 2.0, 1.5)
+    stop = threading.Event()
+
+    def write_base_costmaps():
+        value = 0.0
+        while not stop.is_set():
+            value += 1.0
+            worker.update_base_costmap(np.full(shape, value))
+            time.sleep(0.0002)
+
+    writer = threading.Thread(target=write_base_costmaps, daemon=True)
+    writer.start()
+    reads = 0
+    torn = 0
+    last_value = 0.0
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        layers = worker.read()
+        if layers is None:
+            continue
+        costmap, obstacles = layers
+        reads += 1
+        # the values only increase, so an older costmap after a newer one is also inconsistent
+        if costmap.min() != costmap.max() or costmap[0, 0] < last_value or np.any(obstacles):
+            torn += 1
+        last_value = costmap[0, 0]
+    stop.set()
+    writer.join()
+    retries = worker.read_retries
+    worker.shutdown()
+    return reads, torn, retries
+
+
+def print_stats(name, values):
+    values = np.array(values) * 1000
+    print(f"{name:>16}: mean {values.mean():6.3f} ms, std {values.std():6.3f} ms, "
+          f"p99 {np.percentile(values, 99):6.3f} ms, max {values.max():6.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0, help="measured time per mode in seconds")
+    parser.add_argument("--rate", type=float, default=125.0, help="tick rate of the behavior loop in Hz")
+    parser.add_argument("--obstacle-rate", type=float, default=30.0, help="rate of obstacle messages in Hz")
+    parser.add_argument("--obstacles", type=int, default=10, help="number of obstacles per message")
+    parser.add_argument("--work", type=int, default=2000, help="costmap lookups per tick")
+    parser.add_argument("--check-duration", type=float, default=5.0,
+                        help="duration of the reader/writer consistency check in seconds (0 skips it)")
+    args = parser.parse_args()
+
+    # costmap of a 14 m x 9 m field with a margin of 1 m at a resolution of 10 cells per meter,
+    # descending towards the opponent goal
+    grid_x, grid_y = np.mgrid[0:1:160j, 0:1:110j]
+    base = 1.5 - grid_x + 0.5 * np.abs(grid_y - 0.5)
+
+    if args.check_duration > 0:
+        reads, torn, retries = check_consistency(args.check_duration, base.shape)
+        print(f"consistency check: {reads} reads, {torn} torn, {retries} retries")
+        if torn > 0:
+            raise SystemExit("the costmap worker returned inconsistent costmaps")
+
+    for mode in ('thread', 'process'):
+        lateness, durations = run(mode, args, base)
+        print(f"obstacle layers calculated in a {mode}")
+        print_stats("tick lateness", lateness)
+        print_stats("tick duration", durations)
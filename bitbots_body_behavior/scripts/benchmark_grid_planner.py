@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Compares the latency of the in process grid planner of the blackboard with a round trip to a make_plan service.
+
+The grid planner is benchmarked on a synthetic costmap with the size of the world model costmap.
+With --make-plan, the same queries are sent to the make_plan service (e.g. move_base or scripts/fake_plan_server.py),
+which requires a running roscore.
+"""
+
+import argparse
+import time
+
+import numpy as np
+from scipy.ndimage import gaussian_filter
+
+from bitbots_blackboard.grid_planner import GridPlanner
+
+
+def synthetic_weights(shape, num_obstacles, rng):
+    """Builds planner weights like the pathfinding capsule does from a smoothed obstacle layer"""
+    obstacle_map = np.zeros(shape)
+    obstacle_map[rng.integers(0, shape[0], num_obstacles), rng.integers(0, shape[1], num_obstacles)] = 2.0 * 1.5
+    return 1 + 2.0 * gaussian_filter(obstacle_map, 1.5)
+
+
+def random_queries(shape, num_queries, max_distance_cells, rng):
+    starts = np.stack((rng.integers(0, shape[0], num_queries), rng.integers(0, shape[1], num_queries)), axis=1)
+    angles = rng.uniform(-np.pi, np.pi, num_queries)
+    distances = rng.uniform(0, max_distance_cells, num_queries)
+    goals = starts + np.stack((np.cos(angles) * distances, np.sin(angles) * distances), axis=1).astype(int)
+    goals = np.clip(goals, 0, np.array(shape) - 1)
+    return list(zip(map(tuple, starts), map(tuple, goals)))
+
+
+def print_stats(name, durations):
+    durations = np.array(durations) * 1000
+    print(f"{name:>12}: mean {durations.mean():6.2f} ms, median {np.median(durations):6.2f} ms, "
+          f"p95 {np.percentile(durations, 95):6.2f} ms, max {durations.max():6.2f} ms")
+
+
+def benchmark_make_plan(queries, shape, service_name):
+    import rospy
+    from nav_msgs.srv import GetPlan, GetPlanRequest
+
+    rospy.init_node("benchmark_grid_planner", anonymous=True)
+    rospy.wait_for_service(service_name)
+    service = rospy.ServiceProxy(service_name, GetPlan, persistent=True)
+    durations = []
+    for start, goal in queries:
+        request = GetPlanRequest()
+        request.start.header.frame_id = request.goal.header.frame_id = "map"
+        # same conversion from costmap cells to field coordinates as in the world model
+        request.start.pose.position.x = start[0] / 10 - shape[0] / 20
+        request.start.pose.position.y = start[1] / 10 - shape[1] / 20
+        request.goal.pose.position.x = goal[0] / 10 - shape[0] / 20
+        request.goal.pose.position.y = goal[1] / 10 - shape[1] / 20
+        request.start.pose.orientation.w = request.goal.pose.orientation.w = 1
+        begin = time.perf_counter()
+        service(request)
+        durations.append(time.perf_counter() - begin)
+    return durations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200, help="number of planning queries")
+    parser.add_argument("--max-distance", type=float, default=3.0, help="maximal goal distance in meters")
+    parser.add_argument("--obstacles", type=int, default=8, help="number of obstacles on the costmap")
+    parser.add_argument("--max-expansions", type=int, default=4000, help="expansion budget of the grid planner")
+    parser.add_argument("--make-plan", action="store_true", help="also benchmark the make_plan service")
+    parser.add_argument("--service", default="move_base/NavfnROS/make_plan", help="name of the make_plan service")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # 14 m x 9 m field with a margin of 1 m at a resolution of 10 cells per meter
+    shape = (160, 110)
+    weights = synthetic_weights(shape, args.obstacles, rng)
+    queries = random_queries(shape, args.queries, args.max_distance * 10, rng)
+
+    planner = GridPlanner(args.max_expansions)
+    durations = []
+    expansions = []
+    for start, goal in queries:
+        begin = time.perf_counter()
+        planner.plan(weights, start, goal)
+        durations.append(time.perf_counter() - begin)
+        expansions.append(planner.last_expansions)
+    print_stats("grid planner", durations)
+    print(f"{'':>12}  mean expansions {np.mean(expansions):.0f}, max expansions {np.max(expansions)}")
+
+    if args.make_plan:
+        print_stats("make_plan", benchmark_make_plan(queries, shape, args.service))
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Measures the startup time of the body and head behavior until the first tick can run.
+
+Each measurement runs in a fresh interpreter and is split into the import of the blackboard module,
+the construction of the blackboard and the access of the capsules that the behavior uses before its first tick.
+The ROS layer is replaced by a minimal stand-in, so no roscore is required. The parameters are read
+from config/body_behavior.yaml, the head parameters are taken from the same file where they overlap.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from unittest.mock import MagicMock
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG = os.path.join(SCRIPT_DIR, "..", "config", "body_behavior.yaml")
+BLACKBOARD_SRC = os.path.join(SCRIPT_DIR, "..", "..", "bitbots_blackboard", "src")
+
+STAND_IN_MODULES = [
+    "tf", "tf.transformations", "tf2_ros", "tf2_geometry_msgs", "actionlib", "actionlib_msgs", "actionlib_msgs.msg",
+    "ros_numpy", "sensor_msgs", "sensor_msgs.msg", "sensor_msgs.point_cloud2", "geometry_msgs", "geometry_msgs.msg",
+    "std_msgs", "std_msgs.msg", "std_srvs", "std_srvs.srv", "nav_msgs", "nav_msgs.msg", "nav_msgs.srv",
+    "visualization_msgs", "visualization_msgs.msg", "move_base_msgs", "move_base_msgs.msg", "humanoid_league_msgs",
+    "humanoid_league_msgs.msg", "bitbots_msgs", "bitbots_msgs.msg", "bio_ik_msgs", "bio_ik_msgs.msg",
+    "bio_ik_msgs.srv", "dynamic_stack_decider", "dynamic_stack_decider.abstract_decision_element",
+    "dynamic_stack_decider.abstract_action_element", "rosparam", "bitbots_head_behavior",
+    "bitbots_head_behavior.collision_checker",
+]
+
+# parameters that are set by other launch files on the robot
+EXTRA_PARAMS = {
+    "role": "offense",
+    "field_length": 9.0,
+    "field_width": 6.0,
+    "goal_width": 2.6,
+    "Animations": {
+        "Goalie": {"goalieArms": "goalie_arms", "fallRight": "fall_right", "fallLeft": "fall_left",
+                   "fallCenter": "fall_center"},
+        "Misc": {"cheering": "cheering", "init": "init"},
+    },
+}
+
+
+class StandInTime:
+    def __init__(self, secs=0.0):
+        self.secs = float(secs)
+
+    @classmethod
+    def now(cls):
+        return cls(time.time())
+
+    @classmethod
+    def from_sec(cls, secs):
+        return cls(secs)
+
+    def to_sec(self):
+        return self.secs
+
+    def is_zero(self):
+        return self.secs == 0
+
+    def __add__(self, other):
+        return type(self)(self.secs + other.to_sec())
+
+    def __sub__(self, other):
+        if isinstance(other, StandInDuration):
+            return type(self)(self.secs - other.to_sec())
+        return StandInDuration(self.secs - other.to_sec())
+
+    def __lt__(self, other):
+        return self.secs < other.to_sec()
+
+    def __gt__(self, other):
+        return self.secs > other.to_sec()
+
+    def __le__(self, other):
+        return self.secs <= other.to_sec()
+
+    def __ge__(self, other):
+        return self.secs >= other.to_sec()
+
+
+class StandInDuration(StandInTime):
+    pass
+
+
+def install_ros_stand_in():
+    """Registers a minimal rospy and mocks of all other ROS modules used by the blackboard"""
+    import types
+    import yaml
+
+    with open(CONFIG) as config_file:
+        params = yaml.safe_load(config_file)
+    params.update(EXTRA_PARAMS)
+    params["behavior"]["head"] = params["behavior"]["body"]
+
+    def get_param(name, default=None):
+        value = params
+        for key in name.lstrip("~/").split("/"):
+            if not isinstance(value, dict) or key not in value:
+                return default
+            value = value[key]
+        return value
+
+    rospy = types.ModuleType("rospy")
+    rospy.Time = StandInTime
+    rospy.Duration = StandInDuration
+    rospy.ROSException = Exception
+    rospy.get_param = get_param
+    rospy.get_time = time.time
+    rospy.is_shutdown = lambda: False
+    rospy.wait_for_service = lambda *args, **kwargs: None
+    for name in ("Publisher", "Subscriber", "Timer", "ServiceProxy", "Rate", "sleep", "init_node", "on_shutdown",
+                 "logdebug", "loginfo", "logwarn", "logerr", "logwarn_throttle", "logerr_throttle",
+                 "loginfo_throttle", "logdebug_throttle"):
+        setattr(rospy, name, MagicMock())
+    sys.modules["rospy"] = rospy
+    for name in STAND_IN_MODULES:
+        sys.modules[name] = MagicMock()
+    sys.path.insert(0, BLACKBOARD_SRC)
+
+
+def measure(node):
+    """Measures the startup phases of one node and prints them as a single line of seconds"""
+    install_ros_stand_in()
+    begin = time.perf_counter()
+    from bitbots_blackboard import blackboard
+    imported = time.perf_counter()
+    if node == "body":
+        bb = blackboard.BodyBlackboard()
+        constructed = time.perf_counter()
+        # the body behavior constructs all capsules before its first tick
+        bb.warm_up()
+    else:
+        bb = blackboard.HeadBlackboard()
+        constructed = time.perf_counter()
+        for capsule in ("head_capsule", "world_model"):
+            getattr(bb, capsule)
+    first_tick = time.perf_counter()
+    print(imported - begin, constructed - imported, first_tick - constructed)
+    # the stand-in mocks keep background threads of the blackboard alive
+    os._exit(0)
+
+
+def print_stats(name, durations):
+    import numpy as np
+    durations = np.array(durations) * 1000
+    print(f"{name:>16}: mean {durations.mean():7.1f} ms, median {np.median(durations):7.1f} ms, "
+          f"max {durations.max():7.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="number of measured interpreter starts per node")
+    parser.add_argument("--node", choices=("body", "head"), nargs="+", default=["body", "head"],
+                        help="behavior nodes to measure")
+    parser.add_argument("--measure", choices=("body", "head"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure)
+
+    for node in args.node:
+        phases = []
+        for _ in range(args.runs):
+            output = subprocess.run([sys.executable, __file__, "--measure", node], check=True,
+                                    stdout=subprocess.PIPE, universal_newlines=True).stdout
+            phases.append([float(value) for value in output.split()[-3:]])
+        print(f"{node} behavior ({args.runs} runs)")
+        print_stats("import", [p[0] for p in phases])
+        print_stats("construction", [p[1] for p in phases])
+        print_stats("capsules", [p[2] for p in phases])
+        print_stats("first tick", [sum(p) for p in phases])
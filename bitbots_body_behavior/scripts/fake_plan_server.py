@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the make_plan service of move_base.
+It answers every request with a straight path from the start to the goal after an optional delay,
+which allows testing the time to ball estimation of the behavior without a running move_base.
+"""
+
+import numpy as np
+import rospy
+from geometry_msgs.msg import PoseStamped
+from nav_msgs.msg import Path
+from nav_msgs.srv import GetPlan, GetPlanResponse
+
+
+class FakePlanServer:
+    def __init__(self):
+        rospy.init_node("fake_plan_server")
+        self.delay = rospy.get_param("~delay", 0.05)  # simulated planning time in seconds
+        self.resolution = rospy.get_param("~resolution", 0.05)  # distance between the poses of the path
+        self.service = rospy.Service(rospy.get_param("~service", "move_base/NavfnROS/make_plan"),
+                                     GetPlan, self.make_plan)
+
+    def make_plan(self, request):
+        rospy.sleep(self.delay)
+        start = np.array([request.start.pose.position.x, request.start.pose.position.y])
+        goal = np.array([request.goal.pose.position.x, request.goal.pose.position.y])
+        num_poses = max(2, int(np.linalg.norm(goal - start) / self.resolution) + 1)
+
+        plan = Path()
+        plan.header.frame_id = request.goal.header.frame_id
+        plan.header.stamp = rospy.Time.now()
+        for point in np.linspace(start, goal, num_poses):
+            pose = PoseStamped()
+            pose.header = plan.header
+            pose.pose.position.x, pose.pose.position.y = point
+            pose.pose.orientation = request.goal.pose.orientation
+            plan.poses.append(pose)
+        return GetPlanResponse(plan=plan)
+
+
+if __name__ == "__main__":
+    FakePlanServer()
+    rospy.spin()
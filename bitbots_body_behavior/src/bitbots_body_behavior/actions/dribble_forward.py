@@ -46,3 +46,5 @@ class DribbleForward(AbstractActionElement):
         cmd_vel.linear.y = self.current_speed_y
         cmd_vel.angular.z = 0
         self.blackboard.pathfinding.direct_cmd_vel_pub.publish(cmd_vel)
+        # the velocity is streamed and accelerated per tick, so the behavior has to keep ticking with the maximal rate
+        self.blackboard.scheduler.notify()
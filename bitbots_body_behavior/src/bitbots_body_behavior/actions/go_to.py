@@ -26,6 +26,7 @@ class GoToRelativePosition(AbstractActionElement):
         super(GoToRelativePosition, self).__init__(blackboard, dsd)
         self.point = float(parameters.get('x', 0)), float(parameters.get('y', 0)), float(parameters.get('t', 0))
         self.first = True
+        self.walk_start_deadline = None
 
     def perform(self, reevaluate=False):
         if self.first:
@@ -43,9 +44,11 @@ class GoToRelativePosition(AbstractActionElement):
 
             # To have the object we are going to in front of us, go to a point behind it
             self.blackboard.pathfinding.publish(pose_msg)
-            # TODO: this in good
-            # waiting until the robot started to walk
-            rospy.sleep(0.25)
+            # waiting until the robot started to walk, without blocking the behavior
+            self.walk_start_deadline = rospy.Time.now() + rospy.Duration(0.25)
+            self.blackboard.blackboard.timer_wheel.register_deadline(self.walk_start_deadline)
+        if rospy.Time.now() < self.walk_start_deadline:
+            return
         if not self.blackboard.blackboard.is_currently_walking():
             self.pop()
 
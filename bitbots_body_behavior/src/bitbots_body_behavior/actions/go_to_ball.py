@@ -28,6 +28,26 @@ class GoToBall(AbstractActionElement):
     def perform(self, reevaluate=False):
 
         pose_msg = self.blackboard.pathfinding.get_ball_goal(self.target, self.distance)
+
+        # Close to the approach pose we servo directly on the ball position instead of waiting for move_base
+        if self.blackboard.pathfinding.use_direct_approach(pose_msg):
+            # we are about to kick, so the kick goal should be ready when we decide to kick
+            self.blackboard.kick.keep_goals_prepared()
+            reached = self.blackboard.pathfinding.direct_approach(pose_msg)
+            self.publish_debug_data("direct approach duration",
+                                    self.blackboard.pathfinding.last_direct_approach_duration)
+            if reached or not self.blocking:
+                self.pop()
+            return
+
+        # Within a few meters, the approach follows a path of the in process planner instead of move_base
+        if self.blackboard.pathfinding.use_local_approach(pose_msg):
+            reached = self.blackboard.pathfinding.local_approach(pose_msg)
+            self.publish_debug_data("local plan duration", self.blackboard.pathfinding.last_local_plan_duration)
+            if reached or not self.blocking:
+                self.pop()
+            return
+
         self.blackboard.pathfinding.publish(pose_msg)
 
         approach_marker = Marker()
@@ -1,9 +1,4 @@
-import math
-import numpy as np
 import rospy
-from bitbots_msgs.msg import KickGoal
-from geometry_msgs.msg import Quaternion
-from tf.transformations import quaternion_from_euler
 
 from dynamic_stack_decider.abstract_action_element import AbstractActionElement
 
@@ -46,11 +41,6 @@ class KickBallDynamic(AbstractKickAction):
             self.penalty_kick = False
 
         self._goal_sent = False
-        self.kick_length = self.blackboard.config['kick_cost_kick_length']
-        self.angular_range = self.blackboard.config['kick_cost_angular_range']
-        self.max_kick_angle = self.blackboard.config['max_kick_angle']
-        self.num_kick_angles = self.blackboard.config['num_kick_angles']
-        self.penalty_kick_angle = self.blackboard.config['penalty_kick_angle']
         # By default, don't reevaluate
         self.never_reevaluate = parameters.get('r', True) and parameters.get('reevaluate', True)
 
@@ -58,45 +48,10 @@ class KickBallDynamic(AbstractKickAction):
 
         if not self.blackboard.kick.is_currently_kicking:
             if not self._goal_sent:
-                goal = KickGoal()
-                goal.header.stamp = rospy.Time.now()
-
-                # currently we use a tested left or right kick
-                goal.header.frame_id = self.blackboard.world_model.base_footprint_frame  # the ball position is stated in this frame
-
-                if self.penalty_kick:
-                    goal.kick_speed = 6.7
-                    goal.ball_position.x = 0.22
-                    goal.ball_position.y = 0.0
-                    goal.ball_position.z = 0
-                    goal.unstable = True
-
-                    # only check 2 directions, left and right
-                    kick_direction = self.blackboard.world_model.get_best_kick_direction(
-                            -self.penalty_kick_angle,
-                            self.penalty_kick_angle,
-                            2,
-                            self.kick_length,
-                            self.angular_range)
-                else:
-                    ball_u, ball_v = self.blackboard.world_model.get_ball_position_uv()
-                    goal.kick_speed = 1
-                    goal.ball_position.x = ball_u
-                    goal.ball_position.y = ball_v
-                    goal.ball_position.z = 0
-                    goal.unstable = False
-
-                    kick_direction = self.blackboard.world_model.get_best_kick_direction(
-                            -self.max_kick_angle,
-                            self.max_kick_angle,
-                            self.num_kick_angles,
-                            self.kick_length,
-                            self.angular_range)
-
-                goal.kick_direction = Quaternion(*quaternion_from_euler(0, 0, kick_direction))
-
-                self.blackboard.kick.kick(goal)
-                self._goal_sent = True
+                # the goal is usually prepared in the background during the approach
+                goal = self.blackboard.kick.get_goal('penalty' if self.penalty_kick else 'normal')
+                # if the kick server is not available yet, we try again on the next tick
+                self._goal_sent = self.blackboard.kick.kick(goal)
             else:
                 self.pop()
 
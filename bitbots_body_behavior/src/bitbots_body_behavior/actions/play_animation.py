@@ -23,6 +23,17 @@ class AbstractPlayAnimation(AbstractActionElement):
             # defined by implementations of this abstract class
             anim = self.chose_animation()
 
+            if anim is None or anim == "":
+                rospy.logerr("Tried to play an animation with an empty name! Will abort play animation action!")
+                return self.pop()
+
+            # the server connection is checked in the background, we try again on the next tick
+            if not self.blackboard.async_calls.ready('animation'):
+                rospy.logerr_throttle(5.0,
+                                      "Animation Action Server not running! Motion can not work without animation "
+                                      "action server. Will wait until server is accessible!")
+                return
+
             # try to start animation
             success = self.start_animation(anim)
             # if we fail, we need to abort this action
@@ -45,7 +56,7 @@ class AbstractPlayAnimation(AbstractActionElement):
         """
         This will NOT wait by itself. You have to check
         animation_finished()
-        by yourself.
+        by yourself. The animation server has to be available.
         :param anim: animation to play
         :return:
         """
@@ -54,20 +65,6 @@ class AbstractPlayAnimation(AbstractActionElement):
         if anim is None or anim == "":
             rospy.logwarn("Tried to play an animation with an empty name!")
             return False
-        first_try = self.blackboard.animation_action_client.wait_for_server(
-            rospy.Duration(1))
-        if not first_try:
-            server_running = False
-            while not server_running and not rospy.is_shutdown():
-                rospy.logerr_throttle(5.0,
-                                      "Animation Action Server not running! Motion can not work without animation action server. "
-                                      "Will now wait until server is accessible!")
-                server_running = self.blackboard.animation_action_client.wait_for_server(rospy.Duration(1))
-            if server_running:
-                rospy.logwarn("Animation server now running, hcm will go on.")
-            else:
-                rospy.logwarn("Animation server did not start.")
-                return False
         goal = humanoid_league_msgs.msg.PlayAnimationGoal()
         goal.animation = anim
         goal.hcm = True  # the animation is from the hcm
@@ -22,6 +22,13 @@ class WalkInPlace(AbstractActionElement):
         self.duration = parameters.get('duration', None)
 
         self.start_time = rospy.Time.now()
+        self.register_end()
+
+    def register_end(self):
+        """Registers the end of the duration, so that the behavior is evaluated when it is over"""
+        if self.duration is not None:
+            self.blackboard.blackboard.timer_wheel.register_deadline(
+                self.start_time + rospy.Duration.from_sec(self.duration))
 
     def perform(self, reevaluate=False):
         self.publish_debug_data("duration", self.duration)
@@ -56,3 +63,4 @@ class StandAndWaitRandom(Stand):
         self.duration = random.uniform(self.min, self.max)
 
         self.start_time = rospy.Time.now()
+        self.register_end()
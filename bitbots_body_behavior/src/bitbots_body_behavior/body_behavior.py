@@ -8,10 +8,8 @@ BehaviorModule
 Starts the body behavior
 """
 
-import actionlib
 import os
 import rospy
-from bitbots_msgs.msg import DynUpAction
 from tf2_geometry_msgs import PoseStamped
 from humanoid_league_msgs.msg import GameState, HeadMode, Strategy, TeamData,\
     RobotControlState, PoseWithCertainty, PoseWithCertaintyArray
@@ -21,24 +19,35 @@ from std_msgs.msg import Bool
 from visualization_msgs.msg import Marker
 
 from bitbots_blackboard.blackboard import BodyBlackboard
+from bitbots_blackboard.change_publisher import ChangePublisher
+from bitbots_blackboard.tick_watchdog import TickWatchdog
 from dynamic_stack_decider import dsd
 from geometry_msgs.msg import PoseWithCovarianceStamped, TwistWithCovarianceStamped, Twist
-from bitbots_ros_patches.rate import Rate
 from sensor_msgs.msg import PointCloud2
-from std_msgs.msg import Float32
+from std_msgs.msg import Float32, Int8
 from nav_msgs.srv import GetPlan
 from nav_msgs.msg import Path
 
 if __name__ == "__main__":
     rospy.init_node("Bodybehavior")
     D = dsd.DSD(BodyBlackboard(), 'debug/dsd/body_behavior')
+    # construct the capsules before the first tick, so their construction does not delay it
+    D.blackboard.warm_up()
 
-    D.blackboard.team_data.strategy_sender = rospy.Publisher("strategy", Strategy, queue_size=2)
-    D.blackboard.team_data.time_to_ball_publisher = rospy.Publisher("time_to_ball", Float32, queue_size=2)
-    D.blackboard.blackboard.head_pub = rospy.Publisher("head_mode", HeadMode, queue_size=10)
+    # these outputs are only published if they change or the heartbeat period has passed
+    heartbeat_period = D.blackboard.config['publisher_heartbeat_period']
+    D.blackboard.team_data.strategy_sender = ChangePublisher(
+        rospy.Publisher("strategy", Strategy, queue_size=2), heartbeat_period)
+    D.blackboard.team_data.time_to_ball_publisher = ChangePublisher(
+        rospy.Publisher("time_to_ball", Float32, queue_size=2), heartbeat_period)
+    D.blackboard.blackboard.head_pub = ChangePublisher(
+        rospy.Publisher("head_mode", HeadMode, queue_size=10), heartbeat_period)
     D.blackboard.pathfinding.direct_cmd_vel_pub = rospy.Publisher('cmd_vel', Twist, queue_size=1)
+    D.blackboard.pathfinding.stop_walk_pub = ChangePublisher(
+        D.blackboard.pathfinding.direct_cmd_vel_pub, heartbeat_period)
     D.blackboard.pathfinding.pathfinding_pub = rospy.Publisher('move_base_simple/goal', PoseStamped, queue_size=1)
-    D.blackboard.pathfinding.pathfinding_cancel_pub = rospy.Publisher('move_base/cancel', GoalID, queue_size=1)
+    D.blackboard.pathfinding.pathfinding_cancel_pub = ChangePublisher(
+        rospy.Publisher('move_base/cancel', GoalID, queue_size=1), heartbeat_period)
     D.blackboard.pathfinding.ball_obstacle_active_pub = rospy.Publisher("ball_obstacle_active", Bool, queue_size=1)
     D.blackboard.pathfinding.keep_out_area_pub = rospy.Publisher("keep_out_area", PointCloud2, queue_size=1)
     D.blackboard.pathfinding.approach_marker_pub = rospy.Publisher("debug/approach_point", Marker, queue_size=10)
@@ -53,32 +62,81 @@ if __name__ == "__main__":
 
     D.load_behavior(os.path.join(dirname, "main.dsd"))
 
-    D.blackboard.dynup_action_client = actionlib.SimpleActionClient('dynup', DynUpAction)
-
     # TODO: callbacks away from the blackboard!
-    rospy.Subscriber("ball_position_relative_filtered", PoseWithCovarianceStamped, D.blackboard.world_model.ball_filtered_callback)
-    rospy.Subscriber("goal_posts_relative", PoseWithCertaintyArray, D.blackboard.world_model.goalposts_callback)
-    rospy.Subscriber("gamestate", GameState, D.blackboard.gamestate.gamestate_callback)
-    rospy.Subscriber("team_data", TeamData, D.blackboard.team_data.team_data_callback)
-    rospy.Subscriber("pose_with_covariance", PoseWithCovarianceStamped, D.blackboard.world_model.pose_callback)
-    rospy.Subscriber("robot_obstacles", PointCloud2, D.blackboard.world_model.robot_obstacle_callback)
-    rospy.Subscriber("robot_state", RobotControlState, D.blackboard.blackboard.robot_state_callback)
-    rospy.Subscriber(
-        rospy.get_param("behavior/body/ball_movement_subscribe_topic"),
+    # the messages are processed at the start of a tick, state updates only in their newest version.
+    # the callbacks use the newest transforms without waiting for tf, so they cannot stall the tick.
+    # topics with relevant data changes notify the scheduler, so that they trigger a tick of the behavior
+    scheduler = D.blackboard.scheduler
+    subscriptions = D.blackboard.subscriptions
+    subscriptions.subscribe("ball_position_relative_filtered", PoseWithCovarianceStamped,
+                            D.blackboard.world_model.ball_filtered_callback, notify=True)
+    subscriptions.subscribe("goal_posts_relative", PoseWithCertaintyArray, D.blackboard.world_model.goalposts_callback)
+    subscriptions.subscribe("gamestate", GameState, D.blackboard.gamestate.gamestate_callback, 'queue', notify=True)
+    subscriptions.subscribe("team_data", TeamData, D.blackboard.team_data.team_data_callback, 'queue', notify=True)
+    subscriptions.subscribe("pose_with_covariance", PoseWithCovarianceStamped, D.blackboard.world_model.pose_callback)
+    # the costmap is smoothed once per tick for the newest obstacles
+    subscriptions.subscribe("robot_obstacles", PointCloud2, D.blackboard.world_model.robot_obstacle_callback)
+    subscriptions.subscribe("robot_state", RobotControlState, D.blackboard.blackboard.robot_state_callback,
+                            notify=True)
+    subscriptions.subscribe(
+        D.blackboard.config["ball_movement_subscribe_topic"],
         TwistWithCovarianceStamped,
         D.blackboard.world_model.ball_twist_callback)
-    rospy.Subscriber("move_base/feedback", MoveBaseActionFeedback, D.blackboard.pathfinding.feedback_callback)
-    rospy.Subscriber("move_base/result", MoveBaseActionResult, D.blackboard.pathfinding.status_callback)
-    rospy.Subscriber("cmd_vel", Twist, D.blackboard.pathfinding.cmd_vel_cb)
+    subscriptions.subscribe("move_base/feedback", MoveBaseActionFeedback, D.blackboard.pathfinding.feedback_callback)
+    subscriptions.subscribe("move_base/result", MoveBaseActionResult, D.blackboard.pathfinding.status_callback,
+                            'queue', notify=True)
+    # the stop command is invalidated as soon as someone else commands the walking
+    subscriptions.subscribe("cmd_vel", Twist, D.blackboard.pathfinding.cmd_vel_cb, 'all')
+
+    def log_suppressed_messages():
+        for name, publisher in [("strategy", D.blackboard.team_data.strategy_sender),
+                                ("time_to_ball", D.blackboard.team_data.time_to_ball_publisher),
+                                ("head_mode", D.blackboard.blackboard.head_pub),
+                                ("stop_walk", D.blackboard.pathfinding.stop_walk_pub),
+                                ("move_base/cancel", D.blackboard.pathfinding.pathfinding_cancel_pub)]:
+            rospy.loginfo(f"{name}: {publisher.published} messages published, {publisher.suppressed} suppressed")
+        goal_stats = D.blackboard.pathfinding.get_goal_publish_stats()
+        rospy.loginfo(f"move_base goals: {goal_stats['sent']} sent, {goal_stats['suppressed']} suppressed")
+        for topic, stats in subscriptions.get_stats().items():
+            rospy.loginfo(f"{topic}: {stats['received']} messages received, {stats['processed']} processed, "
+                          f"{stats['coalesced']} coalesced, {stats['dropped']} dropped")
+    rospy.on_shutdown(log_suppressed_messages)
+
+    # the quality of the behavior is reduced if the ticks take longer than the budget
+    watchdog = TickWatchdog(D.blackboard.config['tick_budget'], 4,
+                            D.blackboard.config['tick_budget_overrun_ticks'],
+                            D.blackboard.config['tick_budget_recovery_ticks'])
+    degradation_level_pub = rospy.Publisher("debug/behavior_degradation_level", Int8, queue_size=1, latch=True)
+    degradation_level_pub.publish(watchdog.level)
 
-    rate = Rate(125)
     counter = 0
     path_to_ball_service_response = None
     while not rospy.is_shutdown():
+        # sleep until the next event or the next deadline of a behavior timer
+        scheduler.wait_for_tick(D.blackboard.blackboard.timer_wheel.time_until_next_deadline())
+        watchdog.start_tick()
+        # apply changed costmap parameters and take over the costmap of the worker process, if it is enabled
+        D.blackboard.world_model.update_costmap()
+        subscriptions.process()
         D.update()
         D.blackboard.team_data.publish_strategy()
         D.blackboard.team_data.publish_time_to_ball()
-        counter = (counter + 1) % D.blackboard.config['time_to_ball_divider']
-        if counter == 0:
+        # the distance field is cheap enough to be evaluated every tick, the other modes every divider ticks.
+        # when the behavior is degraded, the updates are stretched by the degradation factor
+        time_to_ball_period = D.blackboard.time_to_ball_stretch
+        if D.blackboard.pathfinding.time_to_ball_mode != 'distance_field':
+            time_to_ball_period *= D.blackboard.config['time_to_ball_divider']
+        counter += 1
+        if counter >= time_to_ball_period:
+            counter = 0
             D.blackboard.pathfinding.calculate_time_to_ball()
-        rate.sleep()
+        if watchdog.end_tick():
+            D.blackboard.set_degradation_level(watchdog.level)
+            degradation_level_pub.publish(watchdog.level)
+            rospy.logwarn(f"Behavior degradation level changed to {watchdog.level} "
+                          f"(last tick {watchdog.last_duration * 1000:.1f} ms, {watchdog.overruns} overruns)")
+        rospy.logdebug_throttle(10, f"Tick scheduler: {scheduler.get_stats()}")
+        rospy.logdebug_throttle(10, f"Subscriptions: {subscriptions.get_stats()}")
+        rospy.logdebug_throttle(10, f"Local planner: {D.blackboard.pathfinding.get_local_plan_stats()}")
+        if D.blackboard.locks.instrumented:
+            rospy.logdebug_throttle(10, f"Lock contention: {D.blackboard.locks.get_stats()}")
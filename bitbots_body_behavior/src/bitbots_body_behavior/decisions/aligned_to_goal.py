@@ -1,10 +1,10 @@
 import rospy
 import math
 
-from dynamic_stack_decider.abstract_decision_element import AbstractDecisionElement
+from bitbots_body_behavior.throttled_decision import ThrottledDecisionElement
 
 
-class AlignedToGoal(AbstractDecisionElement):
+class AlignedToGoal(ThrottledDecisionElement):
     def __init__(self, blackboard, dsd, parameters=None):
         super(AlignedToGoal, self).__init__(blackboard, dsd, parameters)
         self.goalpost_safety_distance = self.blackboard.config['goalpost_safety_distance']
@@ -12,7 +12,7 @@ class AlignedToGoal(AbstractDecisionElement):
         self.goal_width = self.blackboard.world_model.goal_width
         self.max_kick_angle = self.blackboard.config['max_kick_angle']
 
-    def perform(self, reevaluate=False):
+    def evaluate(self, reevaluate=False):
         """
         It is determined if the robot is correctly aligned to kick the ball into the goal.
         Side kicks with maximum kick angle are counted as a possibilty to kick a goal.
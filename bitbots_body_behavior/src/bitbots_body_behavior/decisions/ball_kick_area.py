@@ -30,6 +30,10 @@ class BallKickArea(AbstractDecisionElement):
         if 0 <= ball_position[0] <= self.kick_x_enter and 0 <= abs(ball_position[1]) <= self.kick_y_enter:
             self.last_descision = 'NEAR'
             self.no_near_decisions += 1
+            # The direct approach servos on the ball, so there is no need to smooth the decision
+            if self.blackboard.pathfinding.direct_approach_reached_recently():
+                self.blackboard.kick.keep_goals_prepared()
+                return 'NEAR'
         # Check if the ball is in the area between the enter area and the leave area
         elif 0 <= ball_position[0] <= self.kick_x_leave and 0 <= abs(ball_position[1]) <= self.kick_y_leave:
             # Return them explicitly to make the parsing easier for e.g. the DSD GUI
@@ -44,6 +48,10 @@ class BallKickArea(AbstractDecisionElement):
             self.last_descision = 'FAR'
             self.no_near_decisions = 0
 
+        if self.last_descision == 'NEAR':
+            # a kick is likely, so the kick goal should be ready when we decide to kick
+            self.blackboard.kick.keep_goals_prepared()
+
         if self.no_near_decisions >= self.smoothing:
             return 'NEAR'
         else:
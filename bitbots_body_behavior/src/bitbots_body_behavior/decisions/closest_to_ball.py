@@ -1,16 +1,16 @@
 # -*- coding:utf-8 -*-
 import rospy
 
-from dynamic_stack_decider.abstract_decision_element import AbstractDecisionElement
+from bitbots_body_behavior.throttled_decision import ThrottledDecisionElement
 
 
-class ClosestToBallNoGoalie(AbstractDecisionElement):
+class ClosestToBallNoGoalie(ThrottledDecisionElement):
     def __init__(self, blackboard, dsd, parameters=None):
         super(ClosestToBallNoGoalie, self).__init__(blackboard, dsd, parameters)
 
-    def perform(self, reevaluate=False):
+    def evaluate(self, reevaluate=False):
         my_time_to_ball = self.blackboard.team_data.get_own_time_to_ball()
-        rank = self.blackboard.team_data.team_rank_to_ball(my_time_to_ball, count_goalies=False, use_time_to_ball=True)
+        rank = self.blackboard.team_data.get_team_rank_to_ball(count_goalies=False)
         self.publish_debug_data(f"time to ball", my_time_to_ball)
         self.publish_debug_data(f"Rank to ball", rank)
         if rank == 1:
@@ -21,13 +21,13 @@ class ClosestToBallNoGoalie(AbstractDecisionElement):
         return True
 
 
-class ClosestToBall(AbstractDecisionElement):
+class ClosestToBall(ThrottledDecisionElement):
     def __init__(self, blackboard, dsd, parameters=None):
         super(ClosestToBall, self).__init__(blackboard, dsd, parameters)
 
-    def perform(self, reevaluate=False):
+    def evaluate(self, reevaluate=False):
         my_time_to_ball = self.blackboard.team_data.get_own_time_to_ball()
-        rank = self.blackboard.team_data.team_rank_to_ball(my_time_to_ball, count_goalies=True, use_time_to_ball=True)
+        rank = self.blackboard.team_data.get_team_rank_to_ball(count_goalies=True)
         self.publish_debug_data(f"time to ball", my_time_to_ball)
         self.publish_debug_data(f"Rank to ball", rank)
         if rank == 1:
@@ -38,13 +38,13 @@ class ClosestToBall(AbstractDecisionElement):
         return True
 
 
-class RankToBallNoGoalie(AbstractDecisionElement):
+class RankToBallNoGoalie(ThrottledDecisionElement):
     def __init__(self, blackboard, dsd, parameters=None):
         super().__init__(blackboard, dsd, parameters)
 
-    def perform(self, reevaluate=False):
+    def evaluate(self, reevaluate=False):
         my_time_to_ball = self.blackboard.team_data.get_own_time_to_ball()
-        rank = self.blackboard.team_data.team_rank_to_ball(my_time_to_ball, count_goalies=False, use_time_to_ball=True)
+        rank = self.blackboard.team_data.get_team_rank_to_ball(count_goalies=False)
         self.publish_debug_data(f"time to ball", my_time_to_ball)
         self.publish_debug_data(f"Rank to ball", rank)
         if rank == 1:
@@ -2,24 +2,19 @@ import math
 
 import rospy
 
-from dynamic_stack_decider.abstract_decision_element import AbstractDecisionElement
+from bitbots_body_behavior.throttled_decision import ThrottledDecisionElement
 
 
-class DribbleOrKick(AbstractDecisionElement):
+class DribbleOrKick(ThrottledDecisionElement):
     def __init__(self, blackboard, dsd, parameters=None):
         super().__init__(blackboard, dsd, parameters)
         self.orient_threshold = self.blackboard.config['dribble_orient_threshold']
         self.goal_distance_threshold = self.blackboard.config['dribble_goal_distance_threshold']
         self.ball_distance_threshold = self.blackboard.config['dribble_ball_distance_threshold']
 
-        self.kick_length = self.blackboard.config['kick_cost_kick_length']
-        self.max_kick_angle = self.blackboard.config['max_kick_angle']
-        self.angular_range = self.blackboard.config['kick_cost_angular_range']
-        self.num_kick_angles = self.blackboard.config['num_kick_angles']
-
         self.dribble_kick_angle = self.blackboard.config['dribble_kick_angle']
 
-    def perform(self, reevaluate=False):
+    def evaluate(self, reevaluate=False):
         """
         Determines whether we want to dribble if the area in front of us is clear, or to kick
         :param reevaluate:
@@ -31,13 +26,16 @@ class DribbleOrKick(AbstractDecisionElement):
         self.publish_debug_data(f"Orientation to goal (needs <{self.orient_threshold})", goal_angle)
 
         # no other robots should be in front of the ball. this means the kick with angle 0 would be the best
-        best_kick_direction = self.blackboard.world_model.get_best_kick_direction(-self.max_kick_angle,
-                                                                                  self.max_kick_angle,
-                                                                                  self.num_kick_angles,
-                                                                                  self.kick_length,
-                                                                                  self.angular_range)
-        front_free = -self.dribble_kick_angle < best_kick_direction < self.dribble_kick_angle
-        self.publish_debug_data("best kick direction", best_kick_direction)
+        kick_evaluation = self.blackboard.world_model.get_latest_kick_evaluation()
+        if kick_evaluation is None:
+            # the first evaluation is not available yet, so the front is not known to be free
+            front_free = False
+            self.publish_debug_data("kick evaluation", "pending")
+        else:
+            best_kick_direction = kick_evaluation.best_direction
+            front_free = -self.dribble_kick_angle < best_kick_direction < self.dribble_kick_angle
+            self.publish_debug_data("best kick direction", best_kick_direction)
+            self.publish_debug_data("kick evaluation age", (rospy.Time.now() - kick_evaluation.stamp).to_sec())
         self.publish_debug_data("Front free", front_free)
 
         # we should be not to close to the goal, otherwise kicking makes more sense. only take x axis into account
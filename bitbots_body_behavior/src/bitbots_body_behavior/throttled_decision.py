@@ -0,0 +1,42 @@
+import rospy
+
+from dynamic_stack_decider.abstract_decision_element import AbstractDecisionElement
+
+
+class ThrottledDecisionElement(AbstractDecisionElement):
+    """
+    A decision element whose reevaluation is limited to the period configured for its class in
+    decision_evaluation_periods. Between two evaluations, the last result is returned, while actions still run
+    at the control rate. The first evaluation after the element is pushed on the stack is never skipped.
+    The debug data of the last evaluation is published again with the last result.
+    Subclasses implement evaluate instead of perform.
+    """
+
+    def __init__(self, blackboard, dsd, parameters=None):
+        super().__init__(blackboard, dsd, parameters)
+        self.evaluation_period = blackboard.config['decision_evaluation_periods'].get(type(self).__name__, 0.0)
+        self.last_evaluation_result = None
+        self.last_evaluation_time = None
+        self.last_debug_data = []  # label and data pairs published by the last evaluation
+
+    def perform(self, reevaluate=False):
+        now = rospy.get_time()
+        if reevaluate and self.last_evaluation_result is not None and \
+                now - self.last_evaluation_time < self.evaluation_period:
+            for label, data in self.last_debug_data:
+                super().publish_debug_data(label, data)
+            return self.last_evaluation_result
+        self.last_debug_data = []
+        self.last_evaluation_result = self.evaluate(reevaluate)
+        self.last_evaluation_time = now
+        return self.last_evaluation_result
+
+    def publish_debug_data(self, label, data):
+        self.last_debug_data.append((label, data))
+        super().publish_debug_data(label, data)
+
+    def evaluate(self, reevaluate=False):
+        """
+        Determines the result of the decision, see perform
+        """
+        raise NotImplementedError
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+from bitbots_test.test_case import RosNodeTestCase
+from bitbots_blackboard.blackboard import BodyBlackboard
+from geometry_msgs.msg import PoseStamped
+from tf.transformations import quaternion_from_euler
+import rospy
+
+
+def make_pose(x, y, theta):
+    pose = PoseStamped()
+    pose.header.frame_id = 'map'
+    pose.pose.position.x = x
+    pose.pose.position.y = y
+    (pose.pose.orientation.x, pose.pose.orientation.y,
+     pose.pose.orientation.z, pose.pose.orientation.w) = quaternion_from_euler(0, 0, theta)
+    return pose
+
+
+class PlanTimeToBallTestCase(RosNodeTestCase):
+    def setUp(self):
+        self.pathfinding = BodyBlackboard().pathfinding
+        self.own_pose = make_pose(0, 0, 0)
+        self.goal_pose = make_pose(3, 2, 0)
+        # the robot is located at the origin of the map by a static transform
+        while self.pathfinding._blackboard.world_model.get_current_position() is None:
+            rospy.sleep(0.1)
+
+    def request_plan(self):
+        """Returns the estimation of the first call and waits until the requested plan is available"""
+        estimation = self.pathfinding.time_to_ball_from_plan(self.own_pose, self.goal_pose)
+        self.assertIsNotNone(self.pathfinding._plan_future)
+        self.pathfinding._plan_future.result(timeout=10)
+        return estimation
+
+    def test_straight_line_while_pending(self):
+        straight_line = self.pathfinding.time_to_ball_from_poses(self.own_pose, self.goal_pose)
+        self.assertAlmostEqual(self.pathfinding.time_to_ball_from_plan(self.own_pose, self.goal_pose), straight_line)
+        pending = self.pathfinding._plan_future
+        self.assertIsNotNone(pending)
+        # the fake planner answers after a delay, so the first request is still in flight
+        self.assertAlmostEqual(self.pathfinding.time_to_ball_from_plan(self.own_pose, self.goal_pose), straight_line)
+        self.assertIs(self.pathfinding._plan_future, pending)
+
+    def test_plan_is_cached(self):
+        self.request_plan()
+        estimation = self.pathfinding.time_to_ball_from_plan(self.own_pose, self.goal_pose)
+        self.assertIsNone(self.pathfinding._plan_future)
+        key = self.pathfinding._quantize_poses(self.own_pose, self.goal_pose)
+        self.assertEqual(self.pathfinding._plan_cache[key][1], estimation)
+        # poses within the cache resolution are answered from the cache without a new request
+        self.pathfinding.time_to_ball_from_plan(make_pose(0.01, 0, 0), self.goal_pose)
+        self.assertIsNone(self.pathfinding._plan_future)
+
+    def test_cached_plan_expires(self):
+        self.request_plan()
+        self.pathfinding.time_to_ball_from_plan(self.own_pose, self.goal_pose)
+        self.pathfinding.plan_cache_ttl = rospy.Duration(0)
+        self.pathfinding.time_to_ball_from_plan(self.own_pose, self.goal_pose)
+        self.assertEqual(self.pathfinding._plan_cache, {})
+        self.assertIsNotNone(self.pathfinding._plan_future)
+
+
+if __name__ == '__main__':
+    from bitbots_test import run_rostests
+    run_rostests(PlanTimeToBallTestCase)
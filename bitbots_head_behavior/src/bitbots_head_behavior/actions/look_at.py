@@ -13,8 +13,9 @@ class AbstractLookAt(AbstractActionElement):
     def __init__(self, blackboard, dsd, parameters=None):
         super(AbstractLookAt, self).__init__(blackboard, dsd, parameters)
 
-        self.head_tf_frame = rospy.get_param('~base_link_frame', 'base_link')  # base_link is required by bio_ik
-        self.camera_frame = rospy.get_param('~camera_frame', 'camera')
+        # base_link is required by bio_ik
+        self.head_tf_frame = self.blackboard.parameters.get('~base_link_frame', 'base_link')
+        self.camera_frame = self.blackboard.parameters.get('~camera_frame', 'camera')
         self.bio_ik_request = IKRequest()
 
         # Service proxy for LookAt
@@ -33,7 +34,12 @@ class AbstractLookAt(AbstractActionElement):
 
 
     def get_motor_goals_from_point(self, point):
-        """Call the look at service to calculate head motor goals"""
+        """Call the look at service to calculate head motor goals
+
+        :return: pan and tilt or None if the service is not available yet"""
+        if not self.blackboard.connection_ready('bio_ik'):
+            rospy.logwarn_throttle(5, "Waiting for the bio_ik service")
+            return None
 
         target = Point(point.x, point.y, point.z)
         self.request.look_at_goals[0].target = target
@@ -65,7 +71,10 @@ class AbstractLookAt(AbstractActionElement):
             rospy.logwarn('The transform {} is currently not available (ExtrapolationException)'.format(self.head_tf_frame))
             return
 
-        head_pan, head_tilt = self.get_motor_goals_from_point(point.point)
+        motor_goals = self.get_motor_goals_from_point(point.point)
+        if motor_goals is None:
+            return
+        head_pan, head_tilt = motor_goals
         current_head_pan, current_head_tilt = self.blackboard.head_capsule.get_head_position()
         if abs(current_head_pan - head_pan) >= math.radians(min_pan_delta) or \
                 abs(current_head_tilt - head_tilt) >= math.radians(min_tilt_delta):
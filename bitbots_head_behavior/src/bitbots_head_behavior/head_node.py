@@ -28,6 +28,8 @@ def run(dsd):
     """
     rate = Rate(60)
     while not rospy.is_shutdown():
+        # only the newest joint states, ball and head mode are processed
+        dsd.blackboard.subscriptions.process()
         dsd.update()
         rate.sleep()
     # Also stop cpp node
@@ -45,9 +47,11 @@ def init():
     roscpp_init('collision_checker', [])
     blackboard = HeadBlackboard()
 
-    rospy.Subscriber('head_mode', HeadModeMsg, blackboard.head_capsule.head_mode_callback, queue_size=1)
-    rospy.Subscriber("ball_position_relative_filtered", PoseWithCovarianceStamped, blackboard.world_model.ball_filtered_callback)
-    rospy.Subscriber('joint_states', JointState, blackboard.head_capsule.joint_state_callback)
+    # the newest head mode, ball and joint states are processed at the start of each iteration of the run-loop
+    blackboard.subscriptions.subscribe('head_mode', HeadModeMsg, blackboard.head_capsule.head_mode_callback)
+    blackboard.subscriptions.subscribe("ball_position_relative_filtered", PoseWithCovarianceStamped, blackboard.world_model.ball_filtered_callback)
+    blackboard.subscriptions.subscribe('joint_states', JointState, blackboard.head_capsule.joint_state_callback)
+    rospy.on_shutdown(lambda: rospy.loginfo(f"Subscriptions: {blackboard.subscriptions.get_stats()}"))
     blackboard.head_capsule.position_publisher = rospy.Publisher("head_motor_goals", JointCommand, queue_size=10)
     blackboard.head_capsule.visual_compass_record_trigger = rospy.Publisher(blackboard.config['visual_compass_trigger_topic'], Header, queue_size=5)
 